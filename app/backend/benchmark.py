@@ -0,0 +1,1907 @@
+"""
+성능 벤치마크 스크립트
+
+로컬 redis-server에 연결하여 main.py의 핸들러를 프로세스 내에서 직접 호출합니다.
+벤치마크는 전용 Redis DB(기본 15번)를 사용하며 시작/종료 시 해당 DB를 비웁니다.
+--redis memory이면 redis-server 없이 fakeredis TCP 서버를 벤치마크 프로세스 안에서 띄워 사용합니다.
+--output을 지정하면 측정값을 JSON으로 저장하고, --baseline으로 이전 결과와 비교해 느려진 항목이 있으면 종료 코드 1을 반환합니다.
+
+사용법:
+    python benchmark.py suite --output results.json
+    python benchmark.py suite --redis memory --output new.json --baseline results.json
+    python benchmark.py login-heartbeat --client async
+    python benchmark.py login-heartbeat --client sync
+    python benchmark.py duplicate-login --concurrency 50
+    python benchmark.py cleanup-sweep --sessions 100000
+    python benchmark.py force-logout --rounds 50
+    python benchmark.py stalled-fanout --connections 3 --stalled 2
+    python benchmark.py broadcast --sizes 1000,10000,50000
+    python benchmark.py idle-cpu --connections 10000 --keepalive protocol --heartbeat-interval 30 --duration 60
+    python benchmark.py handshake --connections 1000 --rounds 5 --token-cache on
+    python benchmark.py drain --drain on --connections 1000 --reconnect-window 10
+    python benchmark.py revocation --rounds 50 --sessions 100000
+    python benchmark.py active-sessions --sessions 50000
+    python benchmark.py session-push --delivery push --dashboards 1000 --duration 30
+    python benchmark.py session-push --delivery poll --dashboards 1000 --poll-interval 5 --duration 30
+    python benchmark.py users --sessions 50000 --expired-ratio 0.9
+    python benchmark.py login-storm --concurrency 100 --duration 10 --hash-workers 4
+    python benchmark.py session-backend --sessions 10000
+    python benchmark.py redis-stall --breaker on --concurrency 50 --duration 5
+    python benchmark.py metrics-overhead --iterations 1000000 --requests 20000
+    python benchmark.py log-throughput --logging async --connections 20 --messages 5000
+    python benchmark.py connection-memory --connections 100000
+    python benchmark.py session-cache --cache on --sessions 2000 --reads 20000
+    python benchmark.py codec --sessions 1000
+    python benchmark.py ws-codec --codec msgpack --deflate on --connections 200 --messages 200 --payload 512
+    python benchmark.py login-flood --requests 50000 --attackers 10 --victims 100 --prefilter on
+    python benchmark.py slow-consumer --stalled 100 --messages 1000 --policy coalesce
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import zlib
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import List
+
+# 벤치마크 전용 DB 사용 (main 모듈 import 전에 설정해야 적용됨)
+os.environ.setdefault("REDIS_DB", "15")
+
+import redis
+import main
+
+
+def percentile(values: List[float], p: float) -> float:
+    """백분위수 계산 (p: 0-100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# 측정 결과 (--output 지정 시 JSON으로 저장, 같은 이름의 항목끼리 --baseline과 비교)
+results: List[dict] = []
+
+
+def record(name: str, **metrics):
+    """측정값 기록 - 이름이 _per_s로 끝나면 클수록, 나머지는 작을수록 좋은 값으로 비교"""
+    results.append({"name": name, **metrics})
+
+
+def print_report(title: str, latencies: List[float], elapsed: float, **extra):
+    """지연 시간 통계 출력 (단위: ms)"""
+    record(
+        title,
+        throughput_per_s=len(latencies) / elapsed,
+        p50_ms=percentile(latencies, 50) * 1000,
+        p99_ms=percentile(latencies, 99) * 1000,
+        max_ms=max(latencies, default=0) * 1000
+    )
+    print(f"\n[{title}]")
+    print(f"  요청 수     : {len(latencies)}")
+    print(f"  처리량      : {len(latencies) / elapsed:.1f} req/s")
+    print(f"  p50         : {percentile(latencies, 50) * 1000:.2f} ms")
+    print(f"  p99         : {percentile(latencies, 99) * 1000:.2f} ms")
+    print(f"  max         : {max(latencies, default=0) * 1000:.2f} ms")
+    for key, value in extra.items():
+        print(f"  {key:<12}: {value}")
+
+
+async def measure_loop_lag(stop: asyncio.Event, samples: List[float], interval: float = 0.01):
+    """이벤트 루프 지연 측정 - sleep이 예정보다 늦게 깨어난 시간 기록"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+
+class BlockingRedisAdapter:
+    """기존 동기 redis.Redis 동작 재현 - await 가능하지만 호출 중 이벤트 루프를 막음"""
+
+    def __init__(self, client: redis.Redis):
+        self._client = client
+
+    async def __call__(self, *args, **kwargs):
+        client = kwargs.get("client")
+        if isinstance(client, BlockingPipelineAdapter):
+            kwargs["client"] = client.pipe      # 파이프라인에 쌓을 때는 원본 파이프라인 전달
+        return self._client(*args, **kwargs)    # 등록된 Lua 스크립트 실행
+
+    def register_script(self, source: str):
+        return BlockingRedisAdapter(self._client.register_script(source))
+
+    def pipeline(self, *args, **kwargs):
+        return BlockingPipelineAdapter(self._client.pipeline(*args, **kwargs))
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        async def blocking_call(*args, **kwargs):
+            return attr(*args, **kwargs)    # 동기 호출 -> 응답이 올 때까지 루프 정지
+
+        return blocking_call
+
+
+class BlockingPipelineAdapter:
+    """동기 파이프라인 - 명령은 그대로 쌓고 execute만 await 가능하게 감쌈"""
+
+    def __init__(self, pipe):
+        self.pipe = pipe
+
+    def __getattr__(self, name):
+        return getattr(self.pipe, name)
+
+    async def execute(self):
+        return self.pipe.execute()
+
+
+def install_client(kind: str):
+    """main 모듈의 Redis 클라이언트를 벤치마크 대상 클라이언트로 교체"""
+    if kind == "sync":
+        client = BlockingRedisAdapter(redis.Redis(
+            host=main.REDIS_HOST,
+            port=main.REDIS_PORT,
+            db=main.REDIS_DB,
+            decode_responses=True,
+            socket_connect_timeout=main.REDIS_CONNECT_TIMEOUT,
+            socket_timeout=main.REDIS_SOCKET_TIMEOUT
+        ))
+    else:
+        client = main.create_redis_client()
+
+    main.redis_client = client
+    main.session_manager.redis = client
+    return client
+
+
+async def setup_client(kind: str):
+    """클라이언트 교체 후 벤치마크 DB 초기화 및 Lua 스크립트 적재"""
+    client = install_client(kind)
+    await client.flushdb()
+    await main.session_manager.load_scripts()
+    main.login_limiter.enabled = False                  # 반복 로그인 시나리오가 속도 제한에 걸리지 않도록 (login-flood 제외)
+    return client
+
+
+async def register_users(usernames: List[str], password: str, name: str = "벤치"):
+    """사용자 저장소에 벤치마크 사용자 등록 (해시는 한 번만 계산해 공유)"""
+    password_hash = await main.password_hasher.hash(password)
+    for username in usernames:
+        await main.user_store.put(username, name, False, password_hash)
+
+
+async def bench_login_heartbeat(args):
+    """WebSocket heartbeat 트래픽 중 /api/auth/login 지연 시간 측정"""
+    client = await setup_client(args.client)
+
+    # heartbeat를 보낼 사용자 세션 준비
+    heartbeat_sessions = []
+    for i in range(args.connections):
+        session_id = f"hb-{i}"
+        await main.session_manager.create_session(f"hb_user{i}", session_id)
+        heartbeat_sessions.append(session_id)
+
+    # 로그인 대상 사용자 등록
+    await register_users([f"bench{i}" for i in range(args.concurrency)], "benchpass")
+
+    stop = asyncio.Event()
+
+    heartbeat_count = 0
+    redis_round_trips = 0
+
+    async def heartbeat(session_id: str):
+        nonlocal heartbeat_count, redis_round_trips
+        while not stop.is_set():
+            if args.heartbeat_mode == "buffered":
+                main.activity_buffer.record(session_id)                     # 메모리에만 기록
+            else:
+                await main.session_manager.update_session_activity(session_id)
+                redis_round_trips += 1
+            heartbeat_count += 1
+            await asyncio.sleep(args.heartbeat_interval)
+
+    async def flush_loop():
+        nonlocal redis_round_trips
+        while not stop.is_set():
+            await asyncio.sleep(main.activity_buffer.flush_interval)
+            if main.activity_buffer._pending:
+                await main.activity_buffer.flush()
+                redis_round_trips += 1                                      # 배치당 파이프라인 1회
+
+    async def login_worker(index: int, latencies: List[float]):
+        while not stop.is_set():
+            started = time.perf_counter()
+            await main.login(username=f"bench{index}", password="benchpass")
+            latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0)    # 동기 클라이언트는 양보 지점이 없으므로 명시적으로 양보
+
+    latencies: List[float] = []
+    loop_lag: List[float] = []
+    lag_task = asyncio.create_task(measure_loop_lag(stop, loop_lag))
+    heartbeat_tasks = [asyncio.create_task(heartbeat(sid)) for sid in heartbeat_sessions]
+    if args.heartbeat_mode == "buffered":
+        main.activity_buffer.flush_interval = args.flush_interval
+        heartbeat_tasks.append(asyncio.create_task(flush_loop()))
+    started = time.perf_counter()
+    login_tasks = [asyncio.create_task(login_worker(i, latencies)) for i in range(args.concurrency)]
+
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*login_tasks, *heartbeat_tasks, lag_task)
+    elapsed = time.perf_counter() - started
+
+    print_report(
+        f"login-heartbeat ({args.client}/{args.heartbeat_mode}, heartbeat {args.connections}개, 동시 로그인 {args.concurrency}개)",
+        latencies,
+        elapsed,
+        heartbeat=f"{heartbeat_count / elapsed:.1f} /s",
+        heartbeat_ops=f"{redis_round_trips / elapsed:.1f} Redis 왕복/s",
+        loop_lag_p99=f"{percentile(loop_lag, 99) * 1000:.2f} ms"
+    )
+    await client.flushdb()
+
+
+async def bench_duplicate_login(args):
+    """동일 사용자 동시 로그인 N개 실행 후 세션이 정확히 하나만 남는지 검증"""
+    client = await setup_client(args.client)
+    await register_users(["race_user"], "racepass", "경합")
+
+    async def timed_login(latencies: List[float]) -> str:
+        started = time.perf_counter()
+        response = await main.login(username="race_user", password="racepass")
+        latencies.append(time.perf_counter() - started)
+        return response["session_id"]
+
+    latencies: List[float] = []
+    failures = 0
+    started = time.perf_counter()
+
+    for _ in range(args.rounds):
+        session_ids = await asyncio.gather(*(timed_login(latencies) for _ in range(args.concurrency)))
+
+        current = await client.get("user_session:race_user")
+        surviving = [sid for sid in session_ids if await client.exists(f"session:{sid}")]
+        members = await client.smembers("active_sessions")
+
+        if surviving != [current] or members != {"race_user"}:
+            failures += 1
+
+    elapsed = time.perf_counter() - started
+    print_report(
+        f"duplicate-login ({args.client}, 동시 로그인 {args.concurrency}개 x {args.rounds}회)",
+        latencies,
+        elapsed,
+        검증=f"{args.rounds - failures}/{args.rounds} 통과 (세션 1개 유지)"
+    )
+    await client.flushdb()
+
+    if failures:
+        raise SystemExit(1)
+
+
+async def legacy_cleanup(client, session_ttl: int) -> int:
+    """기존 O(N) 정리 방식 재현 - 활성 목록 전체 순회 + 사용자별 GET 2회"""
+    cleaned_count = 0
+    current_time = time.time()
+    for username in list(await client.smembers("active_sessions")):
+        session_id = await client.get(f"user_session:{username}")
+        if session_id:
+            last_activity = await client.hget(f"session:{session_id}", "last_activity")
+            if last_activity and current_time - float(last_activity) > session_ttl:
+                await main.session_manager.remove_session(username, session_id)
+                cleaned_count += 1
+    return cleaned_count
+
+
+async def bench_cleanup_sweep(args):
+    """합성 세션 N개에 대한 만료 세션 정리(sweep) 시간 측정"""
+    client = await setup_client(args.client)
+    ttl = main.session_manager.session_ttl
+    now = time.time()
+    expired_total = int(args.sessions * args.expired_ratio)
+
+    # 합성 세션 적재 - 만료된 세션은 키가 이미 TTL로 사라지고 활성 목록/인덱스에만 남은 상태
+    for start in range(0, args.sessions, 5000):
+        pipe = client.pipeline(transaction=False)
+        for i in range(start, min(start + 5000, args.sessions)):
+            username = f"sweep_user{i}"
+            expired = i < expired_total
+            last_activity = now - ttl - 60 if expired else now
+            if not expired:
+                session_id = f"sweep-{i}"
+                pipe.hset(f"session:{session_id}", mapping={"username": username, "session_id": session_id,
+                                                           "created_at": last_activity, "last_activity": last_activity})
+                pipe.expire(f"session:{session_id}", ttl)
+                pipe.setex(f"user_session:{username}", ttl, session_id)
+            pipe.sadd("active_sessions", username)
+            pipe.zadd("session_expiry", {username: last_activity})
+        await pipe.execute()
+
+    started = time.perf_counter()
+    if args.mode == "scan":
+        cleaned = await legacy_cleanup(client, ttl)
+    else:
+        cleaned = await main.session_manager.cleanup_expired_sessions()
+    elapsed = time.perf_counter() - started
+
+    remaining = await client.scard("active_sessions")
+    print(f"\n[cleanup-sweep ({args.mode}, 세션 {args.sessions}개, 만료 {expired_total}개)]")
+    print(f"  sweep 시간  : {elapsed * 1000:.1f} ms")
+    print(f"  정리된 세션 : {cleaned}")
+    print(f"  남은 활성 목록: {remaining} (기대값 {args.sessions - expired_total})")
+    record(
+        f"cleanup-sweep ({args.mode}, 세션 {args.sessions}개, 만료 {expired_total}개)",
+        sweep_ms=elapsed * 1000,
+        reaped_per_s=cleaned / elapsed,
+        leftover=abs(remaining - (args.sessions - expired_total))     # 정리 누락/과잉 (0이 정상)
+    )
+    await client.flushdb()
+
+
+async def legacy_active_sessions(client) -> list:
+    """기존 활성 세션 목록 재구성 방식 재현 - SMEMBERS + 사용자별 GET + 세션 조회 (2N+1 왕복)"""
+    session_details = []
+    for username in await client.smembers("active_sessions"):
+        session_id = await client.get(f"user_session:{username}")
+        if session_id:
+            session_data = await main.session_manager.get_session(session_id)
+            if session_data:
+                session_details.append({"username": username, "session_id": session_id,
+                                        "connected_at": session_data.get("created_at"),
+                                        "last_activity": session_data.get("last_activity")})
+    return session_details
+
+
+async def bench_active_sessions(args):
+    """활성 세션 N개에서 목록 조회 시간 - 기존 재구성 vs 뷰 전체 페이지 순회 vs 304 vs 변경분"""
+    client = await setup_client("async")
+    manager = main.session_manager
+    replace = manager._script(main.REPLACE_SESSION_SCRIPT)
+
+    # 세션 적재 (로그인과 같은 스크립트 사용 -> 뷰도 함께 갱신)
+    for start in range(0, args.sessions, 2000):
+        pipe = client.pipeline(transaction=False)
+        for i in range(start, min(start + 2000, args.sessions)):
+            await replace(keys=[f"user_session:view_user{i}", "active_sessions", "session_expiry", "revoked_sessions",
+                                f"session:view-session-{i}", *main.ACTIVE_VIEW_KEYS],
+                          args=[f"view_user{i}", f"view-session-{i}", manager.session_ttl, time.time(),
+                                main.revocations.retention, main.revocations.channel], client=pipe)
+        await pipe.execute()
+
+    async def call(**params):
+        response = main.Response()
+        params.setdefault("cursor", 0)
+        params.setdefault("limit", 1000)
+        params.setdefault("since", None)
+        params.setdefault("if_none_match", None)
+        return response, await main.get_active_sessions(response, **params)
+
+    print(f"\n[active-sessions (세션 {args.sessions}개)]")
+
+    started = time.perf_counter()
+    legacy = await legacy_active_sessions(client)
+    legacy_elapsed = time.perf_counter() - started
+    print(f"  기존 재구성 (2N+1 왕복):     {legacy_elapsed * 1000:10.1f} ms ({len(legacy)}개)")
+
+    started = time.perf_counter()
+    response, page = await call()
+    first_page = time.perf_counter() - started
+    fetched, etag = len(page["sessions"]), response.headers["ETag"]
+    while page["next_cursor"]:
+        _, page = await call(cursor=page["next_cursor"])
+        fetched += len(page["sessions"])
+    all_pages = time.perf_counter() - started
+    print(f"  뷰 첫 페이지 (1000개):       {first_page * 1000:10.1f} ms")
+    print(f"  뷰 전체 페이지 순회:         {all_pages * 1000:10.1f} ms ({fetched}개, 중복 포함 가능)")
+
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        not_modified = await call(if_none_match=etag)
+    not_modified_elapsed = (time.perf_counter() - started) / args.rounds
+    print(f"  변경 없음 (304):             {not_modified_elapsed * 1000:10.2f} ms "
+          f"(status {not_modified[1].status_code})")
+
+    version = await manager.get_active_view_version()
+    for i in range(100):                                       # 100명 재로그인/로그아웃
+        if i % 2:
+            await manager.replace_session(f"view_user{i}", f"view-session-{i}-2")
+        else:
+            await manager.remove_session(f"view_user{i}")
+    started = time.perf_counter()
+    _, delta = await call(since=version)
+    delta_elapsed = time.perf_counter() - started
+    print(f"  변경분 (100건):              {delta_elapsed * 1000:10.2f} ms "
+          f"(변경 {len(delta['changes'])}개, 삭제 {len(delta['removed'])}개)")
+    record(
+        f"active-sessions (세션 {args.sessions}개)",
+        legacy_ms=legacy_elapsed * 1000,
+        first_page_ms=first_page * 1000,
+        all_pages_ms=all_pages * 1000,
+        not_modified_ms=not_modified_elapsed * 1000,
+        delta_ms=delta_elapsed * 1000
+    )
+
+    await client.flushdb()
+
+
+async def bench_users(args):
+    """사용자 디렉터리 N명에서 /api/users 응답 시간 - 기존 사용자별 EXISTS vs 페이지 단위 MGET"""
+    client = await setup_client("async")
+    manager = main.session_manager
+
+    # 합성 디렉터리 + 일부 사용자만 로그인 상태 (--expired-ratio 비율은 비활성)
+    directory = [f"dir_user{i:06d}" for i in range(args.sessions)]
+    await register_users(directory, "x", "사용자")
+    active_total = int(args.sessions * (1 - args.expired_ratio))
+    for start in range(0, active_total, 5000):
+        pipe = client.pipeline(transaction=False)
+        for i in range(start, min(start + 5000, active_total)):
+            pipe.setex(f"user_session:dir_user{i * args.sessions // max(1, active_total):06d}", 3600, f"dir-session-{i}")
+        await pipe.execute()
+
+    print(f"\n[users (디렉터리 {len(directory)}명, 활성 {active_total}명)]")
+
+    started = time.perf_counter()
+    legacy = [await manager.is_user_active(username) for username in directory]
+    print(f"  기존 전체 조회 (사용자별 EXISTS):  {(time.perf_counter() - started) * 1000:10.1f} ms ({sum(legacy)}명 활성)")
+
+    for label, active in (("전체", None), ("활성만", True), ("비활성만", False)):
+        started = time.perf_counter()
+        page = await main.get_users(cursor=None, limit=100, active=active)
+        print(f"  첫 페이지 100명 ({label:4}):            {(time.perf_counter() - started) * 1000:10.2f} ms ({len(page['users'])}명)")
+
+    started = time.perf_counter()
+    cursor, pages, found = None, 0, 0
+    while True:
+        page = await main.get_users(cursor=cursor, limit=100, active=True)
+        pages += 1
+        found += len(page["users"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    print(f"  활성 사용자 전체 순회:              {(time.perf_counter() - started) * 1000:10.1f} ms ({pages}페이지, {found}명)")
+
+    await client.flushdb()
+
+
+def start_worker(port: int, env: dict = None, extra_args: List[str] = (), log_file=None) -> subprocess.Popen:
+    """uvicorn 워커 프로세스 실행 (벤치마크 DB 사용, 로그인 속도 제한 기본 해제, log_file이 있으면 출력 저장)"""
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", *extra_args],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, "LOGIN_RATE_LIMIT": "off", **(env or {})},
+        stdout=log_file,
+        stderr=log_file
+    )
+
+
+def process_cpu_seconds(pid: int) -> float:
+    """프로세스 누적 CPU 시간 (user + system, Linux /proc 기준)"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def process_rss_bytes(pid: int, field: str = "VmRSS") -> int:
+    """프로세스 메모리 사용량 (VmRSS: 현재, VmHWM: 최대, Linux /proc 기준)"""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def wait_until_ready(port: int, timeout: float = 15.0):
+    """워커가 HTTP 요청을 받을 수 있을 때까지 대기"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"워커 {port} 시작 실패")
+
+
+def http_login(port: int, username: str, password: str) -> dict:
+    """HTTP 로그인 요청 (폼 데이터)"""
+    body = urllib.parse.urlencode({"username": username, "password": password}).encode()
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/auth/login", data=body, timeout=10) as response:
+        return json.loads(response.read())
+
+
+async def bench_force_logout(args):
+    """워커 A에 연결된 소켓이 워커 B의 중복 로그인으로 강제 로그아웃되기까지의 시간 측정"""
+    import websockets
+
+    client = await setup_client("async")
+    ports = [args.port, args.port + 1]
+    workers = [start_worker(port) for port in ports]
+    latencies: List[float] = []
+    missed = 0
+
+    try:
+        for port in ports:
+            await asyncio.to_thread(wait_until_ready, port)
+
+        started_all = time.perf_counter()
+        for _ in range(args.rounds):
+            # 1. 워커 A에서 로그인 후 WebSocket 연결
+            first = await asyncio.to_thread(http_login, ports[0], "user2", "password2")
+            async with websockets.connect(f"ws://127.0.0.1:{ports[0]}/ws/user2?token={first['access_token']}") as ws:
+                await ws.recv()                                     # connection_established
+
+                # 2. 워커 B에서 같은 사용자로 로그인 -> 워커 A 소켓에 force_logout 도착까지 측정
+                started = time.perf_counter()
+                await asyncio.to_thread(http_login, ports[1], "user2", "password2")
+                try:
+                    while json.loads(await asyncio.wait_for(ws.recv(), timeout=5)).get("type") != "force_logout":
+                        pass
+                    latencies.append(time.perf_counter() - started)
+                except (asyncio.TimeoutError, websockets.ConnectionClosed):
+                    missed += 1
+
+        print_report(
+            f"force-logout (워커 2개, {args.rounds}회)",
+            latencies,
+            time.perf_counter() - started_all,
+            미수신=f"{missed}회"
+        )
+
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.wait()
+        await client.flushdb()
+
+
+async def bench_idle_cpu(args):
+    """유휴 연결 유지 비용 - 워커 프로세스의 CPU 사용량 측정 (legacy: 텍스트 ping/pong + wait_for, protocol: ping 프레임 + 타이머 휠)"""
+    import websockets
+
+    client = await setup_client("async")
+    worker = start_worker(
+        args.port,
+        env={"WS_KEEPALIVE_MODE": args.keepalive},
+        extra_args=["--ws", "websockets",
+                    "--ws-ping-interval", str(main.WS_PING_INTERVAL), "--ws-ping-timeout", str(main.WS_PING_TIMEOUT)]
+    )
+    sockets = []
+    keepalive_tasks = []
+
+    async def open_socket(index: int, semaphore: asyncio.Semaphore):
+        user_id = f"idle_user{index}"
+        token = main.create_access_token(user_id, f"idle-session-{index}")
+        async with semaphore:
+            ws = await websockets.connect(f"ws://127.0.0.1:{args.port}/ws/{user_id}?token={token}", ping_interval=None)
+            await ws.recv()                                     # connection_established
+        return ws
+
+    async def keepalive(ws):
+        """프론트엔드 동작 재현 - legacy는 ping 후 pong 대기, protocol은 응답 없는 heartbeat만 전송"""
+        await asyncio.sleep(random.uniform(0, args.heartbeat_interval))
+        while True:
+            if args.keepalive == "legacy":
+                await ws.send("ping")
+                await ws.recv()
+            else:
+                await ws.send("heartbeat")
+            await asyncio.sleep(args.heartbeat_interval)
+
+    try:
+        await asyncio.to_thread(wait_until_ready, args.port)
+        rss_before = process_rss_bytes(worker.pid)
+        semaphore = asyncio.Semaphore(50)
+        sockets = await asyncio.gather(*(open_socket(i, semaphore) for i in range(args.connections)))
+        keepalive_tasks = [asyncio.create_task(keepalive(ws)) for ws in sockets]
+        await asyncio.sleep(1.0)                                # 연결 직후 처리 안정화
+        rss_per_connection = (process_rss_bytes(worker.pid) - rss_before) / args.connections
+
+        cpu_started = process_cpu_seconds(worker.pid)
+        await asyncio.sleep(args.duration)
+        cpu_used = process_cpu_seconds(worker.pid) - cpu_started
+
+        per_10k = cpu_used / args.duration * 1000 * 10_000 / args.connections
+        print(f"\n[idle-cpu (keepalive {args.keepalive}, 연결 {args.connections}개, heartbeat {args.heartbeat_interval}s, {args.duration}s)]")
+        print(f"  워커 CPU 사용 시간:        {cpu_used:8.2f} s")
+        print(f"  워커 CPU 사용률:           {cpu_used / args.duration * 100:8.2f} %")
+        print(f"  10k 연결당 CPU:            {per_10k:8.2f} ms/s")
+        print(f"  연결당 워커 RSS:           {rss_per_connection:8.0f} bytes")
+        record(
+            f"idle-cpu (keepalive {args.keepalive}, 연결 {args.connections}개, heartbeat {args.heartbeat_interval}s)",
+            worker_cpu_percent=cpu_used / args.duration * 100,
+            cpu_ms_per_s_per_10k=per_10k,
+            rss_bytes_per_connection=rss_per_connection
+        )
+
+    finally:
+        for task in keepalive_tasks:
+            task.cancel()
+        await asyncio.gather(*(ws.close() for ws in sockets), return_exceptions=True)
+        worker.terminate()
+        worker.wait()
+        await client.flushdb()
+
+
+async def bench_handshake(args):
+    """재연결 폭주 시 WebSocket 핸드셰이크 처리량 - 검증된 토큰 캐시 사용/미사용 비교"""
+    import websockets
+
+    client = await setup_client("async")
+    cache_size = str(main.TOKEN_CACHE_SIZE) if args.token_cache == "on" else "0"
+    tokens = {f"hs_user{i}": main.create_access_token(f"hs_user{i}", f"hs-session-{i}") for i in range(args.connections)}
+
+    # 1. 프로세스 내 verify_token 처리량 (같은 토큰 집합을 rounds번 반복 검증)
+    main.token_cache = main.VerifiedTokenCache(int(cache_size), main.TOKEN_CACHE_TTL)
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        for token in tokens.values():
+            main.verify_token(token)
+    elapsed = time.perf_counter() - started
+    verified = args.rounds * len(tokens)
+
+    # 2. 워커 프로세스 대상 재연결 폭주 (연결 -> connection_established 수신 -> 종료 반복)
+    worker = start_worker(args.port, env={"TOKEN_CACHE_SIZE": cache_size})
+    latencies: List[float] = []
+    try:
+        await asyncio.to_thread(wait_until_ready, args.port)
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def handshake(user_id: str, token: str):
+            async with semaphore:
+                started = time.perf_counter()
+                async with websockets.connect(f"ws://127.0.0.1:{args.port}/ws/{user_id}?token={token}", ping_interval=None) as ws:
+                    await ws.recv()                             # connection_established
+                    latencies.append(time.perf_counter() - started)
+
+        started_all = time.perf_counter()
+        for _ in range(args.rounds):
+            await asyncio.gather(*(handshake(user_id, token) for user_id, token in tokens.items()))
+
+        print(f"\n[verify_token (토큰 캐시 {args.token_cache}, 토큰 {len(tokens)}개 x {args.rounds}회)]")
+        print(f"  처리량      : {verified / elapsed:.0f} verifications/s")
+        print_report(
+            f"handshake (토큰 캐시 {args.token_cache}, 연결 {len(tokens)}개 x {args.rounds}회, 동시 {args.concurrency})",
+            latencies,
+            time.perf_counter() - started_all
+        )
+
+    finally:
+        worker.terminate()
+        worker.wait()
+        await client.flushdb()
+
+
+def peak_rate(timestamps: List[float], window: float = 1.0) -> float:
+    """window초 구간 안에 들어온 최대 이벤트 수 -> 초당 환산"""
+    ordered = sorted(timestamps)
+    best, start = 0, 0
+    for end, timestamp in enumerate(ordered):
+        while timestamp - ordered[start] > window:
+            start += 1
+        best = max(best, end - start + 1)
+    return best / window
+
+
+async def bench_drain(args):
+    """배포 시 재접속 폭주 - 기존 워커를 연결 정리(SIGUSR1) 후 종료 vs 바로 종료(SIGTERM)했을 때 새 워커의 최대 핸드셰이크 처리량"""
+    import signal
+    import websockets
+
+    client = await setup_client("async")
+    tokens = {}
+    for i in range(args.connections):
+        await main.session_manager.replace_session(f"drain_user{i}", f"drain-session-{i}")
+        tokens[f"drain_user{i}"] = main.create_access_token(f"drain_user{i}", f"drain-session-{i}")
+
+    env = {"WS_RECONNECT_WINDOW": str(args.reconnect_window)}
+    old = start_worker(args.port, env=env, extra_args=["--ws", "websockets"])
+    new = start_worker(args.port + 1, env=env, extra_args=["--ws", "websockets"])  # 교체될 새 워커 (미리 실행)
+    reconnected: List[float] = []                                   # 새 워커 연결 완료 시각
+    latencies: List[float] = []
+    hinted, ready = 0, 0
+    stop = asyncio.Event()
+    tasks = []
+
+    async def client_session(user_id: str, token: str, connected: asyncio.Semaphore):
+        """LoginForm 동작 재현 - 재접속 안내가 있으면 안내받은 시간 뒤, 없으면 바로 새 워커로 재접속"""
+        nonlocal hinted, ready
+        async with connected:
+            ws = await websockets.connect(f"ws://127.0.0.1:{args.port}/ws/{user_id}?token={token}", ping_interval=None)
+            await ws.recv()                                         # connection_established
+            ready += 1
+        delay = 0.0
+        try:
+            async for frame in ws:
+                message = json.loads(frame)
+                if message.get("type") == "reconnect":
+                    delay = message["retry_after_ms"] / 1000
+                    hinted += 1
+        except websockets.ConnectionClosed:
+            pass
+
+        await asyncio.sleep(delay)
+        started = time.perf_counter()
+        async with websockets.connect(f"ws://127.0.0.1:{args.port + 1}/ws/{user_id}?token={token}", ping_interval=None,
+                                      open_timeout=60) as ws:
+            await ws.recv()
+            reconnected.append(time.perf_counter())
+            latencies.append(time.perf_counter() - started)
+            await stop.wait()                                       # 새 워커에 연결을 유지 (연결 등록 비용 포함)
+
+    try:
+        await asyncio.to_thread(wait_until_ready, args.port)
+        await asyncio.to_thread(wait_until_ready, args.port + 1)
+        connected = asyncio.Semaphore(50)
+        tasks = [asyncio.create_task(client_session(user_id, token, connected)) for user_id, token in tokens.items()]
+        while ready < args.connections:
+            await asyncio.sleep(0.1)                                # 모든 클라이언트가 기존 워커에 연결될 때까지 대기
+
+        cpu_started = process_cpu_seconds(new.pid)
+        started = time.perf_counter()
+        old.send_signal(signal.SIGUSR1 if args.drain == "on" else signal.SIGTERM)
+        while len(reconnected) < args.connections:
+            if time.perf_counter() - started > args.reconnect_window + 120:
+                raise RuntimeError(f"재접속 미완료 ({len(reconnected)}/{args.connections})")
+            await asyncio.sleep(0.1)
+        elapsed = time.perf_counter() - started
+        cpu_used = process_cpu_seconds(new.pid) - cpu_started
+
+        title = f"drain (연결 정리 {args.drain}, 연결 {args.connections}개, 재접속 분산 {args.reconnect_window}s)"
+        print(f"\n[{title}]")
+        print(f"  전체 재접속 완료:          {elapsed:8.2f} s (재접속 안내 {hinted}개)")
+        print(f"  새 워커 최대 핸드셰이크:   {peak_rate(reconnected, 1.0):8.0f} /s (1초 구간), {peak_rate(reconnected, 0.1):8.0f} /s (100ms 구간)")
+        print(f"  새 워커 CPU 사용 시간:     {cpu_used:8.2f} s")
+        print_report(f"새 워커 재접속 핸드셰이크 (연결 정리 {args.drain})", latencies, elapsed)
+        record(title, peak_handshakes_1s=peak_rate(reconnected, 1.0), peak_handshakes_100ms=peak_rate(reconnected, 0.1),
+               reconnect_s=elapsed, handshake_p99_ms=percentile(latencies, 99) * 1000)
+
+    finally:
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for worker in (old, new):
+            worker.terminate()
+            worker.wait()
+        await client.flushdb()
+
+
+def http_admin_status(port: int, token: str) -> int:
+    """관리자 인증 경로 호출 -> HTTP 상태 코드 (200: 토큰 유효, 401: 폐기/만료)"""
+    body = urllib.parse.urlencode({"message": "revocation-probe", "topic": "revocation-probe"}).encode()
+    request = urllib.request.Request(f"http://127.0.0.1:{port}/api/admin/broadcast", data=body,
+                                     headers={"Authorization": f"Bearer {token}"})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+async def bench_revocation(args):
+    """세션 폐기 전파 지연 (워커 A 재로그인 -> 워커 B가 이전 토큰 거부) 및 폐기 여부 확인 비용"""
+    client = await setup_client("async")
+
+    # 1. 확인 비용: 로컬 폐기 목록 조회 vs 요청마다 Redis 조회
+    revocations = main.SessionRevocationList(main.session_manager)
+    for i in range(args.sessions):
+        revocations.add(f"revoked-{i}")
+    probes = [f"revoked-{i}" if i % 2 else f"active-{i}" for i in range(100_000)]
+
+    started = time.perf_counter()
+    for session_id in probes:
+        revocations.is_revoked(session_id)
+    local_cost = (time.perf_counter() - started) / len(probes)
+
+    started = time.perf_counter()
+    for session_id in probes[:2000]:
+        await client.exists(f"session:{session_id}")
+    redis_cost = (time.perf_counter() - started) / 2000
+
+    print(f"\n[revocation check (폐기 세션 {args.sessions}개)]")
+    print(f"  로컬 폐기 목록 조회:    {local_cost * 1e9:10.0f} ns/check")
+    print(f"  Redis EXISTS 조회:      {redis_cost * 1e9:10.0f} ns/check")
+
+    # 2. 전파 지연: 워커 B가 캐시해 둔 토큰이 워커 A의 재로그인 후 거부되기까지의 시간
+    ports = [args.port, args.port + 1]
+    workers = [start_worker(port) for port in ports]
+    latencies: List[float] = []
+    missed = 0
+    try:
+        for port in ports:
+            await asyncio.to_thread(wait_until_ready, port)
+
+        started_all = time.perf_counter()
+        for _ in range(args.rounds):
+            token = (await asyncio.to_thread(http_login, ports[0], "user1", "password1"))["access_token"]
+            if await asyncio.to_thread(http_admin_status, ports[1], token) != 200:     # 워커 B에서 검증/캐시
+                missed += 1
+                continue
+
+            await asyncio.to_thread(http_login, ports[0], "user1", "password1")       # 이전 세션 폐기
+            revoked_at = time.perf_counter()
+            while await asyncio.to_thread(http_admin_status, ports[1], token) == 200:
+                if time.perf_counter() - revoked_at > 5:
+                    missed += 1
+                    break
+            else:
+                latencies.append(time.perf_counter() - revoked_at)
+
+        print_report(
+            f"revocation propagation (워커 2개, {args.rounds}회, 거부 확인 요청 시간 포함)",
+            latencies,
+            time.perf_counter() - started_all,
+            미전파=f"{missed}회"
+        )
+
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.wait()
+        await client.flushdb()
+
+
+async def http_get_keepalive(reader, writer, path: str) -> int:
+    """keep-alive 연결로 GET 요청 후 응답 본문까지 읽음 -> 상태 코드"""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def http_post_form(port: int, path: str, fields: dict) -> int:
+    """폼 POST 요청 (연결당 1회) -> 상태 코드"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = urllib.parse.urlencode(fields).encode()
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/x-www-form-urlencoded\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    await reader.read()                                         # 응답 끝까지 읽고 종료
+    writer.close()
+    return status
+
+
+async def bench_login_storm(args):
+    """로그인 폭주(잘못된 비밀번호) 중 로그인 처리량과 WebSocket ping 응답 시간 - 해시 스레드 풀 vs 이벤트 루프 직접 계산"""
+    import websockets
+
+    client = await setup_client("async")
+    worker = start_worker(args.port, env={"PASSWORD_HASH_WORKERS": str(args.hash_workers)})
+    mode = f"스레드 {args.hash_workers}개" if args.hash_workers else "이벤트 루프 직접 계산"
+    statuses: dict = {}
+    ping_latencies: List[float] = []
+    stop = asyncio.Event()
+
+    async def storm():
+        while not stop.is_set():
+            try:
+                status = await http_post_form(args.port, "/api/auth/login", {"username": "user2", "password": "wrong"})
+            except OSError:
+                status = "error"
+            statuses[status] = statuses.get(status, 0) + 1
+
+    async def measure_pings(ws):
+        """ping 프레임 왕복 시간 - 워커 이벤트 루프가 막히면 pong이 늦어짐"""
+        while not stop.is_set():
+            started = time.perf_counter()
+            await (await ws.ping())
+            ping_latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.05)
+
+    try:
+        await asyncio.to_thread(wait_until_ready, args.port)
+        token = (await asyncio.to_thread(http_login, args.port, "user1", "password1"))["access_token"]
+        async with websockets.connect(f"ws://127.0.0.1:{args.port}/ws/user1?token={token}", ping_interval=None) as ws:
+            await ws.recv()                                     # connection_established
+            cpu_started = process_cpu_seconds(worker.pid)
+            tasks = [asyncio.create_task(storm()) for _ in range(args.concurrency)]
+            tasks.append(asyncio.create_task(measure_pings(ws)))
+            await asyncio.sleep(args.duration)
+            stop.set()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            cpu_used = process_cpu_seconds(worker.pid) - cpu_started
+
+        verified = statuses.get(401, 0)
+        print(f"\n[login-storm ({mode}, 동시 {args.concurrency}, {args.duration}s)]")
+        print(f"  비밀번호 검증:      {verified / args.duration:8.1f} /s (401 {verified}건)")
+        print(f"  용량 초과 거절:     {statuses.get(429, 0):8d} 건 (429)")
+        print(f"  기타 응답:          {dict((k, v) for k, v in statuses.items() if k not in (401, 429))}")
+        print(f"  워커 CPU 사용률:    {cpu_used / args.duration * 100:8.1f} %")
+        record(f"login-storm ({mode}, 동시 {args.concurrency})", verifications_per_s=verified / args.duration,
+               worker_cpu_percent=cpu_used / args.duration * 100)
+        print_report("WebSocket ping 왕복 시간", ping_latencies, args.duration)
+
+    finally:
+        worker.terminate()
+        worker.wait()
+        await client.flushdb()
+
+
+async def bench_session_backend(args):
+    """세션 작업별 지연 시간 - Redis 백엔드 vs 메모리 세션 저장소 (Redis 장애 시 대체 경로)"""
+    client = await setup_client("async")
+    manager = main.session_manager
+    operations = {
+        "replace_session": lambda i: manager.replace_session(f"backend_user{i}", f"backend-session-{i}"),
+        "get_session": lambda i: manager.get_session(f"backend-session-{i}"),
+        "update_activity": lambda i: manager.update_session_activity(f"backend-session-{i}"),
+        "is_user_active": lambda i: manager.is_user_active(f"backend_user{i}"),
+        "remove_session": lambda i: manager.remove_session(f"backend_user{i}")
+    }
+
+    print(f"\n[session-backend (세션 {args.sessions}개, 작업별 p50 / p99)]")
+    print(f"  {'작업':<18}{'redis':>24}{'memory':>24}")
+    results = {}
+    for backend in ("redis", "memory"):
+        manager.redis = client if backend == "redis" else None
+        for name, operation in operations.items():
+            latencies = []
+            for i in range(args.sessions):
+                started = time.perf_counter()
+                await operation(i)
+                latencies.append(time.perf_counter() - started)
+            results[backend, name] = latencies
+
+    for name in operations:
+        row = "".join(
+            f"{percentile(results[backend, name], 50) * 1e6:10.1f} / {percentile(results[backend, name], 99) * 1e6:8.1f} us"
+            for backend in ("redis", "memory")
+        )
+        print(f"  {name:<18}{row}")
+
+    manager.redis = client
+    await client.flushdb()
+
+
+class StallingRedisProxy:
+    """Redis 앞단 TCP 프록시 - stalled 동안 응답을 전달하지 않아 멈춘 Redis를 재현"""
+
+    def __init__(self, target_port: int):
+        self.target_port = target_port
+        self.stalled = False
+        self.server = None
+        self.writers = set()
+        self.handlers = set()
+
+    async def start(self, port: int):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", port)
+
+    async def _handle(self, client_reader, client_writer):
+        upstream_reader, upstream_writer = await asyncio.open_connection(main.REDIS_HOST, self.target_port)
+        self.writers.update((client_writer, upstream_writer))
+        self.handlers.add(asyncio.current_task())
+
+        async def forward(reader, writer, stall: bool):
+            try:
+                while data := await reader.read(65536):
+                    while stall and self.stalled:               # 멈춘 동안 응답 보류
+                        await asyncio.sleep(0.01)
+                    writer.write(data)
+                    await writer.drain()
+            except OSError:
+                pass
+            finally:
+                writer.close()
+
+        await asyncio.gather(
+            forward(client_reader, upstream_writer, False),
+            forward(upstream_reader, client_writer, True)
+        )
+
+    async def close(self):
+        """남은 연결을 모두 닫아 중계 태스크가 스스로 끝나도록 한 뒤 서버 종료"""
+        self.stalled = False
+        for writer in self.writers:
+            writer.close()
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+        self.server.close()
+
+
+async def bench_redis_stall(args):
+    """Redis가 멈춘 동안 세션 조회/활동 갱신 요청 지연 시간 - 회로 차단기 사용/미사용 비교"""
+    proxy = StallingRedisProxy(main.REDIS_PORT)
+    await proxy.start(args.port)
+    main.REDIS_PORT = args.port                                  # main의 클라이언트가 프록시를 거치도록
+    client = await setup_client("async")
+    main.redis_breaker.enabled = args.breaker == "on"
+    manager = main.session_manager
+
+    session_ids = [f"stall-session-{i}" for i in range(args.concurrency)]
+    for i, session_id in enumerate(session_ids):
+        await manager.create_session(f"stall_user{i}", session_id)
+
+    phase = "정상"
+    phases = {name: {"latencies": [], "errors": 0} for name in ("정상", "Redis 멈춤", "복구 후")}
+    stop = asyncio.Event()
+
+    async def request_loop(session_id: str):
+        """세션 조회 + 활동 갱신 = 요청 1회 (heartbeat/토큰 검증 경로)"""
+        while not stop.is_set():
+            started = time.perf_counter()
+            current = phases[phase]
+            session = await manager.get_session(session_id)
+            touched = await manager.update_session_activity(session_id)
+            current["latencies"].append(time.perf_counter() - started)
+            if session is None or not touched:
+                current["errors"] += 1
+            await asyncio.sleep(0.05)
+
+    tasks = [asyncio.create_task(request_loop(session_id)) for session_id in session_ids]
+    await asyncio.sleep(3)
+    phase, proxy.stalled = "Redis 멈춤", True
+    await asyncio.sleep(args.duration)
+    phase, proxy.stalled = "복구 후", False
+    await asyncio.sleep(main.redis_breaker.reset_timeout + 3)  # 시험 호출로 차단 해제될 때까지
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    print(f"\n[redis-stall (회로 차단기 {args.breaker}, 동시 {args.concurrency}, 멈춤 {args.duration}s, 호출 제한 {main.REDIS_CALL_TIMEOUT}s)]")
+    for name, result in phases.items():
+        latencies = result["latencies"]
+        print(f"  {name:<10}: 요청 {len(latencies):6d}, 실패 {result['errors']:6d}, "
+              f"p50 {percentile(latencies, 50) * 1000:8.2f} ms, p99 {percentile(latencies, 99) * 1000:8.2f} ms, "
+              f"max {max(latencies, default=0) * 1000:8.2f} ms")
+    print(f"  회로 차단기 : {main.redis_breaker.stats()}")
+
+    await client.flushdb()
+    await proxy.close()
+
+
+async def bench_metrics_overhead(args):
+    """지표 기록 비용 - 기록 1회당 시간, heartbeat 처리/Redis 호출에 더해지는 시간, /metrics 출력 시간"""
+    client = await setup_client("async")
+    registry = main.MetricsRegistry()
+    counter = registry.counter("bench_total", "벤치마크 카운터")
+    labelled = registry.counter("bench_labelled_total", "벤치마크 카운터 (레이블)", ("op",))
+    histogram = registry.histogram("bench_seconds", "벤치마크 히스토그램", ("op",))
+    null = main.NullMetric()
+
+    def per_op_ns(func) -> float:
+        """호출 1회당 시간 (ns, 빈 호출 시간 제외)"""
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            func()
+        return (time.perf_counter() - started) / args.iterations * 1e9
+
+    def heartbeat():
+        main.websocket_heartbeats.inc()
+        main.activity_buffer.record("bench-session")
+
+    empty = per_op_ns(lambda: None)
+    print(f"\n[metrics-overhead (기록 {args.iterations}회, Redis 호출 {args.requests}회)]")
+    print(f"  counter.inc()                   : {per_op_ns(counter.inc) - empty:8.1f} ns")
+    print(f"  counter.labels(op).inc()        : {per_op_ns(lambda: labelled.labels('get').inc()) - empty:8.1f} ns")
+    print(f"  histogram.labels(op).observe()  : {per_op_ns(lambda: histogram.labels('get').observe(0.0003)) - empty:8.1f} ns")
+    print(f"  지표 off (NullMetric)           : {per_op_ns(lambda: null.labels('get').observe(0.0003)) - empty:8.1f} ns")
+
+    on = {name: getattr(main, name) for name in ("websocket_heartbeats", "redis_command_duration", "redis_command_errors")}
+
+    def toggle(enabled: bool):
+        for name, metric in on.items():
+            setattr(main, name, metric if enabled else null)
+
+    heartbeat_ns = {}
+    redis_us = {True: [], False: []}
+    await client.set("bench:metrics", "1")
+    for enabled in (True, False):
+        toggle(enabled)
+        heartbeat_ns[enabled] = per_op_ns(heartbeat) - empty
+    for round_index in range(10):                               # on/off를 번갈아 측정해 Redis 지연 변동 영향 완화
+        for enabled in (True, False):
+            toggle(enabled)
+            started = time.perf_counter()
+            for _ in range(args.requests // 10):
+                await main.redis_breaker.call(client.get, "bench:metrics")
+            redis_us[enabled].append((time.perf_counter() - started) / (args.requests // 10) * 1e6)
+    toggle(True)
+
+    print(f"  heartbeat 처리 (on / off)       : {heartbeat_ns[True]:8.1f} / {heartbeat_ns[False]:8.1f} ns")
+    print(f"  Redis GET 1회 (on / off)        : {percentile(redis_us[True], 50):8.1f} / {percentile(redis_us[False], 50):8.1f} us")
+
+    started = time.perf_counter()
+    body = main.metrics.render()
+    print(f"  /metrics 출력                   : {(time.perf_counter() - started) * 1000:8.2f} ms ({len(body.splitlines())}줄)")
+
+    await client.flushdb()
+
+
+async def bench_log_throughput(args):
+    """WebSocket 메시지 처리량과 워커 CPU - 로그 방식별 (sync: 메시지마다 바로 출력, async: 큐 + 샘플링 + JSON, off)"""
+    import tempfile
+    import websockets
+
+    client = await setup_client("async")
+    env = {
+        "sync": {"LOG_ASYNC": "off", "LOG_FORMAT": "text", "LOG_SAMPLE_RATES": ""},      # 기존 방식: 모든 메시지를 이벤트 루프에서 출력
+        "async": {"LOG_ASYNC": "on", "LOG_FORMAT": "json"},                             # 기본 샘플링 비율 적용
+        "off": {"LOG_LEVEL": "WARNING"}
+    }[args.logging]
+    env["WS_MAX_CONNECTIONS_PER_USER"] = str(args.connections + 10)
+
+    with tempfile.TemporaryFile() as log_file:
+        worker = start_worker(args.port, env=env, log_file=log_file)
+        try:
+            await asyncio.to_thread(wait_until_ready, args.port)
+            token = (await asyncio.to_thread(http_login, args.port, "user1", "password1"))["access_token"]
+            sockets = [
+                await websockets.connect(f"ws://127.0.0.1:{args.port}/ws/user1?token={token}", ping_interval=None)
+                for _ in range(args.connections)
+            ]
+            for ws in sockets:
+                await ws.recv()                                     # connection_established
+
+            async def sender(ws):
+                """메시지를 보낸 뒤 ping으로 워커가 모두 처리했는지 확인"""
+                for i in range(args.messages):
+                    await ws.send(f"chat message {i}")
+                await ws.send("ping")
+                while await ws.recv() != "pong":
+                    pass
+
+            cpu_started = process_cpu_seconds(worker.pid)
+            started = time.perf_counter()
+            await asyncio.gather(*(sender(ws) for ws in sockets))
+            elapsed = time.perf_counter() - started
+            cpu_used = process_cpu_seconds(worker.pid) - cpu_started
+            await asyncio.gather(*(ws.close() for ws in sockets))
+            total = args.connections * args.messages
+
+            print(f"\n[log-throughput ({args.logging}, 연결 {args.connections}개 x 메시지 {args.messages}개)]")
+            print(f"  처리량          : {total / elapsed:10.0f} msgs/s")
+            print(f"  워커 CPU        : {cpu_used / total * 1e6:10.1f} us/메시지")
+            print(f"  로그 출력량     : {log_file.tell() / 1024:10.1f} KiB")
+
+        finally:
+            worker.terminate()
+            worker.wait()
+            await client.flushdb()
+
+
+async def bench_login_flood(args):
+    """크리덴셜 스터핑 폭주 - 로그인 속도 제한의 거절 처리량과 Redis 왕복 수 (로컬 사전 필터 사용/미사용)"""
+    from fastapi import HTTPException
+
+    await setup_client("async")
+    limiter = main.LoginRateLimiter(main.session_manager, local_size=main.LOGIN_LIMITER_LOCAL_SIZE)
+    prefilter = args.prefilter == "on"
+    outcomes = {"allowed": 0, "rejected": 0}
+    remaining = args.requests
+
+    if not prefilter:                                           # 사전 필터 미사용: 모든 시도가 Redis 스크립트까지 감
+        limiter._take_local = lambda keys, now: 0.0
+        limiter._remember = lambda table, key, value: None
+
+    async def attacker(index: int):
+        """공격자 IP 하나가 사용자 목록을 돌며 로그인 시도"""
+        nonlocal remaining
+        ip = f"10.0.{index // 256}.{index % 256}"
+        while remaining > 0:
+            remaining -= 1
+            try:
+                await limiter.check(f"victim{random.randrange(args.victims)}", ip)
+                outcomes["allowed"] += 1
+            except HTTPException:
+                outcomes["rejected"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(attacker(i) for i in range(args.attackers)))
+    elapsed = time.perf_counter() - started
+    script_calls = outcomes["allowed"] + limiter.rejected_remote    # 로컬에서 거절되지 않은 시도만 Redis 스크립트 실행
+
+    print(f"\n[login-flood (사전 필터 {args.prefilter}, 시도 {args.requests}회, 공격자 IP {args.attackers}개, 대상 사용자 {args.victims}명)]")
+    print(f"  처리량      : {args.requests / elapsed:.0f} checks/s")
+    print(f"  허용 / 거절 : {outcomes['allowed']} / {outcomes['rejected']}")
+    print(f"  Redis 왕복  : {script_calls} 회 (시도당 {script_calls / args.requests:.3f})")
+    print(f"  로컬 거절   : {limiter.rejected_local}, Redis 거절: {limiter.rejected_remote}")
+
+    await main.redis_client.flushdb()
+
+
+async def bench_session_push(args):
+    """관리자 대시보드 N개 - 세션 변경 스트림(push) vs 활성 세션 폴링(poll)의 워커 CPU 사용량"""
+    import websockets
+
+    client = await setup_client("async")
+    worker = start_worker(args.port, env={"WS_MAX_CONNECTIONS_PER_USER": str(args.dashboards + 10)})
+    received = 0
+    tasks = []
+    sockets = []
+
+    async def dashboard_push(token: str):
+        nonlocal received
+        ws = await websockets.connect(f"ws://127.0.0.1:{args.port}/ws/user1?token={token}", ping_interval=None)
+        sockets.append(ws)
+        await ws.recv()                                             # connection_established
+        await ws.send(json.dumps({"type": "subscribe", "topic": "sessions"}))
+        async for _ in ws:
+            received += 1
+
+    async def dashboard_poll():
+        nonlocal received
+        reader, writer = await asyncio.open_connection("127.0.0.1", args.port)
+        await asyncio.sleep(random.uniform(0, args.poll_interval))
+        while True:
+            await http_get_keepalive(reader, writer, "/api/auth/active-sessions")
+            received += 1
+            await asyncio.sleep(args.poll_interval)
+
+    async def churn():
+        """초당 --churn 회 로그인(세션 교체) 발생"""
+        while True:
+            user = f"churn_user{random.randrange(args.sessions)}"
+            await main.session_manager.replace_session(user, f"{user}-{time.time()}")
+            await asyncio.sleep(1 / args.churn)
+
+    try:
+        await asyncio.to_thread(wait_until_ready, args.port)
+        for i in range(args.sessions):
+            await main.session_manager.replace_session(f"churn_user{i}", f"churn_user{i}-0")
+
+        if args.delivery == "push":
+            token = (await asyncio.to_thread(http_login, args.port, "user1", "password1"))["access_token"]
+            tasks = [asyncio.create_task(dashboard_push(token)) for _ in range(args.dashboards)]
+        else:
+            tasks = [asyncio.create_task(dashboard_poll()) for _ in range(args.dashboards)]
+        await asyncio.sleep(3.0)                                    # 연결/구독 안정화
+        tasks.append(asyncio.create_task(churn()))
+
+        received = 0
+        cpu_started = process_cpu_seconds(worker.pid)
+        await asyncio.sleep(args.duration)
+        cpu_used = process_cpu_seconds(worker.pid) - cpu_started
+
+        print(f"\n[session-push ({args.delivery}, 대시보드 {args.dashboards}개, 세션 {args.sessions}개, 변경 {args.churn}/s, {args.duration}s)]")
+        print(f"  워커 CPU 사용 시간:   {cpu_used:8.2f} s ({cpu_used / args.duration * 100:.1f} %)")
+        print(f"  수신 프레임/응답 수:  {received:8d}")
+        record(
+            f"session-push ({args.delivery}, 대시보드 {args.dashboards}개, 세션 {args.sessions}개, 변경 {args.churn}/s)",
+            worker_cpu_percent=cpu_used / args.duration * 100
+        )
+
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*(ws.close() for ws in sockets), return_exceptions=True)
+        worker.terminate()
+        worker.wait()
+        await client.flushdb()
+
+
+class FakeWebSocket:
+    """전송/종료를 흉내 내는 가짜 소켓 - stalled=True이면 응답 없는 클라이언트처럼 멈춤"""
+
+    def __init__(self, stalled: bool = False):
+        self.stalled = stalled
+        self.sent = 0
+
+    async def _wait(self):
+        if self.stalled:
+            await asyncio.Event().wait()        # 영원히 대기 (TCP 버퍼가 가득 찬 클라이언트)
+
+    async def send_text(self, text: str):
+        await self._wait()
+        self.sent += 1
+
+    async def send_bytes(self, data: bytes):
+        await self._wait()
+        self.sent += 1
+
+    async def send_json(self, data: dict):
+        await self.send_text(json.dumps(data))
+
+    async def close(self, code: int = 1000, reason: str = None):
+        await self._wait()
+
+
+async def bench_stalled_fanout(args):
+    """응답 없는 소켓이 섞여 있을 때 중복 로그인(강제 로그아웃 전송 + 연결 종료) 지연 시간 측정"""
+    await setup_client("async")
+    main.websocket_manager.send_timeout = args.send_timeout
+    await register_users(["fanout_user"], "fanoutpass", "팬아웃")
+    await main.login(username="fanout_user", password="fanoutpass")
+
+    latencies: List[float] = []
+    started_all = time.perf_counter()
+    for _ in range(args.rounds):
+        # 정상 소켓 + 멈춘 소켓을 연결 목록에 직접 등록 (사용자당 연결 수 제한 우회)
+        sockets = {FakeWebSocket() for _ in range(args.connections)}
+        sockets |= {FakeWebSocket(stalled=True) for _ in range(args.stalled)}
+        for websocket in sockets:
+            main.websocket_manager._register(websocket, "fanout_user")
+
+        started = time.perf_counter()
+        await main.login(username="fanout_user", password="fanoutpass")
+        latencies.append(time.perf_counter() - started)
+
+    print_report(
+        f"stalled-fanout (정상 {args.connections}개 + 멈춘 소켓 {args.stalled}개, 기한 {args.send_timeout}s)",
+        latencies,
+        time.perf_counter() - started_all
+    )
+    reset_connections()
+    await main.redis_client.flushdb()
+
+
+def register_sockets(sockets: dict):
+    """가짜 소켓을 연결 목록에 직접 등록 (송신 큐 writer 포함)"""
+    for user_id, websocket in sockets.items():
+        main.websocket_manager._register(websocket, user_id)
+
+
+async def wait_drained(sockets, timeout: float = 60.0):
+    """지정한 소켓들의 송신 큐가 모두 비워질 때까지 대기"""
+    connections = [main.websocket_manager.connections[ws] for ws in sockets if ws in main.websocket_manager.connections]
+    deadline = time.perf_counter() + timeout
+    while any(connection.queue for connection in connections) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.001)
+
+
+def reset_connections():
+    """등록된 연결과 writer Task 정리"""
+    manager = main.websocket_manager
+    for connection in manager.connections.values():
+        connection.task.cancel()
+    manager.connections.clear()
+    manager.user_connections.clear()
+    manager.topic_subscribers.clear()
+    for slot in main.idle_reaper.wheel:
+        slot.clear()
+    manager.dropped_total = 0
+    manager.overflow_disconnects = 0
+
+
+async def bench_broadcast(args):
+    """연결 수별 브로드캐스트 처리량 측정 (가짜 소켓 사용)"""
+    await setup_client("async")
+    manager = main.websocket_manager
+
+    print(f"\n[broadcast (메시지 {args.messages}개, 송신 큐 {manager.outbox_size}개/연결)]")
+    for size in (int(value) for value in args.sizes.split(",")):
+        sockets = {f"bcast_user{i}": FakeWebSocket() for i in range(size)}
+        register_sockets(sockets)
+
+        started = time.perf_counter()
+        for i in range(args.messages):
+            await manager.broadcast({"type": "broadcast", "message": f"공지 {i}", "timestamp": time.time()})
+        enqueued = time.perf_counter() - started
+        await wait_drained(sockets.values())                    # 실제 전송 완료까지 포함
+        elapsed = time.perf_counter() - started
+
+        delivered = sum(ws.sent for ws in sockets.values())
+        print(f"  연결 {size:>6}개: 적재 {enqueued * 1000:8.1f}ms, 전송 완료 {elapsed * 1000:8.1f}ms, "
+              f"{delivered / elapsed:12.0f} deliveries/s")
+        record(f"broadcast (연결 {size}개, 메시지 {args.messages}개)", enqueue_ms=enqueued * 1000, deliveries_per_s=delivered / elapsed)
+        reset_connections()
+
+    await main.redis_client.flushdb()
+
+
+async def bench_slow_consumer(args):
+    """멈춘 소켓이 섞인 상태에서 대량 브로드캐스트 시 송신 큐 상한/정책 동작 확인"""
+    await setup_client("async")
+    manager = main.websocket_manager
+    manager.outbox_policy = args.policy
+    manager.send_timeout = args.send_timeout
+
+    healthy = {f"healthy_user{i}": FakeWebSocket() for i in range(args.connections)}
+    stalled = {f"stalled_user{i}": FakeWebSocket(stalled=True) for i in range(args.stalled)}
+    register_sockets(healthy)
+    register_sockets(stalled)
+
+    message_types = ["broadcast", "session_update", "presence"]
+    started = time.perf_counter()
+    for i in range(args.messages):
+        await manager.broadcast({"type": message_types[i % len(message_types)], "seq": i})
+        await asyncio.sleep(0)                                  # 정상 소켓 writer가 따라올 수 있도록 양보
+    elapsed = time.perf_counter() - started
+    await wait_drained(healthy.values())
+
+    stats = manager.get_queue_stats()
+    stalled_depth = max((len(manager.connections[ws].queue) for ws in stalled.values() if ws in manager.connections), default=0)
+    print(f"\n[slow-consumer (정책 {args.policy}, 정상 {args.connections}개 + 멈춘 소켓 {args.stalled}개, 메시지 {args.messages}개)]")
+    print(f"  브로드캐스트 적재:        {args.messages / elapsed:10.1f} messages/s")
+    print(f"  정상 소켓 평균 수신:      {sum(ws.sent for ws in healthy.values()) / max(1, len(healthy)):10.1f} 개")
+    print(f"  멈춘 소켓 최대 큐 깊이:   {stalled_depth:10d} (상한 {manager.outbox_size})")
+    print(f"  버려진 메시지:            {stats['dropped']:10d}")
+    print(f"  큐 초과로 종료된 연결:    {stats['overflow_disconnects']:10d}")
+
+    reset_connections()
+    await main.redis_client.flushdb()
+
+
+async def bench_connection_memory(args):
+    """연결 N개를 등록했을 때 연결당 메모리 (연결 레코드 + 색인 + 송신 큐 + writer Task + 유휴 추적, 가짜 소켓 제외)"""
+    import tracemalloc
+
+    manager = main.websocket_manager
+    sockets = [FakeWebSocket() for _ in range(args.connections)]
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    before = tracemalloc.get_traced_memory()[0]
+    for i, websocket in enumerate(sockets):
+        connection = manager._register(websocket, f"mem_user{i % (args.connections // 2 or 1)}")    # 사용자당 연결 2개
+        main.idle_reaper.track(connection)
+    await asyncio.sleep(0)                                      # writer Task가 첫 대기 지점까지 실행
+    registered = tracemalloc.get_traced_memory()[0]
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+
+    print(f"\n[connection-memory (연결 {args.connections}개, 사용자 {args.connections // 2}명)]")
+    print(f"  전체 증가량    : {(registered - before) / 1024 / 1024:10.1f} MiB")
+    print(f"  연결당         : {(registered - before) / args.connections:10.0f} bytes")
+    print(f"  등록 시간      : {elapsed * 1000:10.1f} ms")
+    record(f"connection-memory (연결 {args.connections}개)", bytes_per_connection=(registered - before) / args.connections,
+           register_ms=elapsed * 1000)
+
+    reset_connections()
+    await asyncio.sleep(0)
+
+
+async def bench_session_cache(args):
+    """세션 읽기 지연 시간 - 워커 로컬 세션 캐시 on/off, 다른 노드에서 지운 세션이 캐시에서 사라지기까지의 시간"""
+    client = await setup_client("async")
+    manager = main.session_manager
+    cache = main.session_cache
+    users = [f"cache_user{i:06d}" for i in range(args.sessions)]
+    for i, username in enumerate(users):
+        await manager.replace_session(username, f"cache-session-{i}")
+    await register_users(users, "x", "사용자")
+
+    listener = None
+    if args.cache == "on":
+        cache.max_size = max(cache.max_size, args.sessions * 2)     # 세션/사용자 키를 모두 담을 수 있는 크기
+        listener = asyncio.create_task(cache.listen())
+        while not cache.subscribed:
+            await asyncio.sleep(0.01)
+
+    print(f"\n[session-cache (캐시 {args.cache}, 세션 {args.sessions}개, 읽기 {args.reads}회)]")
+    rng = random.Random(1)
+    latencies = []
+    started_all = time.perf_counter()
+    for _ in range(args.reads):
+        i = rng.randrange(args.sessions)
+        started = time.perf_counter()
+        if i % 2:
+            await manager.get_session(f"cache-session-{i}")
+        else:
+            await manager.is_user_active(users[i])
+        latencies.append(time.perf_counter() - started)
+    print_report("get_session / is_user_active", latencies, time.perf_counter() - started_all)
+
+    latencies = []
+    started_all = time.perf_counter()
+    for _ in range(max(1, args.reads // 100)):
+        started = time.perf_counter()
+        await main.get_users(cursor=None, limit=100, active=None)   # 첫 페이지 100명 + 활성 상태
+        latencies.append(time.perf_counter() - started)
+    print_report("/api/users 첫 페이지", latencies, time.perf_counter() - started_all)
+
+    if listener is not None:
+        # 다른 노드가 세션을 지운 상황 - 별도 클라이언트로 삭제 후 이 워커의 조회 결과가 바뀔 때까지 측정
+        other = main.create_redis_client()
+        lags, stale_reads = [], 0
+        for username in users[:args.rounds]:
+            await manager.is_user_active(username)                  # 캐시 적재
+            started = time.perf_counter()
+            await other.delete(f"user_session:{username}")
+            while await manager.is_user_active(username):
+                stale_reads += 1
+                await asyncio.sleep(0)
+            lags.append(time.perf_counter() - started)
+        await other.aclose()
+
+        print_report("무효화 지연 (다른 노드 삭제 -> 로컬 반영)", lags, sum(lags))
+        print(f"  오래된 값 읽기 (삭제당):  {stale_reads / max(1, len(lags)):8.1f} 회")
+        print(f"  캐시 지표:                {cache.stats()}")
+
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+        cache.max_size = main.SESSION_CACHE_SIZE
+
+    await client.flushdb()
+
+
+def codec_samples(sessions: int) -> dict:
+    """코덱 비교용 대표 메시지 - 작은 세션 알림, 공지, 큰 활성 세션 페이지"""
+    now = time.time()
+    return {
+        "session_update": {
+            "type": "session_update",
+            "event": "login",
+            "username": "user1",
+            "session_id": "0f8fad5b-d9cb-469f-a165-70867728950e",
+            "timestamp": now
+        },
+        "broadcast": {
+            "type": "broadcast",
+            "topic": None,
+            "message": "서버 점검 안내: 오늘 밤 11시부터 30분간 접속이 원활하지 않을 수 있습니다. " * 4,
+            "sender": "user1",
+            "timestamp": now
+        },
+        "active_sessions": {
+            "type": "active_sessions",
+            "sessions": [
+                {
+                    "username": f"user{i:06d}",
+                    "session_id": f"session-{i:06d}-0f8fad5b-d9cb-469f",
+                    "created_at": now - i,
+                    "last_activity": now - i / 2
+                }
+                for i in range(sessions)
+            ],
+            "next_cursor": str(sessions),
+            "version": 12345
+        }
+    }
+
+
+def time_per_call(fn, budget: float = 0.2) -> float:
+    """budget 시간 동안 fn을 반복 호출 -> 1회당 평균 시간 (초)"""
+    calls, started = 0, time.perf_counter()
+    while True:
+        for _ in range(10):
+            fn()
+        calls += 10
+        elapsed = time.perf_counter() - started
+        if elapsed >= budget:
+            return elapsed / calls
+
+
+async def bench_codec(args):
+    """메시지 종류별 코덱 비교 - 인코딩/디코딩 시간, 크기, deflate 후 크기"""
+    codecs = [main.JsonCodec()]
+    if main.orjson is not None:
+        codecs.append(main.OrjsonCodec())
+    else:
+        print("orjson 미설치 - pip install orjson 후 비교 가능")
+    if main.msgpack is not None:
+        codecs.append(main.MsgpackCodec())
+    else:
+        print("msgpack 미설치 - pip install msgpack 후 비교 가능")
+
+    for sample_name, message in codec_samples(args.sessions).items():
+        print(f"\n[{sample_name}]")
+        print(f"  {'코덱':<14}{'인코딩 us':>12}{'디코딩 us':>12}{'크기 B':>10}{'deflate B':>12}")
+        for codec in codecs:
+            encoded = codec.dumps(message)
+            raw = encoded.encode() if isinstance(encoded, str) else encoded
+            compressor = zlib.compressobj(wbits=-15)            # permessage-deflate와 같은 raw deflate (컨텍스트 유지 없음)
+            deflated = compressor.compress(raw) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            encode_us = time_per_call(lambda: codec.dumps(message)) * 1e6
+            decode_us = time_per_call(lambda: codec.loads(encoded)) * 1e6
+            label = type(codec).__name__.replace("Codec", "").lower()
+            print(f"  {label:<14}{encode_us:>12.1f}{decode_us:>12.1f}{len(raw):>10}{len(deflated):>12}")
+
+
+async def bench_ws_codec(args):
+    """워커 프로세스 대상 공지 팬아웃 - WebSocket 코덱(json/msgpack)과 permessage-deflate 조합별 CPU/전송량"""
+    import websockets
+
+    client = await setup_client("async")
+    users = [f"codec_user{i}" for i in range(args.connections)]
+    tokens = {user_id: main.create_access_token(user_id, f"codec-session-{i}") for i, user_id in enumerate(users)}
+    for i, user_id in enumerate(users):
+        await main.session_manager.replace_session(user_id, f"codec-session-{i}")
+    codec = main.MsgpackCodec() if args.codec == "msgpack" else main.JsonCodec()
+    if args.codec == "msgpack" and main.msgpack is None:
+        print("msgpack 미설치 - pip install msgpack 후 실행")
+        return
+
+    worker = start_worker(
+        args.port,
+        env={"WS_CODECS": args.codec},
+        extra_args=["--ws", "websockets", "--ws-per-message-deflate", "true" if args.deflate == "on" else "false"]
+    )
+    received = 0
+    wire_bytes = [0]                                            # 클라이언트가 소켓에서 받은 바이트 (압축된 프레임 기준)
+
+    def count_wire_bytes(ws):
+        data_received = ws.data_received
+
+        def counting(data: bytes):
+            wire_bytes[0] += len(data)
+            data_received(data)
+        ws.data_received = counting
+
+    try:
+        await asyncio.to_thread(wait_until_ready, args.port)
+        admin_token = (await asyncio.to_thread(http_login, args.port, "user1", "password1"))["access_token"]
+        sockets = []
+        for user_id, token in tokens.items():
+            ws = await websockets.connect(
+                f"ws://127.0.0.1:{args.port}/ws/{user_id}?token={token}",
+                subprotocols=[args.codec],
+                compression="deflate" if args.deflate == "on" else None,
+                ping_interval=None,
+                max_queue=None
+            )
+            codec.loads(await ws.recv())                        # connection_established (협상된 코덱으로 수신)
+            count_wire_bytes(ws)
+            sockets.append(ws)
+        negotiated = sockets[0].subprotocol or "json"
+        done = asyncio.Event()
+
+        async def reader(ws):
+            nonlocal received
+            async for frame in ws:
+                if codec.loads(frame).get("type") == "broadcast":
+                    received += 1
+                    if received == args.connections * args.messages:
+                        done.set()
+
+        readers = [asyncio.create_task(reader(ws)) for ws in sockets]
+        # 공지마다 다른 문장 (같은 본문을 반복하면 deflate 컨텍스트 덕분에 비현실적으로 작아짐)
+        rng = random.Random(1)
+        words = ["서버", "점검", "안내", "오늘", "오후", "접속", "지연", "예정", "완료", "update", "notice", "session", "10분", "30분"]
+
+        def make_body() -> bytes:
+            message = ""
+            while len(message.encode()) < args.payload:
+                message += f"{rng.choice(words)} {rng.randrange(10000)} "
+            return urllib.parse.urlencode({"message": message}).encode()
+
+        bodies = [make_body() for _ in range(args.messages)]
+
+        def post_broadcasts():
+            for body in bodies:
+                request = urllib.request.Request(f"http://127.0.0.1:{args.port}/api/admin/broadcast", data=body,
+                                                 headers={"Authorization": f"Bearer {admin_token}"})
+                urllib.request.urlopen(request, timeout=10).read()
+
+        cpu_before, wire_bytes[0] = process_cpu_seconds(worker.pid), 0
+        started = time.perf_counter()
+        await asyncio.to_thread(post_broadcasts)
+        await asyncio.wait_for(done.wait(), timeout=120)
+        elapsed = time.perf_counter() - started
+        cpu = process_cpu_seconds(worker.pid) - cpu_before
+        delivered = args.connections * args.messages
+
+        print(f"\n[ws-codec (코덱 {negotiated}, deflate {args.deflate}, 연결 {args.connections}개, 공지 {args.messages}건, 본문 {args.payload}B)]")
+        print(f"  전달                : {delivered} messages in {elapsed:.2f}s ({delivered / elapsed:.0f} msg/s)")
+        print(f"  워커 CPU            : {cpu:.2f}s ({cpu / delivered * 1e6:.1f} us/message)")
+        print(f"  전송량              : {wire_bytes[0] / delivered:.0f} B/message (WebSocket 프레임 헤더 포함)")
+        record(
+            f"ws-codec (코덱 {negotiated}, deflate {args.deflate}, 연결 {args.connections}개, 본문 {args.payload}B)",
+            messages_per_s=delivered / elapsed,
+            cpu_us_per_message=cpu / delivered * 1e6,
+            bytes_per_message=wire_bytes[0] / delivered
+        )
+
+        for task in readers:
+            task.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+        await asyncio.gather(*(ws.close() for ws in sockets), return_exceptions=True)
+
+    finally:
+        worker.terminate()
+        worker.wait()
+        await client.flushdb()
+
+
+# suite에서 실행할 시나리오와 고정 매개변수 (매개변수가 같아야 이전 결과와 비교 가능)
+SUITE = [
+    ("login-storm", {"concurrency": 50, "duration": 5.0, "hash_workers": 4}),
+    ("duplicate-login", {"concurrency": 50}),
+    ("cleanup-sweep", {"sessions": 20000, "expired_ratio": 0.5, "mode": "index"}),
+    ("force-logout", {"rounds": 20}),
+    ("idle-cpu", {"connections": 1000, "keepalive": "protocol", "heartbeat_interval": 5.0, "duration": 10.0}),
+    ("active-sessions", {"sessions": 10000, "rounds": 20}),
+    ("session-push", {"delivery": "poll", "dashboards": 50, "poll_interval": 2.0, "sessions": 1000, "duration": 10.0}),
+    ("broadcast", {"sizes": "1000,10000", "messages": 20}),
+    ("connection-memory", {"connections": 10000}),
+]
+
+
+async def bench_suite(args):
+    """로그인/중복 로그인/유휴 연결/활성 세션 폴링 등 기본 시나리오를 고정 매개변수로 차례로 실행"""
+    for name, overrides in SUITE:
+        print(f"\n===== {name} =====")
+        await run_scenario(name, argparse.Namespace(**{**vars(args), **overrides}))
+
+
+async def run_scenario(name: str, args):
+    """시나리오 실행 + 벤치마크 프로세스의 이벤트 루프 지연/RSS 기록 (프로세스 내 시나리오는 앱 핸들러 지연이 그대로 반영됨)"""
+    stop = asyncio.Event()
+    lags: List[float] = []
+    sampler = asyncio.create_task(measure_loop_lag(stop, lags))
+    started = time.perf_counter()
+    await SCENARIOS[name](args)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await sampler
+
+    rss = process_rss_bytes(os.getpid())
+    print(f"\n  [{name}] 이벤트 루프 지연 p50 {percentile(lags, 50) * 1000:.2f} ms / p99 {percentile(lags, 99) * 1000:.2f} ms / "
+          f"max {max(lags, default=0) * 1000:.2f} ms, 벤치마크 프로세스 RSS {rss / 1024 / 1024:.1f} MiB")
+    record(
+        f"{name} (벤치마크 프로세스)",
+        elapsed_s=elapsed,
+        loop_lag_p50_ms=percentile(lags, 50) * 1000,
+        loop_lag_p99_ms=percentile(lags, 99) * 1000,
+        loop_lag_max_ms=max(lags, default=0) * 1000,
+        rss_bytes=rss
+    )
+
+
+def use_memory_redis():
+    """fakeredis TCP 서버를 벤치마크 프로세스의 스레드로 실행하고 main 모듈/워커 프로세스가 이 서버를 사용하도록 설정"""
+    try:
+        from fakeredis import TcpFakeServer
+    except ImportError:
+        sys.exit("--redis memory에는 fakeredis가 필요합니다: pip install 'fakeredis[lua]'")
+
+    server = TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+    server.daemon_threads = True                                # 연결별 처리 스레드가 종료를 막지 않도록
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+
+    # fakeredis는 CONFIG GET을 지원하지 않음 -> 키 공간 알림을 미리 설정하고 시작 시 CONFIG 호출 생략
+    redis.Redis(host=host, port=port).config_set("notify-keyspace-events", main.SESSION_CACHE_KEYSPACE_EVENTS)
+    main.REDIS_HOST, main.REDIS_PORT = host, port
+    main.SESSION_CACHE_NOTIFY_CONFIG = False
+    os.environ.update({"REDIS_HOST": host, "REDIS_PORT": str(port), "SESSION_CACHE_NOTIFY_CONFIG": "off"})
+
+
+def git_revision():
+    """현재 커밋 해시 (git 저장소가 아니면 None)"""
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, timeout=5)
+    except OSError:
+        return None
+    return output.stdout.strip() or None
+
+
+def write_results(path: str, args):
+    """측정 결과를 JSON 파일로 저장 (실행 환경 정보 포함)"""
+    document = {
+        "scenario": args.scenario,
+        "args": vars(args),
+        "redis": args.redis,
+        "git_revision": git_revision(),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": results
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {path} ({len(results)}개 항목)")
+
+
+def compare_results(path: str, threshold: float) -> int:
+    """이전 결과와 같은 이름/지표끼리 비교 -> threshold 비율 이상 나빠진 지표 수"""
+    with open(path) as f:
+        baseline = {item["name"]: item for item in json.load(f)["results"]}
+
+    regressions = 0
+    print(f"\n[이전 결과와 비교 ({path}, 기준 {threshold:.0%})]")
+    for item in results:
+        previous = baseline.get(item["name"])
+        if previous is None:
+            continue
+        for key, value in item.items():
+            before = previous.get(key)
+            if key == "name" or not isinstance(before, (int, float)) or not before:
+                continue
+            change = (value - before) / abs(before)
+            worse = -change if key.endswith("_per_s") else change       # 처리량은 줄어들면 악화
+            regressed = worse > threshold
+            regressions += regressed
+            print(f"  {'악화' if regressed else '    '} {item['name']} / {key}: {before:.4g} -> {value:.4g} ({change:+.1%})")
+    print(f"  악화된 지표: {regressions}개")
+    return regressions
+
+
+SCENARIOS = {
+    "login-heartbeat": bench_login_heartbeat,
+    "duplicate-login": bench_duplicate_login,
+    "cleanup-sweep": bench_cleanup_sweep,
+    "force-logout": bench_force_logout,
+    "stalled-fanout": bench_stalled_fanout,
+    "broadcast": bench_broadcast,
+    "slow-consumer": bench_slow_consumer,
+    "idle-cpu": bench_idle_cpu,
+    "handshake": bench_handshake,
+    "drain": bench_drain,
+    "revocation": bench_revocation,
+    "active-sessions": bench_active_sessions,
+    "session-push": bench_session_push,
+    "users": bench_users,
+    "login-storm": bench_login_storm,
+    "login-flood": bench_login_flood,
+    "session-backend": bench_session_backend,
+    "redis-stall": bench_redis_stall,
+    "metrics-overhead": bench_metrics_overhead,
+    "log-throughput": bench_log_throughput,
+    "connection-memory": bench_connection_memory,
+    "session-cache": bench_session_cache,
+    "codec": bench_codec,
+    "ws-codec": bench_ws_codec,
+    "suite": bench_suite,
+}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="WebSocket 로그인 시스템 벤치마크")
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--client", choices=["async", "sync"], default="async", help="Redis 클라이언트 종류")
+    parser.add_argument("--connections", type=int, default=500, help="heartbeat를 보내는 WebSocket 수")
+    parser.add_argument("--heartbeat-interval", type=float, default=0.5, help="heartbeat 간격 (초)")
+    parser.add_argument("--heartbeat-mode", choices=["buffered", "direct"], default="buffered",
+                        help="heartbeat 반영 방식 (buffered: 활동 버퍼 일괄 반영, direct: heartbeat마다 Redis 호출)")
+    parser.add_argument("--flush-interval", type=float, default=5.0, help="활동 버퍼 반영 주기 (초)")
+    parser.add_argument("--concurrency", type=int, default=10, help="동시 로그인 요청 수")
+    parser.add_argument("--duration", type=float, default=10.0, help="측정 시간 (초)")
+    parser.add_argument("--rounds", type=int, default=20, help="반복 횟수")
+    parser.add_argument("--sessions", type=int, default=100_000, help="합성 세션 수")
+    parser.add_argument("--expired-ratio", type=float, default=0.5, help="만료된 세션 비율")
+    parser.add_argument("--stalled", type=int, default=2, help="응답 없는 가짜 소켓 수 (stalled-fanout)")
+    parser.add_argument("--send-timeout", type=float, default=0.5, help="소켓별 전송 기한 (초)")
+    parser.add_argument("--sizes", default="1000,10000,50000", help="브로드캐스트 연결 수 목록 (쉼표 구분)")
+    parser.add_argument("--messages", type=int, default=20, help="브로드캐스트 메시지 수")
+    parser.add_argument("--keepalive", choices=["legacy", "protocol"], default="protocol",
+                        help="WebSocket keepalive 방식 (idle-cpu)")
+    parser.add_argument("--drain", choices=["on", "off"], default="on",
+                        help="기존 워커 종료 방식 (on: SIGUSR1 연결 정리 후 재접속 안내 / off: SIGTERM 즉시 종료, drain)")
+    parser.add_argument("--reconnect-window", type=float, default=10.0, help="재접속 분산 시간 (초, drain)")
+    parser.add_argument("--token-cache", choices=["on", "off"], default="on", help="검증된 토큰 캐시 사용 여부 (handshake)")
+    parser.add_argument("--delivery", choices=["push", "poll"], default="push", help="대시보드 갱신 방식 (session-push)")
+    parser.add_argument("--dashboards", type=int, default=1000, help="관리자 대시보드 수 (session-push)")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="대시보드 폴링 간격 (초, session-push)")
+    parser.add_argument("--churn", type=float, default=20.0, help="초당 세션 변경 수 (session-push)")
+    parser.add_argument("--policy", choices=["drop_oldest", "coalesce", "disconnect"], default="coalesce",
+                        help="송신 큐 초과 정책 (slow-consumer)")
+    parser.add_argument("--hash-workers", type=int, default=4, help="비밀번호 해시 스레드 수 (0: 이벤트 루프에서 직접 계산, login-storm)")
+    parser.add_argument("--requests", type=int, default=50_000, help="로그인 시도 수 (login-flood)")
+    parser.add_argument("--attackers", type=int, default=10, help="공격자 IP 수 (login-flood)")
+    parser.add_argument("--victims", type=int, default=100, help="공격 대상 사용자 수 (login-flood)")
+    parser.add_argument("--prefilter", choices=["on", "off"], default="on", help="로컬 사전 필터 사용 여부 (login-flood)")
+    parser.add_argument("--breaker", choices=["on", "off"], default="on", help="Redis 회로 차단기 사용 여부 (redis-stall)")
+    parser.add_argument("--logging", choices=["sync", "async", "off"], default="async", help="로그 방식 (log-throughput)")
+    parser.add_argument("--cache", choices=["on", "off"], default="on", help="워커 로컬 세션 캐시 사용 여부 (session-cache)")
+    parser.add_argument("--codec", choices=["json", "msgpack"], default="json", help="WebSocket 서브프로토콜 코덱 (ws-codec)")
+    parser.add_argument("--deflate", choices=["on", "off"], default="on", help="permessage-deflate 사용 여부 (ws-codec)")
+    parser.add_argument("--payload", type=int, default=512, help="공지 본문 크기 (바이트, ws-codec)")
+    parser.add_argument("--reads", type=int, default=20_000, help="세션 읽기 횟수 (session-cache)")
+    parser.add_argument("--iterations", type=int, default=1_000_000, help="지표 기록 반복 횟수 (metrics-overhead)")
+    parser.add_argument("--port", type=int, default=8101, help="워커 프로세스 시작 포트 (force-logout)")
+    parser.add_argument("--mode", choices=["index", "scan"], default="index", help="정리 방식 (index: ZSET, scan: 기존 전체 순회)")
+    parser.add_argument("--redis", choices=["local", "memory"], default="local",
+                        help="Redis 서버 (local: REDIS_HOST/REDIS_PORT의 redis-server, memory: 프로세스 내 fakeredis)")
+    parser.add_argument("--output", help="측정 결과를 저장할 JSON 파일 경로")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON 파일 (악화된 지표가 있으면 종료 코드 1)")
+    parser.add_argument("--regression-threshold", type=float, default=0.2, help="악화로 판단할 변화 비율 (--baseline)")
+    args = parser.parse_args()
+
+    if args.redis == "memory":
+        use_memory_redis()
+    asyncio.run(run_scenario(args.scenario, args))
+    if args.output:
+        write_results(args.output, args)
+    if args.baseline and compare_results(args.baseline, args.regression_threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -1,50 +1,444 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Form
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Form, Depends, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware             
-from fastapi.security import HTTPBearer
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import abc
 import asyncio
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
+import random
+import signal
 import time
 import uuid
 import json
-from typing import Dict, Set, Optional
+import math
+import bisect
+import hashlib
+import heapq
+import itertools
+import hmac
+import sqlite3
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, List, Set, Optional, Tuple, Union
 from datetime import datetime, timedelta
 import redis
+import redis.asyncio as aioredis
 import jwt
 
+try:
+    import orjson                                   # 선택 의존성 - 빠른 JSON 직렬화
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack                                  # 선택 의존성 - MessagePack 바이너리 프레임
+except ImportError:
+    msgpack = None
+
 # 웹소켓에 필요 라이브러리
 # fastapi: 웹 프레임워크 -> 웹 서버 구축 및 API 개발
 # fastapi.middleware.cors: CORS 설정 -> 다른 도메인에서의 요청 허용(백엔드 - 프론트엔드 통신)
 # fastapi.security: 보안 설정 -> 토큰 인증 및 권한 관리
 # asyncio: 비동기 프로그래밍 -> 비동기 작업 처리
-# redis: Redis 클라이언트 -> Redis 데이터베이스 연결 및 작업 처리
+# redis.asyncio: 비동기 Redis 클라이언트 -> 이벤트 루프를 막지 않고 Redis 작업 처리
+# orjson / msgpack (선택): 설치되어 있으면 JSON 직렬화 가속 / 바이너리 WebSocket 프레임 제공
+
+# 로깅 설정 (환경 변수로 조정 가능)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()                              # 로그 레벨
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")                                    # 출력 형식 (text / json)
+LOG_ASYNC = os.getenv("LOG_ASYNC", "on") != "off"                               # 큐 + 출력 스레드 사용 (off면 로그를 남긴 곳에서 바로 출력)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))                      # 출력 대기 최대 로그 수 (초과분은 버림)
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "ws.send=0.1,ws.message=0.01") # 이벤트별 기록 비율 (event=비율, 쉼표 구분 / 나머지는 전부 기록)
+LOG_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}    # extra가 아닌 기본 필드
+
+
+# JSON 로그 형식 - 한 줄에 로그 하나, extra로 넘긴 필드(event, user_id 등)를 그대로 포함
+class JsonLogFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in LOG_RECORD_FIELDS)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+# 비동기 로그 핸들러 - 이벤트 루프는 레코드를 큐에 넣기만 하고, 메시지 조립/포맷/출력은 출력 스레드(QueueListener)가 담당
+# 큐가 가득 차면 기다리지 않고 버림 (디스크가 느려도 이벤트 루프가 멈추지 않음)
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0                                    # 큐 초과로 버린 로그 수
+    
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record                                       # 기본 구현은 여기서 포맷하므로 그대로 넘김 (인자는 불변 값만 사용)
+    
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """"event=비율,..." 형식의 샘플링 설정 해석"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        event, _, rate = item.partition("=")
+        rates[event.strip()] = float(rate)
+    return rates
+
+
+def setup_logging() -> logging.Handler:
+    """루트 로거 설정 - 출력 형식 적용, 비동기 모드면 출력 스레드 시작 (종료 시 남은 로그 출력)"""
+    output = logging.StreamHandler()
+    output.setFormatter(JsonLogFormatter() if LOG_FORMAT == "json" else logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    
+    handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE)) if LOG_ASYNC else output
+    logging.basicConfig(level=LOG_LEVEL, handlers=[handler])
+    
+    if LOG_ASYNC:
+        listener = logging.handlers.QueueListener(handler.queue, output)
+        listener.start()
+        atexit.register(listener.stop)
+    return handler
+
+
+# 이벤트 로그 - 자주 발생하는 이벤트(WebSocket 연결/메시지 등)를 이벤트별 비율로 샘플링
+# 샘플링에서 빠진 로그는 LogRecord를 만들기 전에 버리므로 메시지 조립/호출 위치 탐색 비용이 없음
+# 기록된 로그에는 event, sample_rate와 키워드 인자로 넘긴 필드가 extra로 포함 (JSON 형식에서 그대로 출력)
+class EventLogger:
+    def __init__(self, logger: logging.Logger, rates: Dict[str, float]):
+        self.logger = logger
+        self.rates = rates                                  # 이벤트별 기록 비율 (없으면 1.0)
+        self.sampled_out = 0                                # 샘플링으로 버린 로그 수
+    
+    
+    def log(self, level: int, event: str, msg: str, *args, **fields):
+        if not self.logger.isEnabledFor(level):
+            return
+        
+        rate = self.rates.get(event, 1.0)
+        if rate < 1.0:
+            if random.random() >= rate:
+                self.sampled_out += 1
+                return
+            fields["sample_rate"] = rate
+        
+        fields["event"] = event
+        self.logger.log(level, msg, *args, extra=fields, stacklevel=2)
+    
+    
+    def info(self, event: str, msg: str, *args, **fields):
+        self.log(logging.INFO, event, msg, *args, **fields)
+    
+    
+    def warning(self, event: str, msg: str, *args, **fields):
+        self.log(logging.WARNING, event, msg, *args, **fields)
+    
+    
+    def error(self, event: str, msg: str, *args, **fields):
+        self.log(logging.ERROR, event, msg, *args, **fields)
 
-# 로깅 설정 최적화 - 로그 레벨 및 로그 형식 설정 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 
-# 현재 모듈의 로거 생성
+# 로깅 설정 적용 및 현재 모듈의 로거 생성
+log_handler = setup_logging()
 logger = logging.getLogger(__name__)
+events = EventLogger(logger, parse_sample_rates(LOG_SAMPLE_RATES))
 
-# Redis 연결 설정
-redis_client = redis.Redis(
-    host='localhost',                   # Redis 서버 주소 
-    port=6379,                          # Redis 포트 번호 
-    db=0,                               # Redis 데이터베이스 번호 (0-15)
-    decode_responses=True,              # 응답을 문자열로 자동 디코딩 
-    socket_connect_timeout=5,           # 연결 타임아웃 (5초)
-    socket_timeout=5                    # 데이터 전송(소켓) 타임아웃 (5초)
-)
+# 직렬화 설정 (환경 변수로 조정 가능)
+JSON_CODEC = os.getenv("JSON_CODEC", "auto")                                    # JSON 구현 (auto: orjson이 설치되어 있으면 사용 / orjson / json)
+WS_CODECS = os.getenv("WS_CODECS", "json,msgpack")                              # WebSocket 서브프로토콜로 협상할 코덱 (설치된 것만 사용)
+WS_PER_MESSAGE_DEFLATE = os.getenv("WS_PER_MESSAGE_DEFLATE", "on") != "off"     # permessage-deflate 압축 협상 여부 (python main.py 실행 시)
 
-# Redis 연결 테스트
-try:
-    redis_client.ping()                 # Redis 서버에 ping 요청
-    logger.info("Redis 연결 성공!")        
 
-except redis.ConnectionError:
-    logger.error("Redis 연결 실패! Redis 서버가 실행 중인지 확인하세요.")
-    redis_client = None                 # Redis 연결 실패 시 None 설정
+# 직렬화 코덱 - Redis에 저장/발행하는 JSON과 WebSocket 프레임이 같은 인터페이스 사용
+# name은 WebSocket 서브프로토콜 이름, binary면 바이너리 프레임으로 전송
+class JsonCodec:
+    name = "json"
+    binary = False
+    
+    def dumps(self, obj) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    
+    
+    def loads(self, data: Union[str, bytes]):
+        return json.loads(data)
+
+
+# 같은 JSON 형식을 orjson으로 직렬화 (텍스트 프레임/Redis 문자열용으로 str 반환)
+class OrjsonCodec(JsonCodec):
+    def dumps(self, obj) -> str:
+        return orjson.dumps(obj).decode()
+    
+    
+    def loads(self, data: Union[str, bytes]):
+        return orjson.loads(data)
+
+
+class MsgpackCodec:
+    name = "msgpack"
+    binary = True
+    
+    def dumps(self, obj) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True)
+    
+    
+    def loads(self, data: bytes):
+        return msgpack.unpackb(data, raw=False)
+
+
+Codec = Union[JsonCodec, MsgpackCodec]
+
+
+def create_json_codec() -> JsonCodec:
+    """JSON_CODEC 설정에 맞는 JSON 코덱 (orjson이 없으면 표준 json 모듈)"""
+    if JSON_CODEC == "json":
+        return JsonCodec()
+    
+    if orjson is None:
+        if JSON_CODEC == "orjson":
+            logger.warning("orjson이 설치되어 있지 않아 표준 json 모듈 사용")
+        return JsonCodec()
+    
+    return OrjsonCodec()
+
+
+def create_ws_codecs() -> Dict[str, Codec]:
+    """WebSocket에서 협상 가능한 코덱 (서브프로토콜 이름 -> 코덱, 설치되지 않은 코덱은 제외)"""
+    available = {"json": json_codec, "msgpack": MsgpackCodec() if msgpack is not None else None}
+    codecs = {}
+    for name in (name.strip() for name in WS_CODECS.split(",")):
+        if available.get(name) is not None:
+            codecs[name] = available[name]
+        elif name in available:
+            logger.info(f"WebSocket 코덱 {name} 미설치 - 협상 대상에서 제외")
+        elif name:
+            logger.warning(f"알 수 없는 WebSocket 코덱: {name}")
+    return codecs
+
+
+def select_codec(subprotocols: List[str]) -> Tuple[Optional[str], Codec]:
+    """클라이언트가 요청한 서브프로토콜 중 첫 번째 지원 코덱 -> (응답할 서브프로토콜, 코덱), 없으면 JSON 텍스트"""
+    for name in subprotocols:
+        if name in ws_codecs:
+            return name, ws_codecs[name]
+    return None, json_codec
+
+
+# 코덱 인스턴스 - JSON은 Redis 저장/제어 채널/기본 WebSocket 형식에 공통 사용
+json_codec = create_json_codec()
+ws_codecs = create_ws_codecs()
+
+# Redis 연결 설정 (환경 변수로 조정 가능)
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")                               # Redis 서버 주소
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))                               # Redis 포트 번호
+REDIS_DB = int(os.getenv("REDIS_DB", "0"))                                      # Redis 데이터베이스 번호 (0-15)
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))           # 커넥션 풀 최대 크기
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "2"))                # 풀에서 빈 커넥션을 기다리는 최대 시간 (초)
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "5"))          # 연결 타임아웃 (초)
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))            # 데이터 전송(소켓) 타임아웃 (초)
+REDIS_RECONNECT_INTERVAL = float(os.getenv("REDIS_RECONNECT_INTERVAL", "5"))    # 연결 실패 후 재연결 시도 간격 (초)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "redis")                         # 세션 저장소 (redis: 실패 시 메모리로 동작 후 복구 / memory: Redis 미사용)
+REDIS_BREAKER = os.getenv("REDIS_BREAKER", "on") != "off"                       # Redis 회로 차단기 사용 여부
+REDIS_CALL_TIMEOUT = float(os.getenv("REDIS_CALL_TIMEOUT", "1"))                # Redis 호출별 제한 시간 (초, 소켓 타임아웃보다 짧게)
+REDIS_BREAKER_ERROR_RATE = float(os.getenv("REDIS_BREAKER_ERROR_RATE", "0.5"))  # 차단 기준 오류율
+REDIS_BREAKER_MIN_CALLS = int(os.getenv("REDIS_BREAKER_MIN_CALLS", "10"))       # 오류율을 판단할 최소 호출 수
+REDIS_BREAKER_WINDOW = int(os.getenv("REDIS_BREAKER_WINDOW", "20"))             # 오류율 집계 호출 수 (최근 N회)
+REDIS_BREAKER_RESET_TIMEOUT = float(os.getenv("REDIS_BREAKER_RESET_TIMEOUT", "5"))    # 차단 후 시험 호출까지의 시간 (초)
+
+
+def create_redis_client() -> aioredis.Redis:
+    """커넥션 풀 기반 비동기 Redis 클라이언트 생성"""
+    pool = aioredis.BlockingConnectionPool(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        db=REDIS_DB,
+        decode_responses=True,                          # 응답을 문자열로 자동 디코딩
+        max_connections=REDIS_MAX_CONNECTIONS,          # 풀 크기 제한 -> 초과 요청은 대기
+        timeout=REDIS_POOL_TIMEOUT,                     # 풀 대기 시간 초과 시 예외 발생
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        socket_timeout=REDIS_SOCKET_TIMEOUT
+    )
+    return aioredis.Redis(connection_pool=pool)
+
+
+async def pubsub_messages(pubsub):
+    """구독 메시지 순회 - listen()은 메시지가 없으면 소켓 타임아웃으로 실패하므로 짧은 대기를 반복"""
+    while True:
+        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+        if message is not None:
+            yield message
+
+
+# 프로메테우스 형식 지표 - 워커(프로세스)별로 집계해 /metrics로 노출
+# 지표는 이벤트 루프 스레드에서만 갱신하므로 잠금 없이 덧셈만 수행 (heartbeat 경로에서도 부담이 작음)
+# 레이블 조합별 지표는 처음 기록할 때 한 번만 만들어 두고 재사용
+METRICS_ENABLED = os.getenv("METRICS", "on") != "off"                            # 지표 수집 여부 (off면 기록하지 않음)
+LABEL_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n"})           # 레이블 값 이스케이프
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)    # 지연 시간 히스토그램 구간 (초)
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+    
+    
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)          # 구간별 관측 수 (마지막은 +Inf, 출력 시 누적)
+        self.sum = 0.0
+    
+    
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+# 지표 수집을 끈 경우 사용하는 빈 지표 (기록 호출은 그대로 두고 아무것도 하지 않음)
+class NullMetric:
+    def labels(self, *values) -> "NullMetric":
+        return self
+    
+    
+    def inc(self, amount: float = 1.0):
+        pass
+    
+    
+    def observe(self, value: float):
+        pass
+
+
+# 이름/설명/레이블이 같은 지표 묶음 - 레이블 값 조합마다 Counter 또는 Histogram 하나
+class MetricFamily:
+    def __init__(self, name: str, help_text: str, kind: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind                                # counter / histogram
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.children: Dict[tuple, Union[Counter, Histogram]] = {}
+        self.default = None if labelnames else self.labels()    # 레이블 없는 지표 (0부터 출력)
+    
+    
+    def labels(self, *values: str) -> Union[Counter, Histogram]:
+        """레이블 값 조합의 지표 (없으면 생성)"""
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = Histogram(self.buckets) if self.kind == "histogram" else Counter()
+        return child
+    
+    
+    def inc(self, amount: float = 1.0):
+        self.default.inc(amount)
+    
+    
+    def observe(self, value: float):
+        self.default.observe(value)
+    
+    
+    def render(self) -> List[str]:
+        """텍스트 형식 출력 (히스토그램은 구간별 누적 수 + sum/count)"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self.children.items():
+            pairs = list(zip(self.labelnames, values))
+            if self.kind == "counter":
+                lines.append(f"{self.name}{format_labels(pairs)} {float(child.value)!r}")
+                continue
+    
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), child.counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                lines.append(f"{self.name}_bucket{format_labels(pairs + [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(pairs)} {child.sum!r}")
+            lines.append(f"{self.name}_count{format_labels(pairs)} {cumulative}")
+        return lines
+
+
+def format_labels(pairs: List[Tuple[str, str]]) -> str:
+    """레이블 출력 형식 -> {name="value",...} (값의 역슬래시/따옴표/줄바꿈은 이스케이프)"""
+    if not pairs:
+        return ""
+    escaped = (f'{name}="{str(value).translate(LABEL_ESCAPES)}"' for name, value in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+# 지표 저장소 - 카운터/히스토그램은 기록 시점에, 게이지는 /metrics 요청 시 콜백으로 계산
+class MetricsRegistry:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.families: List[MetricFamily] = []
+        self.gauges: List[tuple] = []                   # (이름, 설명, 레이블 이름, 콜백)
+    
+    
+    def _family(self, name: str, help_text: str, kind: str, labelnames: Tuple[str, ...], **kwargs) -> Union[MetricFamily, NullMetric]:
+        if not self.enabled:
+            return NullMetric()
+        family = MetricFamily(name, help_text, kind, labelnames, **kwargs)
+        self.families.append(family)
+        return family
+    
+    
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Union[MetricFamily, NullMetric]:
+        return self._family(name, help_text, "counter", labelnames)
+    
+    
+    def histogram(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Union[MetricFamily, NullMetric]:
+        return self._family(name, help_text, "histogram", labelnames, buckets=buckets)
+    
+    
+    def gauge(self, name: str, help_text: str, callback, labelnames: Tuple[str, ...] = ()):
+        """현재 값 게이지 등록 - callback은 숫자 또는 {레이블 값 튜플: 숫자} 반환"""
+        self.gauges.append((name, help_text, labelnames, callback))
+    
+    
+    def render(self) -> str:
+        """/metrics 응답 본문"""
+        lines = []
+        for family in self.families:
+            lines.extend(family.render())
+    
+        for name, help_text, labelnames, callback in self.gauges:
+            values = callback()
+            lines.extend((f"# HELP {name} {help_text}", f"# TYPE {name} gauge"))
+            for label_values, value in (values.items() if isinstance(values, dict) else [((), values)]):
+                lines.append(f"{name}{format_labels(list(zip(labelnames, label_values)))} {float(value)!r}")
+        return "\n".join(lines) + "\n"
+
+
+# 지표 인스턴스 - 게이지는 각 관리자 생성 후 등록
+metrics = MetricsRegistry(METRICS_ENABLED)
+login_duration = metrics.histogram("login_duration_seconds", "로그인 요청 처리 시간 (응답 코드별)", ("status",))
+redis_command_duration = metrics.histogram("redis_command_duration_seconds", "Redis 호출 왕복 시간 (명령별, 스크립트는 evalsha)", ("op",))
+redis_command_errors = metrics.counter("redis_command_errors_total", "실패한 Redis 호출 수 (명령별)", ("op",))
+websocket_connects = metrics.counter("websocket_connects_total", "WebSocket 연결 시도 수 (accepted / rejected)", ("result",))
+websocket_disconnects = metrics.counter("websocket_disconnects_total", "해제된 WebSocket 연결 수")
+websocket_heartbeats = metrics.counter("websocket_heartbeats_total", "수신한 heartbeat 메시지 수")
+websocket_messages_sent = metrics.counter("websocket_messages_sent_total", "전송한 WebSocket 메시지 수")
+websocket_send_failures = metrics.counter("websocket_send_failures_total", "WebSocket 전송 실패 수 (timeout / error)", ("reason",))
+session_cleanup_duration = metrics.histogram("session_cleanup_duration_seconds", "만료 세션 정리 1회 소요 시간",
+                                             buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0))
+session_cleanup_removed = metrics.counter("session_cleanup_removed_total", "정리된 만료 세션 수")
+session_cache_invalidation_lag = metrics.histogram("session_cache_invalidation_lag_seconds", "세션 캐시 무효화 지연 (측정 키 쓰기 -> 키 공간 알림 수신)")
+
+
+# Redis 클라이언트 (연결 테스트는 startup 이벤트에서 비동기로 수행)
+redis_client: Optional[aioredis.Redis] = create_redis_client() if SESSION_BACKEND == "redis" else None
 
 # FastAPI 애플리케이션 설정
 app = FastAPI(
@@ -65,7 +459,7 @@ app.add_middleware(
 # 보안 설정 -> 토큰 인증 및 권한 관리
 security = HTTPBearer()
 
-# 사용자 데이터 (실제 프로젝트에서는 데이터베이스 사용)
+# 데모 계정 - 시작 시 사용자 저장소에 비밀번호 해시로 등록 (저장소에는 평문을 보관하지 않음)
 USERS = {
     "user1": {
         "password": "password1",         # 사용자 비밀번호 
@@ -84,342 +478,2625 @@ USERS = {
     }
 }
 
-# Redis 기반 세션 관리자
-class RedisSessionManager:
-    def __init__(self):
-        self.redis = redis_client           # Redis 클라이언트 연결
-        self.session_ttl = 3600             # 세션 유효 시간 (1시간 = 3600초)
-        self.websocket_ttl = 7200           # WebSocket 연결 유효 시간 (2시간 = 7200초) 
+USERS_SCAN_FACTOR = 4                                      # 활성 상태 필터 시 요청당 확인할 최대 사용자 수 (페이지 크기 배수)
+
+# 사용자 저장소 / 비밀번호 해시 설정 (환경 변수로 조정 가능)
+USER_STORE = os.getenv("USER_STORE", "memory")                                          # 사용자 저장소 (memory / sqlite)
+USER_DB_PATH = os.getenv("USER_DB_PATH", "users.db")                                    # SQLite 사용자 DB 파일 경로
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))    # 해시 계산 스레드 수 (0이면 이벤트 루프에서 직접 계산)
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))           # 대기 가능한 최대 검증 요청 수 (초과 시 429)
+PASSWORD_SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", "16384"))                        # scrypt 비용 인자 (2의 거듭제곱)
+
+
+# 비밀번호 해시 - scrypt(솔트 포함)를 제한된 스레드 풀에서 계산해 이벤트 루프를 막지 않음
+# 해시 문자열에 인자를 함께 저장하므로 PASSWORD_SCRYPT_N을 바꿔도 기존 해시는 그대로 검증 가능
+# 대기 중인 요청이 max_pending을 넘으면 바로 429로 거절 -> 로그인 폭주가 풀과 메모리를 소진하지 않음
+class PasswordHasher:
+    def __init__(self, workers: int, max_pending: int, n: int = 16384, r: int = 8, p: int = 1):
+        self.n, self.r, self.p = n, r, p                                        # scrypt 인자
+        self.max_pending = max_pending                                          # 최대 대기 요청 수
+        self.pending = 0                                                        # 현재 계산 중/대기 중인 요청 수
+        self.rejected = 0                                                       # 용량 초과로 거절한 요청 수
+        self.dummy_hash = f"scrypt${n}${r}${p}${'00' * 16}${'00' * 32}"         # 없는 사용자 검증용 (같은 인자 -> 같은 계산 시간)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash") if workers > 0 else None
     
     
-    async def create_session(self, username: str, session_id: str) -> bool:
-        """새 세션 생성"""
-        if not self.redis:                  # Redis 연결 확인  
-            return False                    # 연결이 없으면 False로 반환 
-            
-        try:
-            # 세션 데이터 생성
-            session_data = {                    
-                "username": username,           # 사용자명
-                "session_id": session_id,       # 세션 ID
-                "created_at": time.time(),      # 세션 생성 시간
-                "last_activity": time.time()    # 마지막 활동 시간(현재 시간)
-            }
-            
-            # 세션 정보 저장 -> Redis에 세션 데이터 저장 (TTL 1시간)
-            self.redis.setex(
-                f"session:{session_id}",        # 세션 ID를 키로 사용
-                self.session_ttl,               # 세션 유효 시간 (1시간 = 3600초)
-                json.dumps(session_data)        # 세션 데이터를 JSON 형식으로 변환 후 저장
-            )
-            
-            # 사용자별 세션 ID 매핑
-            self.redis.setex(
-                f"user_session:{username}",     # 사용자명을 키로 사용
-                self.session_ttl,               # 세션 유효 시간 (1시간 = 3600초)
-                session_id                      # 세션 ID 저장
-            )
-            
-            # 활성 세션 목록에 사용자 추가 (set 구조)
-            self.redis.sadd("active_sessions", username)
-            
-            logger.info(f"사용자 {username} 세션 생성: {session_id}")
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"세션 생성 실패: {e}")
-            return False
+    @staticmethod
+    def _derive(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=32)
     
     
-    async def get_session(self, session_id: str) -> Optional[dict]:
-        """세션 정보 조회"""
-        if not self.redis:
-            return None
-            
-        try:
-            session_data = self.redis.get(f"session:{session_id}")    # Redis에서 세션 데이터 조회 
-            
-            if session_data:
-                return json.loads(session_data)    # JSON 형식으로 변환 후 반환     
-            
-            return None                            # 세션 데이터가 없으면 None 반환
-        
-        except Exception as e:
-            logger.error(f"세션 조회 실패: {e}")
-            return None
+    def hash_sync(self, password: str) -> str:
+        """비밀번호 해시 문자열 생성 (scrypt$n$r$p$salt$hash)"""
+        salt = os.urandom(16)
+        derived = self._derive(password, salt, self.n, self.r, self.p)
+        return f"scrypt${self.n}${self.r}${self.p}${salt.hex()}${derived.hex()}"
     
     
-    async def update_session_activity(self, session_id: str) -> bool:
-        """세션 활동 시간 업데이트"""
-        if not self.redis:
-            return False
-            
+    @classmethod
+    def verify_sync(cls, password: str, encoded: str) -> bool:
+        """비밀번호와 해시 문자열 비교 (상수 시간)"""
         try:
-            session_data = self.redis.get(f"session:{session_id}")    # 기존 세션 데이터 조회
-            
-            if session_data:
-                data = json.loads(session_data)        # JSON 형식으로 변환 후 반환
-                data["last_activity"] = time.time()    # 마지막 활동 시간 업데이트
-                
-                # 세션 데이터 업데이트 -> Redis에 세션 데이터 저장 (TTL 1시간)
-                self.redis.setex(
-                    f"session:{session_id}",        # 세션 ID를 키로 사용
-                    self.session_ttl,               # 세션 유효 시간 (1시간 = 3600초)   
-                    json.dumps(data)                # 세션 데이터를 JSON 형식으로 변환 후 저장
-                )
-                return True                         # 세션 데이터 업데이트 성공 시 True 반환
-            
-            return False                            # 세션 데이터가 없으면 False 반환
+            algorithm, n, r, p, salt, expected = encoded.split("$")
+        except ValueError:
+            return False
         
-        except Exception as e:
-            logger.error(f"세션 활동 업데이트 실패: {e}")
+        if algorithm != "scrypt":
             return False
+        
+        derived = cls._derive(password, bytes.fromhex(salt), int(n), int(r), int(p))
+        return hmac.compare_digest(derived.hex(), expected)
     
     
-    async def remove_session(self, username: str) -> bool:
-        """세션 제거"""
-        if not self.redis:
-            return False
-            
+    async def _submit(self, func, *args):
+        if self.pending >= self.max_pending:                                    # 용량 초과 -> 대기열에 넣지 않고 거절
+            self.rejected += 1
+            raise HTTPException(
+                status_code=429,
+                detail="로그인 요청이 많습니다. 잠시 후 다시 시도하세요.",
+                headers={"Retry-After": "1"}
+            )
+        
+        self.pending += 1
         try:
-            session_id = self.redis.get(f"user_session:{username}")     # 사용자의 세션 ID 조회
-            
-            if session_id:
-                # 세션 정보 삭제 -> Redis에서 세션 데이터 삭제
-                self.redis.delete(f"session:{session_id}")
-                # 사용자 세션 매핑 삭제 -> Redis에서 사용자의 세션 ID 삭제
-                self.redis.delete(f"user_session:{username}")
-                # 활성 세션 목록에서 제거 -> Redis에서 사용자 제거 (set 구조)
-                self.redis.srem("active_sessions", username)
-                
-                logger.info(f"사용자 {username} 세션 제거")
-                return True                         # 세션 제거 성공 시 True 반환
-            
-            return False                            # 세션 ID가 없으면 False 반환
+            if self._executor is None:                                          # 스레드 풀 미사용 (비교용)
+                return func(*args)
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
         
-        except Exception as e:
-            logger.error(f"세션 제거 실패: {e}")
-            return False
+        finally:
+            self.pending -= 1
     
     
-    async def is_user_active(self, username: str) -> bool:
-        """사용자 활성 상태 확인"""
-        if not self.redis:
-            return False
-            
-        try:
-            return self.redis.exists(f"user_session:{username}") > 0    # 사용자의 세션 ID가 존재하는지 확인 - ID가 존재하면 True 반환
-            
-        except Exception as e:
-            logger.error(f"사용자 활성 상태 확인 실패: {e}")
-            return False
+    async def hash(self, password: str) -> str:
+        """비밀번호 해시 생성 (스레드 풀)"""
+        return await self._submit(self.hash_sync, password)
     
     
-    async def get_active_sessions(self) -> list:
-        """활성 세션 목록 조회"""
-        if not self.redis:                          # Redis 연결 확인
-            return []                               # 연결이 없으면 빈 리스트 반환
-            
-        try:
-            active_users = list(self.redis.smembers("active_sessions"))    # 활성 세션 목록 조회 (set 구조)
-            return active_users                     # 활성 세션 목록 반환
+    async def verify(self, password: str, encoded: str) -> bool:
+        """비밀번호 검증 (스레드 풀)"""
+        return await self._submit(self.verify_sync, password, encoded)
+    
+    
+    def stats(self) -> dict:
+        """해시 풀 지표"""
+        return {
+            "workers": self._executor._max_workers if self._executor else 0,
+            "pending": self.pending,
+            "rejected": self.rejected
+        }
+
+
+# 사용자 저장소 인터페이스 - 사용자 레코드: {"username", "name", "is_admin", "password_hash"}
+class UserStore(abc.ABC):
+    @abc.abstractmethod
+    async def get(self, username: str) -> Optional[dict]:
+        """사용자 조회 (없으면 None)"""
+    
+    
+    @abc.abstractmethod
+    async def page(self, after: Optional[str], limit: int) -> List[dict]:
+        """사용자명 순으로 after 다음부터 최대 limit명 조회"""
+    
+    
+    @abc.abstractmethod
+    async def put(self, username: str, name: str, is_admin: bool, password_hash: str):
+        """사용자 추가/갱신"""
+    
+    
+    def close(self):
+        """저장소 자원 정리"""
+
+
+# 메모리 사용자 저장소 - 워커마다 독립적인 사전 + 정렬된 사용자명 목록 (커서 페이지용)
+class InMemoryUserStore(UserStore):
+    def __init__(self):
+        self._users: Dict[str, dict] = {}                                      # 사용자명 -> 사용자 레코드
+        self._usernames: List[str] = []                                         # 정렬된 사용자명 목록
+    
+    
+    async def get(self, username: str) -> Optional[dict]:
+        return self._users.get(username)
+    
+    
+    async def page(self, after: Optional[str], limit: int) -> List[dict]:
+        start = bisect.bisect_right(self._usernames, after) if after else 0
+        return [self._users[username] for username in self._usernames[start:start + limit]]
+    
+    
+    async def put(self, username: str, name: str, is_admin: bool, password_hash: str):
+        if username not in self._users:
+            bisect.insort(self._usernames, username)
+        self._users[username] = {"username": username, "name": name, "is_admin": is_admin, "password_hash": password_hash}
+
+
+# SQLite 사용자 저장소 - 여러 워커가 같은 파일을 공유
+# sqlite3 호출은 블로킹이므로 전용 스레드 하나에서 실행 (연결도 그 스레드에서만 사용)
+class SQLiteUserStore(UserStore):
+    def __init__(self, path: str):
+        self.path = path                                                        # DB 파일 경로
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="user-store")
+        self._connection: Optional[sqlite3.Connection] = None
+    
+    
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, timeout=5)
+            self._connection.row_factory = sqlite3.Row
+            self._connection.execute("PRAGMA journal_mode=WAL")                 # 읽기가 쓰기를 기다리지 않도록
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                "username TEXT PRIMARY KEY, name TEXT NOT NULL, "
+                "is_admin INTEGER NOT NULL, password_hash TEXT NOT NULL)"
+            )
+        return self._connection
+    
+    
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+    
+    
+    @staticmethod
+    def _record(row: sqlite3.Row) -> dict:
+        return {"username": row["username"], "name": row["name"], "is_admin": bool(row["is_admin"]), "password_hash": row["password_hash"]}
+    
+    
+    def _get(self, username: str) -> Optional[dict]:
+        row = self._connect().execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+        return self._record(row) if row else None
+    
+    
+    def _page(self, after: Optional[str], limit: int) -> List[dict]:
+        rows = self._connect().execute(
+            "SELECT * FROM users WHERE username > ? ORDER BY username LIMIT ?", (after or "", limit)
+        ).fetchall()
+        return [self._record(row) for row in rows]
+    
+    
+    def _put(self, username: str, name: str, is_admin: bool, password_hash: str):
+        connection = self._connect()
+        with connection:                                                        # 트랜잭션 (커밋/롤백)
+            connection.execute(
+                "INSERT INTO users (username, name, is_admin, password_hash) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(username) DO UPDATE SET name = excluded.name, is_admin = excluded.is_admin, "
+                "password_hash = excluded.password_hash",
+                (username, name, int(is_admin), password_hash)
+            )
+    
+    
+    async def get(self, username: str) -> Optional[dict]:
+        return await self._run(self._get, username)
+    
+    
+    async def page(self, after: Optional[str], limit: int) -> List[dict]:
+        return await self._run(self._page, after, limit)
+    
+    
+    async def put(self, username: str, name: str, is_admin: bool, password_hash: str):
+        await self._run(self._put, username, name, is_admin, password_hash)
+    
+    
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+    
+    
+    def close(self):
+        self._executor.submit(self._close)
+        self._executor.shutdown(wait=True)
+
+
+def create_user_store() -> UserStore:
+    """USER_STORE 설정에 맞는 사용자 저장소 생성"""
+    if USER_STORE == "sqlite":
+        return SQLiteUserStore(USER_DB_PATH)
+    return InMemoryUserStore()
+
+
+async def seed_users(users: Dict[str, dict]):
+    """데모 계정 중 저장소에 없는 사용자만 해시해서 등록"""
+    for username, user_data in users.items():
+        if await user_store.get(username) is None:
+            password_hash = await password_hasher.hash(user_data["password"])
+            await user_store.put(username, user_data["name"], user_data["is_admin"], password_hash)
+
+
+# 비밀번호 해시 풀 / 사용자 저장소 인스턴스
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, n=PASSWORD_SCRYPT_N)
+user_store = create_user_store()
+
+# 활성 세션 뷰 - 세션 생성/갱신/삭제 시 Lua 스크립트가 함께 갱신하는 목록 (조회 시 재구성하지 않음)
+# active_sessions_view(HASH): 사용자명 -> 세션 정보 JSON
+# active_sessions_version: 뷰 변경 시마다 증가하는 버전 (ETag)
+# active_sessions_changes(ZSET): 사용자명 -> 마지막 변경 버전 (since 이후 변경분 조회용)
+# active_sessions_floor: 변경 기록이 정리된 마지막 버전 (이보다 오래된 since는 전체 재조회 필요)
+# 뷰를 갱신하는 스크립트는 뷰 키 3개를 KEYS의 마지막에 ACTIVE_VIEW_KEYS 순서로 전달
+ACTIVE_VIEW_KEYS = ["active_sessions_view", "active_sessions_changes", "active_sessions_version"]
+ACTIVE_VIEW_LUA = """
+local view_key, view_changes_key, view_version_key = KEYS[#KEYS - 2], KEYS[#KEYS - 1], KEYS[#KEYS]
+local function view_upsert(username, session_id, connected_at, last_activity)
+    redis.call('HSET', view_key, username, cjson.encode({
+        username = username, session_id = session_id,
+        connected_at = tonumber(connected_at), last_activity = tonumber(last_activity)
+    }))
+    redis.call('ZADD', view_changes_key, redis.call('INCR', view_version_key), username)
+end
+local function view_remove(username)
+    if redis.call('HDEL', view_key, username) == 1 then
+        redis.call('ZADD', view_changes_key, redis.call('INCR', view_version_key), username)
+    end
+end
+"""
+
+# 이전 버전 세션 변환 - 이전 버전은 session:{session_id}를 JSON 문자열(SETEX)로 저장 -> 같은 필드의 HASH로 바꾸고 남은 TTL 유지
+SESSION_UPGRADE_LUA = """
+local function session_upgrade(key)
+    if redis.call('TYPE', key).ok ~= 'string' then
+        return 0
+    end
+    local ttl = redis.call('PTTL', key)
+    local legacy = cjson.decode(redis.call('GET', key))
+    redis.call('DEL', key)
+    redis.call('HSET', key, 'username', legacy.username, 'session_id', legacy.session_id,
+               'created_at', legacy.created_at, 'last_activity', legacy.last_activity)
+    if ttl > 0 then
+        redis.call('PEXPIRE', key, ttl)
+    end
+    return 1
+end
+"""
+
+# Redis 서버 측 Lua 스크립트 - 세션 생명주기 작업을 한 번의 왕복으로 원자적으로 처리
+# session:{session_id}(HASH): username, session_id, created_at, last_activity 필드
+# session_expiry(ZSET): 사용자명 -> 마지막 활동 시간 (만료 세션 인덱스)
+# revoked_sessions(ZSET): 폐기된 세션 ID -> 폐기 시간 (토큰 유효 기간 동안 보관, 워커 재시작/재구독 시 따라잡기용)
+# 고정 키와 호출 시점에 알 수 있는 키는 모두 KEYS로 전달, 저장된 값으로만 알 수 있는 키(이전 세션의 session:{id},
+# 세션 사용자의 user_session:{username})는 스크립트 안에서 만듦 -> 모든 세션 키가 같은 Redis 인스턴스에 있어야 함 (클러스터 미지원)
+# 세션 교체: 기존 세션 삭제(폐기 기록 + 발행) + 새 세션 저장 + 사용자 매핑 + 활성 목록/만료 인덱스 추가 -> 이전 세션 ID 반환
+# KEYS[1]=user_session:{username}, KEYS[2]=active_sessions, KEYS[3]=session_expiry, KEYS[4]=revoked_sessions,
+# KEYS[5]=session:{새 세션 ID}, KEYS[6..8]=ACTIVE_VIEW_KEYS / 파생 키: session:{이전 세션 ID}
+# ARGV[1]=username, ARGV[2]=새 세션 ID, ARGV[3]=TTL, ARGV[4]=현재 시간, ARGV[5]=폐기 기록 보관 시간, ARGV[6]=폐기 채널,
+# ARGV[7]=생성 시간, ARGV[8]=마지막 활동 시간 (생략 시 현재 시간, 메모리 세션 이전 시 기존 값 유지용)
+REPLACE_SESSION_SCRIPT = ACTIVE_VIEW_LUA + """
+local created_at, last_activity = ARGV[7] or ARGV[4], ARGV[8] or ARGV[4]
+local previous = redis.call('GET', KEYS[1])
+if previous then
+    redis.call('DEL', 'session:' .. previous)
+    if previous ~= ARGV[2] then
+        redis.call('ZADD', KEYS[4], ARGV[4], previous)
+        redis.call('ZREMRANGEBYSCORE', KEYS[4], '-inf', tonumber(ARGV[4]) - tonumber(ARGV[5]))
+        redis.call('PUBLISH', ARGV[6], previous)
+    end
+end
+redis.call('HSET', KEYS[5], 'username', ARGV[1], 'session_id', ARGV[2], 'created_at', created_at, 'last_activity', last_activity)
+redis.call('EXPIRE', KEYS[5], ARGV[3])
+redis.call('SETEX', KEYS[1], ARGV[3], ARGV[2])
+redis.call('SADD', KEYS[2], ARGV[1])
+redis.call('ZADD', KEYS[3], last_activity, ARGV[1])
+view_upsert(ARGV[1], ARGV[2], created_at, last_activity)
+return previous
+"""
+
+# 세션 갱신: last_activity 필드만 업데이트 + 세션/사용자 매핑 TTL 연장 + 만료 인덱스 갱신 -> 성공 시 1 반환
+# 이미 삭제된 세션은 다시 생성하지 않음, 이전 버전의 JSON 문자열 세션은 먼저 HASH로 변환
+# 활성 세션 뷰는 마지막 반영 후 ARGV[4]초 이상 지났을 때만 갱신 (버전 변경 최소화)
+# KEYS[1]=session:{session_id}, KEYS[2]=session_expiry, KEYS[3..5]=ACTIVE_VIEW_KEYS / 파생 키: user_session:{세션의 username}
+# ARGV[1]=마지막 활동 시간, ARGV[2]=TTL, ARGV[3]=세션 ID, ARGV[4]=뷰 갱신 최소 간격
+TOUCH_SESSION_SCRIPT = ACTIVE_VIEW_LUA + SESSION_UPGRADE_LUA + """
+session_upgrade(KEYS[1])
+local username = redis.call('HGET', KEYS[1], 'username')
+if not username then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'last_activity', ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+local mapping = 'user_session:' .. username
+if redis.call('GET', mapping) == ARGV[3] then
+    redis.call('EXPIRE', mapping, ARGV[2])
+    redis.call('ZADD', KEYS[2], ARGV[1], username)
+    local entry = redis.call('HGET', view_key, username)
+    if not entry or tonumber(ARGV[1]) - cjson.decode(entry).last_activity >= tonumber(ARGV[4]) then
+        view_upsert(username, ARGV[3], redis.call('HGET', KEYS[1], 'created_at'), ARGV[1])
+    end
+end
+return 1
+"""
+
+# 세션 변환: 이전 버전의 JSON 문자열 세션을 HASH로 변환 -> 변환 시 1 반환
+# KEYS[1]=session:{session_id}
+UPGRADE_SESSION_SCRIPT = SESSION_UPGRADE_LUA + """
+return session_upgrade(KEYS[1])
+"""
+
+# 세션 삭제: 세션 데이터 + 사용자 매핑 + 활성 목록/만료 인덱스 제거 + 폐기 기록/발행 -> 삭제된 세션 ID 반환
+# KEYS[1]=user_session:{username}, KEYS[2]=active_sessions, KEYS[3]=session_expiry, KEYS[4]=revoked_sessions,
+# KEYS[5..7]=ACTIVE_VIEW_KEYS / 파생 키: session:{현재 세션 ID}
+# ARGV[1]=username, ARGV[2]=삭제할 세션 ID ('' 이면 현재 세션 삭제), ARGV[3]=현재 시간, ARGV[4]=폐기 기록 보관 시간, ARGV[5]=폐기 채널
+DROP_SESSION_SCRIPT = ACTIVE_VIEW_LUA + """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    redis.call('SREM', KEYS[2], ARGV[1])
+    redis.call('ZREM', KEYS[3], ARGV[1])
+    view_remove(ARGV[1])
+    return false
+end
+if ARGV[2] ~= '' and current ~= ARGV[2] then
+    return false
+end
+redis.call('DEL', 'session:' .. current, KEYS[1])
+redis.call('SREM', KEYS[2], ARGV[1])
+redis.call('ZREM', KEYS[3], ARGV[1])
+view_remove(ARGV[1])
+redis.call('ZADD', KEYS[4], ARGV[3], current)
+redis.call('ZREMRANGEBYSCORE', KEYS[4], '-inf', tonumber(ARGV[3]) - tonumber(ARGV[4]))
+redis.call('PUBLISH', ARGV[5], current)
+return current
+"""
+
+# 만료 세션 정리: 마지막 활동 시간이 기준 이전인 사용자를 최대 N명까지 제거 -> 제거된 사용자 수 반환
+# TTL로 이미 사라진 키의 활성 목록 항목도 함께 정리되어 active_sessions와 키 TTL이 일치하게 유지됨
+# KEYS[1]=session_expiry, KEYS[2]=active_sessions, KEYS[3..5]=ACTIVE_VIEW_KEYS / 파생 키: 사용자별 user_session:{username}, session:{세션 ID}
+# ARGV[1]=기준 시간 (현재 시간 - TTL), ARGV[2]=배치 크기
+REAP_EXPIRED_SCRIPT = ACTIVE_VIEW_LUA + """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #expired == 0 then
+    return 0
+end
+for _, username in ipairs(expired) do
+    local mapping = 'user_session:' .. username
+    local current = redis.call('GET', mapping)
+    if current then
+        redis.call('DEL', 'session:' .. current, mapping)
+    end
+    view_remove(username)
+end
+redis.call('SREM', KEYS[2], unpack(expired))
+redis.call('ZREM', KEYS[1], unpack(expired))
+return #expired
+"""
+
+# 만료 인덱스 보충: 인덱스 도입 전에 추가된 활성 목록 항목을 인덱스에 등록 (사용자 매핑이 없으면 활성 목록에서 제거) -> {등록 수, 제거 수}
+# 마지막 활동 시간은 사용자 매핑의 남은 TTL로 추정 (활동 시마다 TTL이 연장되므로 현재 시간 - TTL + 남은 TTL)
+# KEYS[1]=active_sessions, KEYS[2]=session_expiry, KEYS[3..5]=ACTIVE_VIEW_KEYS / 파생 키: 사용자별 user_session:{username}
+# ARGV[1]=현재 시간, ARGV[2]=TTL, ARGV[3..]=사용자명 목록
+BACKFILL_EXPIRY_SCRIPT = ACTIVE_VIEW_LUA + """
+local added, removed = 0, 0
+for i = 3, #ARGV do
+    local username = ARGV[i]
+    if not redis.call('ZSCORE', KEYS[2], username) then
+        local ttl = redis.call('TTL', 'user_session:' .. username)
+        if ttl == -2 then
+            redis.call('SREM', KEYS[1], username)
+            view_remove(username)
+            removed = removed + 1
+        else
+            if ttl < 0 then
+                ttl = tonumber(ARGV[2])
+            end
+            redis.call('ZADD', KEYS[2], tonumber(ARGV[1]) - tonumber(ARGV[2]) + ttl, username)
+            added = added + 1
+        end
+    end
+end
+return {added, removed}
+"""
+
+# 활성 세션 뷰 재구성: 지정한 사용자들의 현재 세션으로 뷰 항목 갱신 (뷰 도입 전 세션 반영용) -> 반영된 수
+# 이전 버전의 JSON 문자열 세션은 HASH로 변환, 변환할 수 없는 세션(HASH가 아닌 키)은 뷰에서 제외
+# KEYS[1..3]=ACTIVE_VIEW_KEYS / 파생 키: 사용자별 user_session:{username}, session:{세션 ID}
+# ARGV=사용자명 목록
+REBUILD_VIEW_SCRIPT = ACTIVE_VIEW_LUA + SESSION_UPGRADE_LUA + """
+local rebuilt = 0
+for _, username in ipairs(ARGV) do
+    local current = redis.call('GET', 'user_session:' .. username)
+    local session_key = current and 'session:' .. current
+    local session = nil
+    if session_key and pcall(session_upgrade, session_key) and redis.call('TYPE', session_key).ok == 'hash' then
+        session = redis.call('HMGET', session_key, 'created_at', 'last_activity')
+    end
+    if session and session[1] then
+        view_upsert(username, current, session[1], session[2])
+        rebuilt = rebuilt + 1
+    else
+        view_remove(username)
+    end
+end
+return rebuilt
+"""
+
+# 변경 기록 정리: 최근 N개만 남기고 정리된 마지막 버전을 floor로 기록 -> 정리된 수
+# KEYS[1]=active_sessions_changes, KEYS[2]=active_sessions_floor
+# ARGV[1]=보관할 변경 기록 수
+TRIM_VIEW_CHANGES_SCRIPT = """
+local excess = redis.call('ZCARD', KEYS[1]) - tonumber(ARGV[1])
+if excess <= 0 then
+    return 0
+end
+local last = redis.call('ZRANGE', KEYS[1], excess - 1, excess - 1, 'WITHSCORES')
+redis.call('ZREMRANGEBYRANK', KEYS[1], 0, excess - 1)
+redis.call('SET', KEYS[2], last[2])
+return excess
+"""
+
+# Redis 회로 차단기 - Redis가 느려지거나 응답하지 않을 때 요청마다 소켓 타임아웃(수 초)을 기다리지 않도록 빠르게 실패
+# closed: 모든 호출 허용 (호출별 제한 시간 적용), 최근 window회 호출의 오류율이 error_rate 이상이면 open
+# open: reset_timeout초 동안 호출 없이 즉시 실패 (CircuitOpenError)
+# half_open: 시험 호출 하나만 허용 -> 성공하면 closed, 실패하면 다시 open
+class CircuitOpenError(redis.ConnectionError):
+    pass
+
+
+class RedisCircuitBreaker:
+    def __init__(self, enabled: bool = True, call_timeout: float = 1.0, error_rate: float = 0.5,
+                 min_calls: int = 10, window: int = 20, reset_timeout: float = 5.0):
+        self.enabled = enabled                                                  # 사용 여부 (False면 호출을 그대로 전달)
+        self.call_timeout = call_timeout                                        # 호출별 제한 시간 (초)
+        self.error_rate = error_rate                                            # 차단 기준 오류율
+        self.min_calls = min_calls                                              # 오류율을 판단할 최소 호출 수
+        self.window = window                                                    # 오류율 집계 호출 수 (최근 N회)
+        self.reset_timeout = reset_timeout                                      # 차단 후 시험 호출까지의 시간 (초)
+        self.state = "closed"                                                   # closed / open / half_open
+        self.opened_at = 0.0                                                    # 마지막 차단 시간
+        self._outcomes: Deque[bool] = deque()                                   # 최근 호출 성공 여부
+        self._failures = 0                                                      # 최근 호출 중 실패 수
+        self._probing = False                                                   # half_open 시험 호출 진행 중
+        self.rejected = 0                                                       # 차단 상태에서 즉시 실패한 호출 수
+        self.trips = 0                                                          # 차단 횟수
+    
+    
+    def _allow(self) -> Optional[bool]:
+        """호출 허용 여부 -> None: 차단, False: 일반 호출, True: half_open 시험 호출"""
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"                                            # 차단 시간 경과 -> 시험 호출 허용
+        
+        if self.state == "closed":
+            return False
+        
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        
+        return None
+    
+    
+    def _record(self, success: bool, probe: bool):
+        now = time.monotonic()
+        if probe:
+            self._probing = False
+            if success:
+                self.state = "closed"
+                self._outcomes.clear()
+                self._failures = 0
+                logger.info("Redis 회로 차단 해제")
+            else:
+                self._trip(now)
+            return
+        
+        if self.state != "closed":                                              # 차단 전에 시작된 호출의 늦은 결과는 무시
+            return
+        
+        self._outcomes.append(success)
+        self._failures += not success
+        if len(self._outcomes) > self.window:                                   # 최근 window회 호출만 집계
+            self._failures -= not self._outcomes.popleft()
+        
+        if len(self._outcomes) >= self.min_calls and self._failures / len(self._outcomes) >= self.error_rate:
+            self._trip(now)
+    
+    
+    def _trip(self, now: float):
+        self.state = "open"
+        self.opened_at = now
+        self.trips += 1
+        self._outcomes.clear()
+        self._failures = 0
+        logger.warning(f"Redis 회로 차단 - {self.reset_timeout}초 동안 Redis 호출 즉시 실패")
+    
+    
+    async def call(self, func, *args, **kwargs):
+        """Redis 호출 실행 + 명령별 왕복 시간/실패 수 기록 (차단되어 호출하지 않은 경우는 기록 안 함)"""
+        op = getattr(func, "__name__", "evalsha")                              # 스크립트 객체는 이름이 없음
+        if op == "execute":
+            op = "pipeline"
+        
+        started = time.perf_counter()
+        try:
+            result = await self._call(func, *args, **kwargs)
+        
+        except CircuitOpenError:
+            raise
+        
+        except (redis.RedisError, OSError):
+            redis_command_errors.labels(op).inc()
+            redis_command_duration.labels(op).observe(time.perf_counter() - started)
+            raise
+        
+        redis_command_duration.labels(op).observe(time.perf_counter() - started)
+        return result
+    
+    
+    async def _call(self, func, *args, **kwargs):
+        """차단기를 거친 호출 (차단 상태면 즉시 CircuitOpenError, 제한 시간 초과는 redis.TimeoutError)"""
+        if not self.enabled:
+            return await func(*args, **kwargs)
+        
+        probe = self._allow()
+        if probe is None:
+            self.rejected += 1
+            raise CircuitOpenError("Redis circuit open")
+        
+        try:
+            result = await asyncio.wait_for(func(*args, **kwargs), self.call_timeout)
+        
+        except asyncio.TimeoutError:
+            self._record(False, probe)
+            raise redis.TimeoutError(f"Redis call exceeded {self.call_timeout}s")
+        
+        except redis.ResponseError:
+            self._record(True, probe)                                           # 서버가 응답함 (명령 오류는 장애가 아님)
+            raise
+        
+        except (redis.RedisError, OSError):
+            self._record(False, probe)
+            raise
+        
+        except BaseException:
+            if probe:                                                           # 시험 호출이 취소되면 다음 호출이 다시 시험
+                self._probing = False
+            raise
+        
+        self._record(True, probe)
+        return result
+    
+    
+    def retry_after(self) -> int:
+        """차단 해제(시험 호출)까지 남은 시간 (초)"""
+        return max(1, math.ceil(self.reset_timeout - (time.monotonic() - self.opened_at)))
+    
+    
+    def stats(self) -> dict:
+        """회로 차단기 지표"""
+        return {
+            "state": self.state,
+            "recent_calls": len(self._outcomes),
+            "recent_failures": self._failures,
+            "rejected": self.rejected,
+            "trips": self.trips
+        }
+
+
+# Redis 회로 차단기 인스턴스 (세션 관리자 / WebSocket 관리자 공유)
+redis_breaker = RedisCircuitBreaker(
+    enabled=REDIS_BREAKER,
+    call_timeout=REDIS_CALL_TIMEOUT,
+    error_rate=REDIS_BREAKER_ERROR_RATE,
+    min_calls=REDIS_BREAKER_MIN_CALLS,
+    window=REDIS_BREAKER_WINDOW,
+    reset_timeout=REDIS_BREAKER_RESET_TIMEOUT
+)
+
+
+# 메모리 세션 저장소 - Redis를 사용할 수 없을 때 RedisSessionManager가 대신 사용하는 단일 워커용 백엔드
+# 세션 ID -> 세션, 사용자명 -> 세션 ID 사전으로 O(1) 조회, 만료는 (만료 예정 시간, 세션 ID) 힙으로 처리
+# 힙 항목은 활동 갱신 시 다시 넣지 않고, 꺼낼 때 마지막 활동 기준으로 아직 유효하면 새 만료 시간으로 다시 넣음
+# 활성 세션 뷰(버전 + 변경 기록)도 Redis와 같은 형태로 유지 -> 관리자 대시보드/세션 변경 스트림이 그대로 동작
+class MemorySessionManager:
+    def __init__(self, session_ttl: int = 3600, view_activity_resolution: int = 30, view_change_log_size: int = 100000):
+        self.session_ttl = session_ttl                                          # 세션 유효 시간 (초)
+        self.view_activity_resolution = view_activity_resolution                # 활성 세션 뷰의 last_activity 갱신 최소 간격 (초)
+        self.view_change_log_size = view_change_log_size                        # 활성 세션 뷰 변경 기록 보관 수
+        self._sessions: Dict[str, dict] = {}                                    # 세션 ID -> 세션 정보
+        self._user_sessions: Dict[str, str] = {}                                # 사용자명 -> 세션 ID
+        self._expiry: List[Tuple[float, str]] = []                              # (만료 예정 시간, 세션 ID) 최소 힙
+        self._view: Dict[str, dict] = {}                                        # 사용자명 -> 활성 세션 뷰 항목
+        self._changes: "OrderedDict[str, int]" = OrderedDict()                  # 사용자명 -> 마지막 변경 버전 (버전 순)
+        self.version = 0                                                        # 활성 세션 뷰 버전
+        self.floor = 0                                                          # 정리된 변경 기록의 마지막 버전
+        self.revoked: Dict[str, float] = {}                                     # 이 저장소에서 폐기된 세션 ID -> 폐기 시간 (Redis 복구 시 전파)
+        self.removed_users: Set[str] = set()                                    # 로그아웃한 사용자 (Redis 복구 시 이전 세션 제거)
+    
+    
+    def _changed(self, username: str):
+        """뷰 변경 기록 (버전 증가, 보관 수 초과 시 오래된 기록 정리)"""
+        self.version += 1
+        self._changes[username] = self.version
+        self._changes.move_to_end(username)
+        if len(self._changes) > self.view_change_log_size:
+            _, self.floor = self._changes.popitem(last=False)
+    
+    
+    def _view_upsert(self, session: dict):
+        self._view[session["username"]] = {
+            "username": session["username"], "session_id": session["session_id"],
+            "connected_at": session["created_at"], "last_activity": session["last_activity"]
+        }
+        self._changed(session["username"])
+    
+    
+    def _view_remove(self, username: str):
+        if self._view.pop(username, None) is not None:
+            self._changed(username)
+    
+    
+    def _lookup(self, session_id: Optional[str]) -> Optional[dict]:
+        """유효한 세션 조회 (만료된 세션은 바로 제거)"""
+        session = self._sessions.get(session_id)
+        if session and session["last_activity"] + self.session_ttl <= time.time():
+            self._drop(session)
+            return None
+        return session
+    
+    
+    def _drop(self, session: dict, revoke: bool = False):
+        """세션 제거 (revoke: 로그아웃/중복 로그인으로 폐기된 세션)"""
+        session_id, username = session["session_id"], session["username"]
+        self._sessions.pop(session_id, None)
+        if self._user_sessions.get(username) == session_id:
+            del self._user_sessions[username]
+            self._view_remove(username)
+        
+        if revoke:
+            self.revoked[session_id] = time.time()
+            revocations.add(session_id)                                         # 폐기 목록 반영
+            token_cache.invalidate_session(session_id)                          # 폐기된 세션의 토큰 캐시 무효화
+    
+    
+    async def replace_session(self, username: str, session_id: str) -> tuple:
+        """기존 세션을 새 세션으로 교체 -> (생성 여부, 이전 세션 ID)"""
+        previous = self._lookup(self._user_sessions.get(username))
+        previous_session_id = previous["session_id"] if previous else None
+        if previous and previous_session_id != session_id:
+            self._drop(previous, revoke=True)
+        
+        now = time.time()
+        session = {"username": username, "session_id": session_id, "created_at": now, "last_activity": now}
+        self._sessions[session_id] = session
+        self._user_sessions[username] = session_id
+        heapq.heappush(self._expiry, (now + self.session_ttl, session_id))
+        self._view_upsert(session)
+        self.removed_users.discard(username)
+        
+        events.info("session.create", "사용자 %s 세션 생성 (메모리): %s", username, session_id, user_id=username)
+        return True, previous_session_id
+    
+    
+    async def create_session(self, username: str, session_id: str) -> bool:
+        created, _ = await self.replace_session(username, session_id)
+        return created
+    
+    
+    async def get_session(self, session_id: str) -> Optional[dict]:
+        session = self._lookup(session_id)
+        return dict(session) if session else None
+    
+    
+    def _touch(self, session_id: str, last_activity: float) -> bool:
+        session = self._lookup(session_id)
+        if session is None:
+            return False
+        
+        session["last_activity"] = max(session["last_activity"], last_activity)
+        entry = self._view.get(session["username"])
+        if entry and entry["session_id"] == session_id and session["last_activity"] - entry["last_activity"] >= self.view_activity_resolution:
+            self._view_upsert(session)
+        return True
+    
+    
+    async def update_session_activity(self, session_id: str) -> bool:
+        return self._touch(session_id, time.time())
+    
+    
+    async def touch_sessions(self, activity: Dict[str, float]) -> int:
+        return sum(1 for session_id, last_activity in activity.items() if self._touch(session_id, last_activity))
+    
+    
+    async def remove_session(self, username: str, session_id: Optional[str] = None) -> bool:
+        current = self._lookup(self._user_sessions.get(username))
+        if current is None or (session_id and current["session_id"] != session_id):
+            if current is None:
+                self.removed_users.add(username)
+            return False
+        
+        self._drop(current, revoke=True)
+        self.removed_users.add(username)
+        events.info("session.remove", "사용자 %s 세션 제거 (메모리)", username, user_id=username)
+        return True
+    
+    
+    async def is_user_active(self, username: str) -> bool:
+        return self._lookup(self._user_sessions.get(username)) is not None
+    
+    
+    async def get_presence(self, usernames: List[str]) -> Dict[str, bool]:
+        return {username: self._lookup(self._user_sessions.get(username)) is not None for username in usernames}
+    
+    
+    async def get_active_sessions(self) -> list:
+        return list(self._user_sessions)
+    
+    
+    async def get_active_view_version(self) -> int:
+        return self.version
+    
+    
+    async def get_active_view_page(self, cursor: int = 0, limit: int = 1000) -> dict:
+        """활성 세션 뷰 페이지 조회 (커서 = 순서상 위치)"""
+        entries = [dict(entry) for entry in itertools.islice(self._view.values(), cursor, cursor + limit)]
+        return {
+            "version": self.version,
+            "count": len(self._view),
+            "sessions": entries,
+            "next_cursor": cursor + limit if cursor + limit < len(self._view) else None
+        }
+    
+    
+    async def get_active_view_changes(self, since: int, limit: int = 1000) -> Optional[dict]:
+        """since 버전 이후 변경분 조회 (최근 변경부터 거슬러 올라감)"""
+        if since < self.floor or since > self.version:
+            return None
+        
+        changed = []
+        for username, version in reversed(self._changes.items()):
+            if version <= since:
+                break
+            changed.append((username, version))
+        changed.reverse()
+        
+        has_more = len(changed) > limit
+        changed = changed[:limit]
+        return {
+            "version": changed[-1][1] if has_more else self.version,
+            "changes": [dict(self._view[username]) for username, _ in changed if username in self._view],
+            "removed": [username for username, _ in changed if username not in self._view],
+            "has_more": has_more
+        }
+    
+    
+    async def cleanup_expired_sessions(self) -> int:
+        """만료 예정 시간이 지난 힙 항목만 확인 -> 정리된 세션 수"""
+        now = time.time()
+        cleaned_count = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            _, session_id = heapq.heappop(self._expiry)
+            session = self._sessions.get(session_id)
+            if session is None:                                                 # 이미 교체/삭제된 세션
+                continue
+            
+            deadline = session["last_activity"] + self.session_ttl
+            if deadline > now:                                                  # 그 사이 활동이 있었으면 새 만료 시간으로 다시 등록
+                heapq.heappush(self._expiry, (deadline, session_id))
+                continue
+            
+            self._drop(session)
+            cleaned_count += 1
+        
+        return cleaned_count
+    
+    
+    def snapshot(self) -> List[dict]:
+        """현재 유효한 사용자 세션 목록 (Redis 복구 시 이전용)"""
+        return [dict(session) for session in map(self._lookup, list(self._user_sessions.values())) if session]
+
+
+# Redis 기반 세션 관리자 - Redis 클라이언트가 없으면(연결 실패/복구 전) 메모리 세션 저장소로 같은 작업 수행
+class RedisSessionManager:
+    def __init__(self, client: Optional[aioredis.Redis] = None, breaker: Optional[RedisCircuitBreaker] = None):
+        self.redis = client                 # 비동기 Redis 클라이언트 (커넥션 풀 공유)
+        self.breaker = breaker or RedisCircuitBreaker(enabled=False)    # Redis 회로 차단기
+        self.session_ttl = 3600             # 세션 유효 시간 (1시간 = 3600초)
+        self.cleanup_batch_size = 500       # 만료 세션 정리 배치 크기 (스크립트 1회당 최대 제거 수)
+        self.view_activity_resolution = 30  # 활성 세션 뷰의 last_activity 갱신 최소 간격 (초)
+        self.view_change_log_size = 100000  # 활성 세션 뷰 변경 기록 보관 수
+        self._scripts = {}                  # 등록된 Lua 스크립트 (클라이언트별 캐시)
+        self._scripts_client = None         # 스크립트를 등록한 클라이언트
+        self.memory = MemorySessionManager(self.session_ttl, self.view_activity_resolution, self.view_change_log_size)    # Redis 미사용 시 세션 저장소
+    
+    
+    def _script(self, source: str):
+        """Lua 스크립트 등록 (EVALSHA 사용, 클라이언트 교체 시 재등록)"""
+        if self._scripts_client is not self.redis:
+            self._scripts = {}
+            self._scripts_client = self.redis
+        
+        script = self._scripts.get(source)
+        if script is None:
+            script = self._scripts[source] = self.redis.register_script(source)
+        
+        return script
+    
+    
+    async def load_scripts(self, client: Optional[aioredis.Redis] = None):
+        """Lua 스크립트를 서버에 미리 적재 (첫 요청 폭주 시 NOSCRIPT 재시도 방지)"""
+        for source in (REPLACE_SESSION_SCRIPT, TOUCH_SESSION_SCRIPT, UPGRADE_SESSION_SCRIPT, DROP_SESSION_SCRIPT,
+                       REAP_EXPIRED_SCRIPT, BACKFILL_EXPIRY_SCRIPT, REBUILD_VIEW_SCRIPT, TRIM_VIEW_CHANGES_SCRIPT,
+                       LOGIN_RATE_LIMIT_SCRIPT, LOGIN_FAILURE_SCRIPT):
+            await (client or self.redis).script_load(source)
+    
+    
+    async def replace_session(self, username: str, session_id: str) -> tuple:
+        """기존 세션을 새 세션으로 원자적 교체 -> (생성 여부, 이전 세션 ID)"""
+        if not self.redis:                  # Redis 연결 확인  
+            return await self.memory.replace_session(username, session_id)    # 연결이 없으면 메모리 저장소 사용
+            
+        try:
+            # 이전 세션 삭제 + 세션 저장(HASH) + 사용자 매핑 + 활성 목록/만료 인덱스 추가 (한 번의 왕복, TTL 1시간)
+            previous_session_id = await self.breaker.call(
+                self._script(REPLACE_SESSION_SCRIPT),
+                keys=[f"user_session:{username}", "active_sessions", "session_expiry", "revoked_sessions",
+                      f"session:{session_id}", *ACTIVE_VIEW_KEYS],
+                args=[username, session_id, self.session_ttl, time.time(), revocations.retention, revocations.channel]
+            )
+            
+            session_cache.invalidate(f"user_session:{username}")       # 이 워커의 캐시는 알림을 기다리지 않고 바로 무효화
+            if previous_session_id:
+                revocations.add(previous_session_id)                    # 이 워커에는 즉시 반영 (다른 워커는 채널로 수신)
+                token_cache.invalidate_session(previous_session_id)     # 교체된 세션의 토큰 캐시 무효화
+                session_cache.invalidate(f"session:{previous_session_id}")
+            
+            events.info("session.create", "사용자 %s 세션 생성: %s", username, session_id, user_id=username)
+            
+            return True, previous_session_id
+            
+        except Exception as e:
+            logger.error(f"세션 생성 실패: {e}")
+            return False, None
+    
+    
+    async def create_session(self, username: str, session_id: str) -> bool:
+        """새 세션 생성 (기존 세션이 있으면 교체)"""
+        created, _ = await self.replace_session(username, session_id)
+        return created
+    
+    
+    async def get_session(self, session_id: str) -> Optional[dict]:
+        """세션 정보 조회"""
+        if not self.redis:
+            return await self.memory.get_session(session_id)
+            
+        key = f"session:{session_id}"
+        cached = session_cache.get(key)
+        if cached is not None:                     # 워커 로컬 캐시 적중 (복사본 반환)
+            return dict(cached)
+            
+        try:
+            ticket = session_cache.reserve(key)
+            try:
+                session_data = await self.breaker.call(self.redis.hgetall, key)    # Redis에서 세션 데이터 조회 (HASH)
+            except redis.ResponseError as e:
+                if not str(e).startswith("WRONGTYPE"):
+                    raise
+                await self.breaker.call(self._script(UPGRADE_SESSION_SCRIPT), keys=[key])    # 이전 버전의 JSON 문자열 세션 -> HASH로 변환 후 재조회
+                session_data = await self.breaker.call(self.redis.hgetall, key)
+            
+            if session_data:
+                session_data["created_at"] = float(session_data["created_at"])          # 시간 필드는 숫자로 변환
+                session_data["last_activity"] = float(session_data["last_activity"])
+                session_cache.put(key, dict(session_data), ticket)                       # 존재하는 세션만 캐시
+                return session_data
+            
+            return None                            # 세션 데이터가 없으면 None 반환
+        
+        except Exception as e:
+            logger.error(f"세션 조회 실패: {e}")
+            return None
+    
+    
+    async def update_session_activity(self, session_id: str) -> bool:
+        """세션 활동 시간 업데이트"""
+        if not self.redis:
+            return await self.memory.update_session_activity(session_id)
+            
+        session_cache.invalidate(f"session:{session_id}")           # last_activity가 바뀌므로 캐시 무효화
+        
+        try:
+            # 마지막 활동 시간 업데이트 + TTL 연장 + 만료 인덱스 갱신 (한 번의 왕복, 세션이 없으면 0)
+            touched = await self.breaker.call(
+                self._script(TOUCH_SESSION_SCRIPT),
+                keys=[f"session:{session_id}", "session_expiry", *ACTIVE_VIEW_KEYS],
+                args=[time.time(), self.session_ttl, session_id, self.view_activity_resolution]
+            )
+            return touched == 1
+        
+        except Exception as e:
+            logger.error(f"세션 활동 업데이트 실패: {e}")
+            return False
+    
+    
+    async def touch_sessions(self, activity: Dict[str, float]) -> int:
+        """여러 세션의 활동 시간을 파이프라인 한 번으로 일괄 업데이트 -> 갱신된 세션 수"""
+        if not self.redis:
+            return await self.memory.touch_sessions(activity)
+        
+        if not activity:
+            return 0
+            
+        try:
+            touch = self._script(TOUCH_SESSION_SCRIPT)
+            pipe = self.redis.pipeline(transaction=False)           # 원자성 불필요 -> 단순 파이프라인
+            
+            for session_id, last_activity in activity.items():
+                session_cache.invalidate(f"session:{session_id}")   # last_activity가 바뀌므로 캐시 무효화
+                await touch(
+                    keys=[f"session:{session_id}", "session_expiry", *ACTIVE_VIEW_KEYS],
+                    args=[last_activity, self.session_ttl, session_id, self.view_activity_resolution],
+                    client=pipe                                     # 파이프라인에 명령만 쌓음
+                )
+            
+            results = await self.breaker.call(pipe.execute)         # 한 번의 왕복으로 일괄 전송
+            return sum(1 for touched in results if touched == 1)
+        
+        except Exception as e:
+            logger.error(f"세션 활동 일괄 업데이트 실패: {e}")
+            raise
+    
+    
+    async def remove_session(self, username: str, session_id: Optional[str] = None) -> bool:
+        """세션 제거 (session_id 지정 시 해당 세션일 때만 제거)"""
+        if not self.redis:
+            return await self.memory.remove_session(username, session_id)
+            
+        try:
+            # 세션 데이터 + 사용자 매핑 + 활성 목록/만료 인덱스 제거 (한 번의 왕복)
+            removed_session_id = await self.breaker.call(
+                self._script(DROP_SESSION_SCRIPT),
+                keys=[f"user_session:{username}", "active_sessions", "session_expiry", "revoked_sessions", *ACTIVE_VIEW_KEYS],
+                args=[username, session_id or "", time.time(), revocations.retention, revocations.channel]
+            )
+            
+            if removed_session_id:
+                revocations.add(removed_session_id)                     # 이 워커에는 즉시 반영 (다른 워커는 채널로 수신)
+                token_cache.invalidate_session(removed_session_id)      # 제거된 세션의 토큰 캐시 무효화
+                session_cache.invalidate(f"user_session:{username}")   # 이 워커의 세션 캐시 무효화
+                session_cache.invalidate(f"session:{removed_session_id}")
+                events.info("session.remove", "사용자 %s 세션 제거", username, user_id=username)
+                return True                         # 세션 제거 성공 시 True 반환
+            
+            return False                            # 세션 ID가 없으면 False 반환
+        
+        except Exception as e:
+            logger.error(f"세션 제거 실패: {e}")
+            return False
+    
+    
+    async def is_user_active(self, username: str) -> bool:
+        """사용자 활성 상태 확인"""
+        if not self.redis:
+            return await self.memory.is_user_active(username)
+            
+        key = f"user_session:{username}"
+        cached = session_cache.get(key)
+        if cached is not None:                     # 워커 로컬 캐시 적중 (세션이 없으면 빈 문자열)
+            return cached != ""
+            
+        try:
+            ticket = session_cache.reserve(key)
+            session_id = await self.breaker.call(self.redis.get, key)    # 사용자의 세션 ID 조회 - ID가 존재하면 True 반환
+            session_cache.put(key, session_id or "", ticket)
+            return session_id is not None
+            
+        except Exception as e:
+            logger.error(f"사용자 활성 상태 확인 실패: {e}")
+            return False
+    
+    
+    async def get_presence(self, usernames: List[str]) -> Dict[str, bool]:
+        """여러 사용자의 활성 상태를 MGET 한 번으로 조회 -> 사용자명별 활성 여부"""
+        if not self.redis:
+            return await self.memory.get_presence(usernames)
+        
+        if not usernames:
+            return {}
+        
+        presence = {}
+        missing = []                                # 캐시에 없는 사용자만 Redis에서 조회
+        for username in usernames:
+            cached = session_cache.get(f"user_session:{username}")
+            if cached is None:
+                missing.append(username)
+            else:
+                presence[username] = cached != ""
+        
+        if not missing:
+            return presence
+        
+        try:
+            keys = [f"user_session:{username}" for username in missing]
+            tickets = [session_cache.reserve(key) for key in keys]
+            session_ids = await self.breaker.call(self.redis.mget, keys)
+            for username, key, ticket, session_id in zip(missing, keys, tickets, session_ids):
+                session_cache.put(key, session_id or "", ticket)
+                presence[username] = session_id is not None
+            return presence
+        
+        except Exception as e:
+            logger.error(f"사용자 활성 상태 일괄 확인 실패: {e}")
+            return {username: False for username in usernames}
+    
+    
+    async def get_active_sessions(self) -> list:
+        """활성 세션 목록 조회"""
+        if not self.redis:                          # Redis 연결 확인
+            return await self.memory.get_active_sessions()    # 연결이 없으면 메모리 저장소 사용
+            
+        try:
+            active_users = list(await self.breaker.call(self.redis.smembers, "active_sessions"))    # 활성 세션 목록 조회 (set 구조)
+            return active_users                     # 활성 세션 목록 반환
+        
+        except Exception as e:
+            logger.error(f"활성 세션 목록 조회 실패: {e}")
+            return []
+    
+    
+    async def count_active_sessions(self) -> Optional[int]:
+        """활성 세션 수 (SCARD, 조회 실패/회로 차단 시 None)"""
+        if not self.redis:
+            return len(await self.memory.get_active_sessions())
+        
+        try:
+            return await self.breaker.call(self.redis.scard, "active_sessions")
+        
+        except redis.RedisError:
+            return None
+    
+    
+    async def get_active_view_version(self) -> int:
+        """활성 세션 뷰 버전 조회"""
+        if not self.redis:
+            return await self.memory.get_active_view_version()
+        
+        return int(await self.breaker.call(self.redis.get, "active_sessions_version") or 0)
+    
+    
+    async def get_active_view_page(self, cursor: int = 0, limit: int = 1000) -> dict:
+        """활성 세션 뷰 페이지 조회 (HSCAN 커서 기반) -> 버전, 전체 수, 세션 목록, 다음 커서"""
+        if not self.redis:
+            return await self.memory.get_active_view_page(cursor, limit)
+        
+        pipe = self.redis.pipeline(transaction=True)                # 버전과 데이터를 같은 시점으로 조회
+        pipe.get("active_sessions_version")
+        pipe.hlen("active_sessions_view")
+        pipe.hscan("active_sessions_view", cursor=cursor, count=limit)
+        version, total, (next_cursor, entries) = await self.breaker.call(pipe.execute)
+        
+        return {
+            "version": int(version or 0),
+            "count": total,
+            "sessions": [json_codec.loads(entry) for entry in entries.values()],
+            "next_cursor": next_cursor or None                     # 0이면 마지막 페이지
+        }
+    
+    
+    async def get_active_view_changes(self, since: int, limit: int = 1000) -> Optional[dict]:
+        """since 버전 이후 변경분 조회 -> 변경/삭제 목록 (변경 기록이 정리되어 따라잡을 수 없으면 None)"""
+        if not self.redis:
+            return await self.memory.get_active_view_changes(since, limit)
+        
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.get("active_sessions_version")
+        pipe.get("active_sessions_floor")
+        pipe.zrangebyscore("active_sessions_changes", f"({since}", "+inf", start=0, num=limit + 1, withscores=True)
+        version, floor, changed = await self.breaker.call(pipe.execute)
+        version = int(version or 0)
+        
+        if since < int(floor or 0) or since > version:              # 정리된 구간이거나 다른 뷰의 버전
+            return None
+        
+        has_more = len(changed) > limit
+        changed = changed[:limit]
+        entries = await self.breaker.call(self.redis.hmget, "active_sessions_view", [username for username, _ in changed]) if changed else []
+        
+        return {
+            "version": int(changed[-1][1]) if has_more else version,   # 다음 요청의 since
+            "changes": [json_codec.loads(entry) for entry in entries if entry],
+            "removed": [username for (username, _), entry in zip(changed, entries) if not entry],
+            "has_more": has_more
+        }
+    
+    
+    async def rebuild_active_view(self) -> int:
+        """활성 세션 뷰가 없으면 현재 활성 세션으로 재구성 (배치 단위) -> 반영된 세션 수"""
+        if not self.redis or await self.breaker.call(self.redis.exists, "active_sessions_version"):
+            return 0
+        
+        rebuilt = 0
+        async for batch in self._scan_batches("active_sessions"):
+            rebuilt += await self.breaker.call(self._script(REBUILD_VIEW_SCRIPT), keys=ACTIVE_VIEW_KEYS, args=batch)
+        
+        logger.info(f"활성 세션 뷰 재구성 완료: {rebuilt}개")
+        return rebuilt
+    
+    
+    async def backfill_expiry_index(self) -> int:
+        """만료 인덱스 도입 전 활성 세션을 인덱스에 등록 (최초 1회, 배치 단위) -> 등록된 세션 수"""
+        if not self.redis or await self.breaker.call(self.redis.exists, "session_expiry_backfilled"):
+            return 0
+        
+        added = removed = 0
+        async for batch in self._scan_batches("active_sessions"):
+            batch_added, batch_removed = await self.breaker.call(
+                self._script(BACKFILL_EXPIRY_SCRIPT),
+                keys=["active_sessions", "session_expiry", *ACTIVE_VIEW_KEYS],
+                args=[time.time(), self.session_ttl, *batch]
+            )
+            added += batch_added
+            removed += batch_removed
+        
+        await self.breaker.call(self.redis.set, "session_expiry_backfilled", 1)    # 이후 시작 시에는 건너뜀
+        logger.info(f"만료 인덱스 보충 완료: 등록 {added}개, 매핑 없는 활성 목록 항목 제거 {removed}개")
+        return added
+    
+    
+    async def _scan_batches(self, key: str):
+        """SET 멤버를 배치 단위로 순회"""
+        batch = []
+        async for member in self.redis.sscan_iter(key, count=self.cleanup_batch_size):
+            batch.append(member)
+            if len(batch) >= self.cleanup_batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    
+    async def trim_view_changes(self) -> int:
+        """활성 세션 뷰 변경 기록 정리 -> 정리된 수"""
+        if not self.redis:
+            return 0
+        
+        return await self.breaker.call(
+            self._script(TRIM_VIEW_CHANGES_SCRIPT),
+            keys=["active_sessions_changes", "active_sessions_floor"],
+            args=[self.view_change_log_size]
+        )
+    
+    
+    async def cleanup_expired_sessions(self) -> int:
+        """만료된 세션 정리 (만료 인덱스에서 배치 단위로 제거)"""
+        if not self.redis:                          # Redis 연결 확인
+            return await self.memory.cleanup_expired_sessions()    # 연결이 없으면 메모리 저장소 정리
+            
+        try:
+            cleaned_count = 0                                   # 정리된 세션 수 초기화
+            cutoff = time.time() - self.session_ttl             # 마지막 활동 시간이 이 시간 이전이면 만료
+            
+            # 만료 인덱스(ZSET)에서 기준 시간 이전 사용자만 배치 단위로 제거 -> 전체 세션을 순회하지 않음
+            while True:
+                reaped = await self.breaker.call(
+                    self._script(REAP_EXPIRED_SCRIPT),
+                    keys=["session_expiry", "active_sessions", *ACTIVE_VIEW_KEYS],
+                    args=[cutoff, self.cleanup_batch_size]
+                )
+                cleaned_count += reaped                         # 정리된 세션 수 증가
+                
+                if reaped < self.cleanup_batch_size:            # 남은 만료 세션이 없으면 종료
+                    break
+                
+                await asyncio.sleep(0)                          # 배치 사이에 다른 작업에 이벤트 루프 양보
+            
+            logger.info("만료된 세션 %d개 정리 완료", cleaned_count)
+            return cleaned_count
+            
+        except Exception as e:
+            logger.error(f"세션 정리 실패: {e}")
+            return 0
+    
+    
+    async def attach(self, client: aioredis.Redis) -> int:
+        """Redis 복구 시 메모리 세션을 Redis로 옮긴 뒤 Redis 기반으로 전환 -> 옮긴 세션 수"""
+        await self.load_scripts(client)
+        replace = client.register_script(REPLACE_SESSION_SCRIPT)
+        drop = client.register_script(DROP_SESSION_SCRIPT)
+        
+        # 옮기는 동안 메모리 저장소가 바뀌면(로그인/로그아웃/활동) 다시 옮김 -> 마지막 확인과 전환 사이에는 await 없음
+        replaced = set()                                                # 모든 시도에서 교체된 Redis 세션 ID (전환 후 한 번에 폐기 반영)
+        while True:
+            state = self.memory.version, len(self.memory.revoked), len(self.memory.removed_users)
+            sessions = self.memory.snapshot()
+            now = time.time()
+            pipe = client.pipeline(transaction=False)
+            
+            for session in sessions:                                    # 메모리 세션 저장 (같은 사용자의 기존 Redis 세션은 교체/폐기)
+                remaining_ttl = max(1, math.ceil(session["last_activity"] + self.session_ttl - now))    # 남은 유효 시간만 유지
+                await replace(
+                    keys=[f"user_session:{session['username']}", "active_sessions", "session_expiry", "revoked_sessions",
+                          f"session:{session['session_id']}", *ACTIVE_VIEW_KEYS],
+                    args=[session["username"], session["session_id"], remaining_ttl, now, revocations.retention, revocations.channel,
+                          session["created_at"], session["last_activity"]],
+                    client=pipe
+                )
+            for username in self.memory.removed_users - {session["username"] for session in sessions}:
+                await drop(                                             # 메모리 모드에서 로그아웃한 사용자의 기존 Redis 세션 제거
+                    keys=[f"user_session:{username}", "active_sessions", "session_expiry", "revoked_sessions", *ACTIVE_VIEW_KEYS],
+                    args=[username, "", now, revocations.retention, revocations.channel],
+                    client=pipe
+                )
+            for session_id, revoked_at in self.memory.revoked.items():  # 메모리 모드에서 폐기된 세션을 다른 워커에 전파
+                pipe.zadd("revoked_sessions", {session_id: revoked_at})
+                pipe.publish(revocations.channel, session_id)
+            
+            results = await self.breaker.call(pipe.execute)
+            for session, previous_session_id in zip(sessions, results):    # 다시 옮길 때는 자기 세션 ID가 반환됨 -> 제외
+                if previous_session_id and previous_session_id != session["session_id"]:
+                    replaced.add(previous_session_id)
+            if state == (self.memory.version, len(self.memory.revoked), len(self.memory.removed_users)):
+                break
+        
+        for previous_session_id in replaced - {session["session_id"] for session in sessions}:    # 교체된 Redis 세션 폐기 반영
+            revocations.add(previous_session_id)
+            token_cache.invalidate_session(previous_session_id)
+        
+        self.redis = client
+        session_cache.clear()
+        self.memory = MemorySessionManager(self.session_ttl, self.view_activity_resolution, self.view_change_log_size)
+        return len(sessions)
+
+# Redis 세션 매니저 인스턴스
+session_manager = RedisSessionManager(redis_client, redis_breaker)
+
+
+# heartbeat 활동 시간 버퍼 - 세션별 최신 활동 시간만 메모리에 기록하고 주기적으로 일괄 반영
+class SessionActivityBuffer:
+    def __init__(self, manager: RedisSessionManager, flush_interval: float = 5.0, batch_size: int = 1000):
+        self.manager = manager                          # 활동 시간을 반영할 세션 관리자
+        self.flush_interval = flush_interval            # 일괄 반영 주기 (초)
+        self.batch_size = batch_size                    # 파이프라인 1회당 최대 세션 수
+        self._pending: Dict[str, float] = {}            # 세션 ID -> 마지막 heartbeat 시간 (반영 대기)
+    
+    
+    def record(self, session_id: str):
+        """heartbeat 기록 (Redis 호출 없음, 같은 세션은 최신 시간으로 덮어씀)"""
+        self._pending[session_id] = time.time()
+    
+    
+    async def flush(self) -> int:
+        """대기 중인 활동 시간을 Redis에 일괄 반영 -> 갱신된 세션 수"""
+        if not self._pending:
+            return 0
+        
+        pending, self._pending = self._pending, {}      # 반영 중 들어온 heartbeat는 다음 주기로
+        items = list(pending.items())
+        touched = 0
+        
+        for start in range(0, len(items), self.batch_size):
+            batch = dict(items[start:start + self.batch_size])
+            try:
+                touched += await self.manager.touch_sessions(batch)
+            
+            except Exception:
+                # 실패한 배치는 다음 주기에 재시도 (그 사이 더 최신 heartbeat가 있으면 그것을 유지)
+                for session_id, last_activity in batch.items():
+                    self._pending.setdefault(session_id, last_activity)
+        
+        return touched
+    
+    
+    async def run(self):
+        """주기적으로 대기 중인 활동 시간 반영"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            
+            except Exception as e:
+                logger.error(f"세션 활동 반영 실패: {e}")
+
+
+# 세션 활동 버퍼 인스턴스
+activity_buffer = SessionActivityBuffer(session_manager)
+
+
+# 세션 폐기 목록 - 로그아웃/중복 로그인으로 제거된 세션의 토큰을 요청마다 Redis 조회 없이 메모리에서 거부
+# 폐기는 세션 Lua 스크립트가 revoked_sessions(ZSET)에 기록하고 채널로 발행하며, 각 워커는 구독하여 로컬 목록을 갱신
+class SessionRevocationList:
+    def __init__(self, manager: RedisSessionManager, retention: float = 3600.0):
+        self.manager = manager                          # Redis 클라이언트를 공유하는 세션 관리자
+        self.retention = retention                      # 폐기 기록 보관 시간 (초, 토큰 유효 기간 1시간 이후에는 불필요)
+        self.channel = "session_revocations"            # 폐기 알림 채널
+        self._revoked: Dict[str, float] = {}            # 세션 ID -> 폐기 시간
+    
+    
+    def add(self, session_id: str, revoked_at: Optional[float] = None):
+        """폐기된 세션 기록"""
+        self._revoked[session_id] = revoked_at or time.time()
+    
+    
+    def is_revoked(self, session_id: Optional[str]) -> bool:
+        """폐기 여부 확인 (메모리 조회만 수행)"""
+        return session_id in self._revoked
+    
+    
+    def prune(self) -> int:
+        """보관 시간이 지난 기록 제거 -> 제거된 수"""
+        cutoff = time.time() - self.retention
+        expired = [session_id for session_id, revoked_at in self._revoked.items() if revoked_at < cutoff]
+        for session_id in expired:
+            del self._revoked[session_id]
+        return len(expired)
+    
+    
+    async def sync(self) -> int:
+        """Redis의 폐기 기록을 로컬 목록에 반영 (시작 시, 재구독 시 놓친 알림 따라잡기) -> 반영된 수"""
+        if not self.manager.redis:
+            return 0
+        
+        entries = await self.manager.breaker.call(self.manager.redis.zrangebyscore, "revoked_sessions", time.time() - self.retention, "+inf", withscores=True)
+        for session_id, revoked_at in entries:
+            self.add(session_id, revoked_at)
+        return len(entries)
+    
+    
+    async def listen(self):
+        """폐기 채널 구독 - 구독 직후 따라잡기, 연결이 끊기면 재구독"""
+        while self.manager.redis:
+            pubsub = self.manager.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                await self.sync()                                       # 구독 전/끊긴 동안 폐기된 세션 반영
+                
+                async for message in pubsub_messages(pubsub):
+                    session_id = message["data"]
+                    self.add(session_id)
+                    token_cache.invalidate_session(session_id)          # 다른 워커에서 폐기된 세션의 토큰 캐시 무효화
+            
+            except asyncio.CancelledError:
+                raise
+            
+            except Exception as e:
+                logger.error(f"세션 폐기 채널 구독 실패: {e}")
+                await asyncio.sleep(1)                                  # 잠시 후 재구독
+            
+            finally:
+                await pubsub.aclose()
+    
+    
+    def stats(self) -> dict:
+        """폐기 목록 지표"""
+        return {"revoked_sessions": len(self._revoked)}
+
+
+# 세션 폐기 목록 인스턴스
+revocations = SessionRevocationList(session_manager, retention=session_manager.session_ttl)
+
+
+# 세션 캐시 설정 (환경 변수로 조정 가능)
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))                      # 워커 로컬 세션 캐시 최대 항목 수 (0이면 사용 안 함)
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "60"))                         # 캐시 항목 최대 유지 시간 (초, 알림 유실 대비 상한)
+SESSION_CACHE_PROBE_INTERVAL = float(os.getenv("SESSION_CACHE_PROBE_INTERVAL", "10"))   # 무효화 지연 측정 주기 (초, 0이면 측정 안 함)
+SESSION_CACHE_KEYSPACE_EVENTS = "Kgh$xe"                                                # 필요한 키 공간 알림 (일반/해시/문자열 명령, 만료, 축출)
+SESSION_CACHE_NOTIFY_CONFIG = os.getenv("SESSION_CACHE_NOTIFY_CONFIG", "on") != "off"   # 시작 시 CONFIG로 알림 설정 (off: 서버 설정을 그대로 사용)
+
+
+# 세션 캐시 - get_session / is_user_active / get_presence 결과를 워커 메모리에 보관 (LRU + TTL)
+# Redis 키 공간 알림(session:*, user_session:*)을 구독해 다른 워커/노드에서 바뀐 키를 수 ms 안에 제거
+# 구독 중에만 사용하고, 구독이 끊기면 캐시를 비운 뒤 재구독할 때까지 Redis를 직접 조회
+class SessionCache:
+    def __init__(self, manager: RedisSessionManager, max_size: int = 10000, ttl: float = 60.0, probe_interval: float = 10.0):
+        self.manager = manager                                                  # Redis 클라이언트를 공유하는 세션 관리자
+        self.max_size = max_size                                                # 최대 항목 수
+        self.ttl = ttl                                                          # 항목 최대 유지 시간 (초)
+        self.probe_interval = probe_interval                                    # 무효화 지연 측정 주기 (초)
+        self.probe_key = f"session_cache_probe:{uuid.uuid4().hex}"              # 지연 측정용 키 (워커별)
+        self._entries: "OrderedDict[str, Tuple[float, Union[dict, str]]]" = OrderedDict()    # Redis 키 -> (만료 시간, 값), 오래 안 쓴 순서
+        self._pending: Dict[str, int] = {}                                      # 조회 중인 키 -> 예약 번호 (조회 중 무효화되면 저장하지 않음)
+        self._tickets = itertools.count()                                       # 예약 번호
+        self._probe_sent: Optional[float] = None                                # 지연 측정 키를 쓴 시간 (perf_counter)
+        self.subscribed = False                                                 # 무효화 알림 구독 중 여부
+        self.hits = 0                                                           # 캐시 적중 수
+        self.misses = 0                                                         # 캐시 미스 수
+        self.invalidations = 0                                                  # 알림/쓰기로 제거된 항목 수
+        self.lag: Optional[float] = None                                        # 마지막으로 측정한 무효화 지연 (초)
+    
+    
+    @property
+    def active(self) -> bool:
+        """캐시 사용 가능 여부 (알림 구독 중일 때만)"""
+        return self.subscribed and self.max_size > 0
+    
+    
+    def get(self, key: str) -> Optional[Union[dict, str]]:
+        """유효한 캐시 값 조회 (만료된 항목은 제거)"""
+        if not self.active:
+            return None
+        
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)                                          # 최근 사용으로 갱신
+        self.hits += 1
+        return entry[1]
+    
+    
+    def reserve(self, key: str) -> Optional[int]:
+        """Redis 조회 전 예약 -> 예약 번호 (캐시 미사용 시 None)"""
+        if not self.active:
+            return None
+        
+        if len(self._pending) >= self.max_size:                                 # 실패한 조회가 남긴 예약 정리 (저장만 건너뜀)
+            self._pending.clear()
+        
+        ticket = self._pending[key] = next(self._tickets)
+        return ticket
+    
+    
+    def put(self, key: str, value: Union[dict, str], ticket: Optional[int]):
+        """조회 결과 저장 - 예약 이후 무효화되었으면 오래된 값이므로 저장하지 않음"""
+        if ticket is None or self._pending.get(key) != ticket:
+            return
+        
+        del self._pending[key]
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.max_size:                               # 가장 오래 사용하지 않은 항목부터 제거
+            self._entries.popitem(last=False)
+    
+    
+    def invalidate(self, key: str):
+        """키 무효화 (진행 중인 조회 결과도 저장하지 않음)"""
+        self._pending.pop(key, None)
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+    
+    
+    def clear(self):
+        """전체 무효화"""
+        self._entries.clear()
+        self._pending.clear()
+    
+    
+    async def listen(self):
+        """키 공간 알림 구독 - 구독 확인 후 캐시 사용, 연결이 끊기면 캐시를 비우고 재구독"""
+        while self.manager.redis and self.max_size > 0:
+            client = self.manager.redis
+            prefix = f"__keyspace@{client.connection_pool.connection_kwargs.get('db', 0)}__:"
+            pubsub = client.pubsub()
+            prober = None
+            try:
+                if SESSION_CACHE_NOTIFY_CONFIG:
+                    await self._enable_notifications(client)
+                await pubsub.psubscribe(f"{prefix}session:*", f"{prefix}user_session:*")
+                await pubsub.subscribe(prefix + self.probe_key)
+                
+                confirmed = 0
+                while confirmed < 3:                                            # 구독이 확정된 뒤에야 이후 변경 알림을 받을 수 있음
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is not None and message["type"] in ("psubscribe", "subscribe"):
+                        confirmed += 1
+                
+                self.clear()
+                self.subscribed = True
+                if self.probe_interval > 0:
+                    prober = asyncio.create_task(self._probe(client))
+                
+                async for message in pubsub_messages(pubsub):
+                    self._on_notification(message["channel"][len(prefix):], message["data"])
+            
+            except asyncio.CancelledError:
+                raise
+            
+            except Exception as e:
+                logger.error(f"세션 캐시 무효화 알림 구독 실패: {e}")
+                await asyncio.sleep(1)                                          # 잠시 후 재구독
+            
+            finally:
+                self.subscribed = False                                         # 알림을 놓쳤을 수 있으므로 캐시 비우고 사용 중지
+                self.clear()
+                if prober is not None:
+                    prober.cancel()
+                await pubsub.aclose()
+    
+    
+    def _on_notification(self, key: str, event: str):
+        """키 공간 알림 처리 - 값이 바뀌는 이벤트만 무효화 (TTL 연장은 무시)"""
+        if key == self.probe_key:
+            if self._probe_sent is not None:
+                self.lag = time.perf_counter() - self._probe_sent
+                session_cache_invalidation_lag.observe(self.lag)
+                self._probe_sent = None
+            return
+        
+        if event != "expire":
+            self.invalidate(key)
+    
+    
+    async def _probe(self, client: aioredis.Redis):
+        """주기적으로 측정용 키를 써서 쓰기 -> 알림 수신까지의 지연 측정"""
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                self._probe_sent = time.perf_counter()
+                await self.manager.breaker.call(client.set, self.probe_key, "1", px=int(self.probe_interval * 3000))
+            
+            except redis.RedisError as e:
+                logger.debug(f"세션 캐시 지연 측정 실패: {e}")
+    
+    
+    async def _enable_notifications(self, client: aioredis.Redis):
+        """필요한 키 공간 알림 이벤트 추가 (CONFIG 명령이 막힌 환경은 서버 설정을 그대로 사용)"""
+        try:
+            current = (await client.config_get("notify-keyspace-events")).get("notify-keyspace-events", "")
+        except redis.ResponseError:
+            current = ""
+        
+        if set(SESSION_CACHE_KEYSPACE_EVENTS) <= set(current) or ("A" in current and "K" in current):
+            return
+        
+        try:
+            await client.config_set("notify-keyspace-events", "".join(sorted(set(current) | set(SESSION_CACHE_KEYSPACE_EVENTS))))
+        except redis.ResponseError as e:
+            logger.warning(f"키 공간 알림 설정 실패 - 서버의 notify-keyspace-events에 {SESSION_CACHE_KEYSPACE_EVENTS} 필요: {e}")
+    
+    
+    def stats(self) -> dict:
+        """캐시 지표"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.active,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            "invalidation_lag_ms": round(self.lag * 1000, 3) if self.lag is not None else None
+        }
+
+
+# 세션 캐시 인스턴스
+session_cache = SessionCache(session_manager, SESSION_CACHE_SIZE, SESSION_CACHE_TTL, SESSION_CACHE_PROBE_INTERVAL)
+
+
+# 로그인 속도 제한 설정 (환경 변수로 조정 가능)
+LOGIN_RATE_LIMIT = os.getenv("LOGIN_RATE_LIMIT", "on") != "off"                 # 로그인 속도 제한 사용 여부
+LOGIN_USER_BURST = int(os.getenv("LOGIN_USER_BURST", "5"))                      # 사용자명별 연속 허용 시도 수
+LOGIN_USER_PER_MINUTE = float(os.getenv("LOGIN_USER_PER_MINUTE", "10"))         # 사용자명별 분당 충전 시도 수
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "20"))                         # IP별 연속 허용 시도 수
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "60"))             # IP별 분당 충전 시도 수
+LOGIN_LOCKOUT_THRESHOLD = int(os.getenv("LOGIN_LOCKOUT_THRESHOLD", "10"))       # 잠금까지 허용하는 연속 비밀번호 실패 수
+LOGIN_LOCKOUT_WINDOW = int(os.getenv("LOGIN_LOCKOUT_WINDOW", "900"))            # 실패 횟수 집계 기간 (초)
+LOGIN_LOCKOUT_SECONDS = int(os.getenv("LOGIN_LOCKOUT_SECONDS", "900"))          # 계정 잠금 시간 (초)
+LOGIN_LIMITER_LOCAL_SIZE = int(os.getenv("LOGIN_LIMITER_LOCAL_SIZE", "100000")) # 워커 로컬 사전 필터가 기억하는 최대 키 수
+
+# 로그인 속도 제한: 사용자명/IP 토큰 버킷 2개 + 계정 잠금을 한 번에 확인 -> {대기 시간(ms), 제한 범위}
+# 두 버킷 모두 토큰이 있을 때만 함께 차감 (한쪽만 소모되지 않음), 거절 시에는 상태를 기록하지 않음
+# KEYS[1]=login_rate:user:{username}, KEYS[2]=login_rate:ip:{ip}, KEYS[3]=login_lockout:{username}
+# ARGV[1]=현재 시간, ARGV[2]=사용자 버킷 크기, ARGV[3]=사용자 초당 충전량, ARGV[4]=IP 버킷 크기, ARGV[5]=IP 초당 충전량
+LOGIN_RATE_LIMIT_SCRIPT = """
+local locked = redis.call('PTTL', KEYS[3])
+if locked > 0 then
+    return {locked, 'lockout'}
+end
+local now = tonumber(ARGV[1])
+local function refill(key, burst, rate)
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    return math.min(burst, tokens + math.max(0, now - ts) * rate)
+end
+local buckets = {
+    {KEYS[1], tonumber(ARGV[2]), tonumber(ARGV[3]), 'user'},
+    {KEYS[2], tonumber(ARGV[4]), tonumber(ARGV[5]), 'ip'}
+}
+local wait, scope = 0, ''
+for i, bucket in ipairs(buckets) do
+    bucket[5] = refill(bucket[1], bucket[2], bucket[3])
+    if bucket[5] < 1 and (1 - bucket[5]) / bucket[3] > wait then
+        wait, scope = (1 - bucket[5]) / bucket[3], bucket[4]
+    end
+end
+if scope ~= '' then
+    return {math.ceil(wait * 1000), scope}
+end
+for i, bucket in ipairs(buckets) do
+    redis.call('HSET', bucket[1], 'tokens', bucket[5] - 1, 'ts', ARGV[1])
+    redis.call('PEXPIRE', bucket[1], math.ceil(bucket[2] / bucket[3] * 1000))
+end
+return {0, ''}
+"""
+
+# 비밀번호 실패 기록: 집계 기간 내 실패가 기준에 도달하면 계정 잠금 -> 잠금 시간(ms), 잠기지 않으면 0
+# KEYS[1]=login_failures:{username}, KEYS[2]=login_lockout:{username}
+# ARGV[1]=잠금 기준 실패 수, ARGV[2]=집계 기간, ARGV[3]=잠금 시간
+LOGIN_FAILURE_SCRIPT = """
+local failures = redis.call('INCR', KEYS[1])
+if failures == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+if failures >= tonumber(ARGV[1]) then
+    redis.call('SET', KEYS[2], '1', 'EX', ARGV[3])
+    redis.call('DEL', KEYS[1])
+    return tonumber(ARGV[3]) * 1000
+end
+return 0
+"""
+
+
+# 로그인 속도 제한 - 사용자명/IP별 토큰 버킷과 비밀번호 연속 실패 시 계정 잠금 (모든 워커가 Redis 상태 공유)
+# 워커 로컬 사전 필터: 같은 설정의 로컬 버킷(이 워커의 시도만 집계)이 비어 있으면 전체 버킷도 비어 있으므로 Redis 없이 거절,
+# Redis가 거절한 키는 대기 시간 동안 기억해 같은 키의 반복 시도를 왕복 없이 거절
+class LoginRateLimiter:
+    def __init__(self, manager: RedisSessionManager, enabled: bool = True, local_size: int = 100000):
+        self.manager = manager                                                  # Redis 클라이언트를 공유하는 세션 관리자
+        self.enabled = enabled                                                  # 속도 제한 사용 여부
+        self.local_size = local_size                                            # 로컬 사전 필터 최대 키 수
+        self.limits = {                                                         # 범위 -> (버킷 크기, 초당 충전량)
+            "user": (LOGIN_USER_BURST, LOGIN_USER_PER_MINUTE / 60),
+            "ip": (LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE / 60)
+        }
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # 키 -> (남은 토큰, 갱신 시간), LRU
+        self._blocked: "OrderedDict[str, float]" = OrderedDict()                # 키 -> 거절 만료 시간, LRU
+        self.rejected_local = 0                                                 # Redis 왕복 없이 거절한 수
+        self.rejected_remote = 0                                                # Redis 스크립트가 거절한 수
+        self.lockouts = 0                                                       # 이 워커에서 발생한 계정 잠금 수
+    
+    
+    @staticmethod
+    def _reject(retry_after: float):
+        raise HTTPException(
+            status_code=429,
+            detail="로그인 시도가 너무 많습니다. 잠시 후 다시 시도하세요.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+    
+    
+    def _remember(self, table: OrderedDict, key: str, value):
+        table[key] = value
+        table.move_to_end(key)
+        if len(table) > self.local_size:
+            table.popitem(last=False)                                           # 가장 오래 사용하지 않은 키 제거
+    
+    
+    def _take_local(self, keys: Dict[str, str], now: float) -> float:
+        """로컬 버킷에서 토큰 차감 -> 부족하면 대기 시간 (차감하지 않음)"""
+        refilled = {}
+        wait = 0.0
+        for scope, key in keys.items():
+            burst, rate = self.limits[scope]
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            refilled[key] = min(burst, tokens + (now - updated_at) * rate)
+            if refilled[key] < 1:
+                wait = max(wait, (1 - refilled[key]) / rate)
+        
+        if wait == 0.0:
+            for key, tokens in refilled.items():
+                self._remember(self._buckets, key, (tokens - 1, now))
+        return wait
+    
+    
+    async def check(self, username: str, ip: str):
+        """로그인 시도 허용 여부 확인 (초과 시 429 + Retry-After)"""
+        if not self.enabled:
+            return
+        
+        now = time.time()
+        keys = {"user": f"login_rate:user:{username}", "ip": f"login_rate:ip:{ip}"}
+        lockout_key = f"login_lockout:{username}"
+        
+        # 1. 로컬 사전 필터 - Redis가 이미 거절한 키 / 이 워커의 시도만으로 버킷 초과
+        blocked_until = max(self._blocked.get(key, 0.0) for key in (*keys.values(), lockout_key))
+        if blocked_until > now:
+            self.rejected_local += 1
+            self._reject(blocked_until - now)
+        
+        wait = self._take_local(keys, now)
+        if wait > 0:
+            self.rejected_local += 1
+            self._reject(wait)
+        
+        if not self.manager.redis:                                              # Redis 미사용 시 로컬 제한만 적용
+            return
+        
+        # 2. 전체 워커 공유 버킷 + 계정 잠금 (한 번의 왕복)
+        try:
+            wait_ms, scope = await self.manager.breaker.call(
+                self.manager._script(LOGIN_RATE_LIMIT_SCRIPT),
+                keys=[keys["user"], keys["ip"], lockout_key],
+                args=[now, *self.limits["user"], *self.limits["ip"]]
+            )
+        
+        except redis.RedisError as e:
+            logger.error(f"로그인 속도 제한 확인 실패 (로컬 제한만 적용): {e}")
+            return
+        
+        if int(wait_ms) > 0:
+            self.rejected_remote += 1
+            self._remember(self._blocked, lockout_key if scope == "lockout" else keys[scope], now + int(wait_ms) / 1000)
+            self._reject(int(wait_ms) / 1000)
+    
+    
+    async def record_failure(self, username: str):
+        """비밀번호 실패 기록 - 기준 도달 시 계정 잠금"""
+        if not self.enabled or not self.manager.redis:
+            return
+        
+        try:
+            locked_ms = await self.manager.breaker.call(
+                self.manager._script(LOGIN_FAILURE_SCRIPT),
+                keys=[f"login_failures:{username}", f"login_lockout:{username}"],
+                args=[LOGIN_LOCKOUT_THRESHOLD, LOGIN_LOCKOUT_WINDOW, LOGIN_LOCKOUT_SECONDS]
+            )
+        
+        except redis.RedisError as e:
+            logger.error(f"로그인 실패 기록 실패: {e}")
+            return
+        
+        if int(locked_ms) > 0:
+            self.lockouts += 1
+            self._remember(self._blocked, f"login_lockout:{username}", time.time() + int(locked_ms) / 1000)
+            logger.warning(f"사용자 {username} 비밀번호 연속 실패 - {LOGIN_LOCKOUT_SECONDS}초 동안 로그인 잠금")
+    
+    
+    async def record_success(self, username: str):
+        """로그인 성공 시 실패 횟수 초기화"""
+        if not self.enabled or not self.manager.redis:
+            return
+        
+        try:
+            await self.manager.breaker.call(self.manager.redis.delete, f"login_failures:{username}")
+        
+        except redis.RedisError as e:
+            logger.error(f"로그인 실패 횟수 초기화 실패: {e}")
+    
+    
+    def stats(self) -> dict:
+        """속도 제한 지표"""
+        return {
+            "enabled": self.enabled,
+            "tracked_keys": len(self._buckets),
+            "rejected_local": self.rejected_local,
+            "rejected_remote": self.rejected_remote,
+            "lockouts": self.lockouts
+        }
+
+
+# 로그인 속도 제한 인스턴스
+login_limiter = LoginRateLimiter(session_manager, enabled=LOGIN_RATE_LIMIT, local_size=LOGIN_LIMITER_LOCAL_SIZE)
+
+# WebSocket 송신 큐 설정 (환경 변수로 조정 가능)
+WS_OUTBOX_SIZE = int(os.getenv("WS_OUTBOX_SIZE", "100"))                       # 연결당 최대 대기 메시지 수
+WS_OUTBOX_POLICY = os.getenv("WS_OUTBOX_POLICY", "coalesce")                   # 큐 초과 시 정책 (drop_oldest / coalesce / disconnect)
+
+
+# 직렬화된 메시지 - JSON 텍스트 하나를 모든 연결/워커가 공유하고, 다른 코덱 형식은 처음 필요할 때 한 번만 변환
+class Frame:
+    __slots__ = ("text", "message", "encoded")
+    
+    def __init__(self, text: str, message: Optional[dict] = None):
+        self.text = text                                            # JSON 텍스트 (제어 채널로 그대로 전달)
+        self.message = message                                      # 원본 메시지 (다른 워커에서 받은 경우 None)
+        self.encoded: Optional[Dict[str, bytes]] = None             # 코덱 이름 -> 바이너리 프레임 데이터
+    
+    
+    def encode(self, codec: Codec) -> Union[str, bytes]:
+        """코덱별 프레임 데이터 (JSON은 텍스트 그대로, 바이너리 코덱은 변환 결과를 모든 연결이 공유)"""
+        if not codec.binary:
+            return self.text
+        
+        if self.encoded is None:
+            self.encoded = {}
+        
+        data = self.encoded.get(codec.name)
+        if data is None:
+            if self.message is None:
+                self.message = json_codec.loads(self.text)
+            data = self.encoded[codec.name] = codec.dumps(self.message)
+        return data
+
+
+# 연결 레코드 - 소켓 하나의 상태(사용자, 세션, 시간, 카운터, 구독, 코덱, 송신 큐)를 __slots__ 객체 하나에 보관
+# 송신 큐는 전용 writer Task가 순서대로 전송하고, 가득 차면 정책에 따라 처리
+# 메시지 생산자(로그인, 브로드캐스트 등)는 큐에 넣기만 하므로 느린 클라이언트에 막히지 않음
+class Connection:
+    __slots__ = ("websocket", "user_id", "session_id", "connected_at", "last_seen", "messages_in", "messages_out", "topics",
+                 "codec", "idle_slot", "max_size", "policy", "queue", "waiter", "task", "dropped", "close_request")
+    
+    def __init__(self, websocket: WebSocket, user_id: str, max_size: int, policy: str, session_id: Optional[str] = None,
+                 codec: Optional[Codec] = None):
+        self.websocket = websocket                                  # 대상 WebSocket
+        self.user_id = user_id                                      # 사용자 ID
+        self.session_id = session_id                                # 토큰의 세션 ID
+        self.connected_at = time.time()                             # 연결 시간
+        self.last_seen = time.monotonic()                           # 마지막 수신 시간 (monotonic, 유휴 판정용)
+        self.messages_in = 0                                        # 수신 메시지 수
+        self.messages_out = 0                                       # 전송 메시지 수
+        self.topics: Optional[Set[str]] = None                      # 구독 토픽 (첫 구독 시 생성)
+        self.codec = codec or json_codec                            # 서브프로토콜로 협상한 프레임 형식
+        self.idle_slot: Optional[int] = None                        # 유휴 연결 정리기 타이머 휠 슬롯
+        self.max_size = max_size                                    # 최대 대기 메시지 수 -> 연결당 메모리 상한
+        self.policy = policy                                        # 큐 초과 시 정책
+        self.queue: Deque[Tuple[Optional[str], Union[Frame, str]]] = deque()    # (메시지 타입, 직렬화된 메시지 또는 텍스트)
+        self.waiter: Optional[asyncio.Future] = None                # 대기 중인 writer 깨우기 (Event 대신 Future 하나만 사용)
+        self.task: Optional[asyncio.Task] = None                    # writer Task
+        self.dropped = 0                                            # 정책에 의해 버려진 메시지 수
+        self.close_request: Optional[Tuple[int, str]] = None        # 종료 요청 (코드, 사유)
+    
+    
+    def put(self, data: Union[Frame, str], msg_type: Optional[str] = None) -> bool:
+        """메시지 적재 -> 적재 여부 (소켓 전송을 기다리지 않음)"""
+        if self.close_request is not None:                          # 종료 예정 연결에는 적재하지 않음
+            return False
+        
+        if len(self.queue) >= self.max_size:                        # 큐가 가득 찬 경우 정책 적용
+            if self.policy == "disconnect":
+                self.dropped += len(self.queue) + 1
+                self.queue.clear()                                  # 밀린 메시지는 버리고 바로 종료
+                self.request_close(1008, "Outbound queue overflow")
+                return False
+            
+            self._make_room(msg_type)
+        
+        self.queue.append((msg_type, data))
+        self._wake()
+        return True
+    
+    
+    def _make_room(self, msg_type: Optional[str]):
+        """큐 공간 확보 - coalesce는 같은 타입의 이전 메시지를, 그 외에는 가장 오래된 메시지를 버림"""
+        if self.policy == "coalesce" and msg_type is not None:
+            for index, (queued_type, _) in enumerate(self.queue):
+                if queued_type == msg_type:
+                    del self.queue[index]                           # 같은 타입은 최신 메시지만 유지
+                    self.dropped += 1
+                    return
+        
+        self.queue.popleft()                                        # 가장 오래된 메시지 버림
+        self.dropped += 1
+    
+    
+    def request_close(self, code: int, reason: str):
+        """대기 중인 메시지를 보낸 뒤 연결 종료 요청"""
+        if self.close_request is None:
+            self.close_request = (code, reason)
+            self._wake()
+    
+    
+    def _wake(self):
+        """대기 중인 writer 깨우기"""
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+
+# 최적화된 WebSocket 관리자
+class OptimizedWebSocketManager:
+    def __init__(self):
+        self.connections: Dict[WebSocket, Connection] = {}                      # 소켓 -> 연결 레코드 (연결 상태의 단일 저장소)
+        self.user_connections: Dict[str, Set[Connection]] = {}                  # 사용자 ID -> 연결 레코드 (사용자별 전송/종료용 색인)
+        self.last_cleanup = time.time()                                         # 마지막 정리 시간
+        self.cleanup_interval = 300                                             # 5분 마다 정리
+        self.max_connections_per_user = int(os.getenv("WS_MAX_CONNECTIONS_PER_USER", "3"))    # 사용자당 최대 연결 수
+        self.worker_id = uuid.uuid4().hex                                       # 워커 식별자 (자신이 발행한 제어 메시지 무시용)
+        self.control_channel = "ws_control"                                     # 워커 간 제어 메시지 채널 (Redis pub/sub)
+        self.send_timeout = 2.0                                                 # 소켓별 전송/종료 기한 (초) -> 초과 시 연결 제거
+        self.outbox_size = WS_OUTBOX_SIZE                                       # 연결당 최대 대기 메시지 수
+        self.outbox_policy = WS_OUTBOX_POLICY                                   # 큐 초과 시 정책
+        self.dropped_total = 0                                                  # 해제된 연결에서 버려진 메시지 수 누계
+        self.overflow_disconnects = 0                                           # 큐 초과로 종료된 연결 수
+        self.topic_subscribers: Dict[str, Set[Connection]] = {}                 # 토픽 -> 구독 연결 (연결별 구독 토픽은 레코드에 보관)
+        self.max_topics_per_connection = 20                                     # 연결당 최대 구독 토픽 수
+    
+    
+    async def connect(self, websocket: WebSocket, user_id: str, session_id: Optional[str] = None,
+                      codec: Optional[Codec] = None) -> Optional[Connection]:
+        """WebSocket 연결 등록 -> 연결 레코드 (사용자당 연결 수 초과 시 None)"""
+        # 연결 수 제한 확인
+        if len(self.user_connections.get(user_id, ())) >= self.max_connections_per_user:  # 사용자별 연결 수가 최대 연결 수를 초과한 경우
+            events.warning("ws.reject", "사용자 %s의 연결 수 제한 도달", user_id, user_id=user_id)
+            websocket_connects.labels("rejected").inc()
+            
+            return None
+        
+        connection = self._register(websocket, user_id, session_id, codec)    # 연결 등록 + 송신 큐 writer 시작
+        websocket_connects.labels("accepted").inc()
+        
+        # 정기적인 정리 작업
+        await self._cleanup_old_connections()
+        
+        events.info("ws.connect", "사용자 %s WebSocket 연결 추가 (총 %d개)", user_id, len(self.user_connections[user_id]), user_id=user_id)
+        
+        return connection
+    
+    
+    def _register(self, websocket: WebSocket, user_id: str, session_id: Optional[str] = None,
+                  codec: Optional[Codec] = None) -> Connection:
+        """연결 레코드 생성/색인 및 송신 큐 writer 시작"""
+        connection = Connection(websocket, user_id, self.outbox_size, self.outbox_policy, session_id, codec)
+        connection.task = asyncio.create_task(self._writer(connection))
+        
+        self.connections[websocket] = connection
+        self.user_connections.setdefault(user_id, set()).add(connection)     # 사용자별 색인에 추가
+        return connection
+    
+    
+    async def _writer(self, connection: Connection):
+        """연결별 writer - 송신 큐를 순서대로 비우고, 종료 요청 시 남은 메시지 전송 후 종료"""
+        websocket = connection.websocket
+        
+        while True:
+            while connection.queue:
+                _, data = connection.queue.popleft()
+                if isinstance(data, Frame):
+                    data = data.encode(connection.codec)                   # 협상한 코덱 형식 (같은 메시지는 코덱별 한 번만 변환)
+                
+                if not await self._send_with_deadline(websocket, data):    # 전송 실패/기한 초과 -> 연결 제거
+                    await self.disconnect(websocket, connection.user_id)
+                    await self._close_with_deadline(websocket, 1011, "Send timeout")
+                    return
+                connection.messages_out += 1
+            
+            if connection.close_request is not None:                       # 종료 요청 처리
+                code, reason = connection.close_request
+                await self._close_with_deadline(websocket, code, reason)
+                return
+            
+            connection.waiter = asyncio.get_running_loop().create_future()
+            await connection.waiter                                        # 새 메시지 또는 종료 요청 대기
+            connection.waiter = None
+    
+    
+    def enqueue(self, websocket: WebSocket, message: Union[dict, str]) -> bool:
+        """특정 소켓의 송신 큐에 메시지 적재 (응답 메시지도 writer를 거쳐 순서 보장)"""
+        connection = self.connections.get(websocket)
+        if connection is None:
+            return False
+        
+        if isinstance(message, dict):
+            return connection.put(self._encode(message), message.get("type"))
+        
+        return connection.put(message, message)                  # 텍스트 메시지는 내용 자체를 타입으로 사용 (pong 등, 코덱과 무관하게 텍스트 프레임)
+    
+    
+    def get_queue_stats(self) -> dict:
+        """송신 큐 지표 - 대기 메시지 수, 최대 깊이, 버려진 메시지 수"""
+        depths = [len(connection.queue) for connection in self.connections.values()]
+        
+        return {
+            "connections": len(depths),                                                   # 송신 큐 수
+            "queued": sum(depths),                                                        # 전체 대기 메시지 수
+            "max_depth": max(depths, default=0),                                          # 가장 깊은 큐
+            "capacity": self.outbox_size,                                                 # 연결당 최대 대기 메시지 수
+            "policy": self.outbox_policy,                                                 # 큐 초과 정책
+            "dropped": self.dropped_total + sum(c.dropped for c in self.connections.values()),  # 버려진 메시지 수
+            "overflow_disconnects": self.overflow_disconnects + sum(map(self._is_overflowed, self.connections.values()))  # 큐 초과로 종료된 연결 수
+        }
+    
+    
+    @staticmethod
+    def _is_overflowed(connection: Connection) -> bool:
+        """큐 초과(disconnect 정책)로 종료 요청된 연결인지 확인"""
+        return connection.close_request is not None and connection.close_request[0] == 1008
+    
+    
+    async def disconnect(self, websocket: WebSocket, user_id: str):
+        """WebSocket 연결 해제 - 연결 레코드와 색인, 토픽 구독 정리"""
+        connection = self.connections.pop(websocket, None)
+        if connection is None:                                      # 이미 정리된 연결
+            return
+        
+        self._drop_subscriptions(connection)                        # 토픽 구독 정리
+        websocket_disconnects.inc()
+        self.dropped_total += connection.dropped
+        self.overflow_disconnects += self._is_overflowed(connection)
+        # 종료 요청 중인 writer는 종료 프레임을 보낼 수 있도록 그대로 둠
+        if connection.close_request is None and connection.task is not asyncio.current_task():
+            connection.task.cancel()
+        
+        connections = self.user_connections.get(user_id)
+        if connections is None:                                     # 강제 종료로 사용자 색인이 이미 정리된 경우
+            return
+        
+        connections.discard(connection)
+        if not connections:                                         # 사용자의 마지막 연결이면 색인에서 삭제
+            del self.user_connections[user_id]
+            events.info("ws.disconnect", "사용자 %s의 모든 WebSocket 연결 해제", user_id, user_id=user_id)
+        
+        else:
+            events.info("ws.disconnect", "사용자 %s WebSocket 연결 해제 (남은 연결: %d개)", user_id, len(connections), user_id=user_id)
+    
+    
+    async def send_personal_message(self, message: dict, user_id: str) -> int:
+        """특정 사용자에게 메시지 전송 (다른 워커의 연결에는 제어 채널로 전달)"""
+        frame = self._encode(message)                                         # 한 번만 직렬화
+        msg_type = message.get("type")
+        sent_count = self._send_local(frame, user_id, msg_type)               # 이 워커의 연결 송신 큐에 적재
+        await self._publish({"op": "send", "user_id": user_id, "text": frame.text, "msg_type": msg_type})    # 다른 워커에 직렬화된 그대로 전달
+        
+        return sent_count    # 이 워커에서 적재된 메시지 수 반환
+    
+    
+    async def force_disconnect_user(self, user_id: str) -> int:
+        """사용자의 모든 WebSocket 연결 강제 종료 (다른 워커의 연결 포함)"""
+        disconnected_count = self._disconnect_local(user_id)                  # 이 워커의 연결 종료 요청
+        await self._publish({"op": "disconnect", "user_id": user_id})         # 다른 워커에 전달
+        
+        return disconnected_count    # 이 워커에서 종료 요청된 연결 수 반환
+    
+    
+    def subscribe(self, websocket: WebSocket, topic: str) -> bool:
+        """소켓을 토픽에 구독 등록"""
+        connection = self.connections.get(websocket)
+        if connection is None:
+            return False
+        
+        if connection.topics is None:                             # 구독 집합은 첫 구독 시 생성
+            connection.topics = set()
+        
+        if topic not in connection.topics and len(connection.topics) >= self.max_topics_per_connection:    # 구독 수 제한
+            return False
+        
+        connection.topics.add(topic)
+        self.topic_subscribers.setdefault(topic, set()).add(connection)
+        return True
+    
+    
+    def unsubscribe(self, websocket: WebSocket, topic: str):
+        """소켓의 토픽 구독 해제"""
+        connection = self.connections.get(websocket)
+        if connection is not None:
+            self._unsubscribe(connection, topic)
+    
+    
+    def _unsubscribe(self, connection: Connection, topic: str):
+        """연결 레코드의 토픽 구독 해제"""
+        if connection.topics is not None:
+            connection.topics.discard(topic)
+        subscribers = self.topic_subscribers.get(topic)
+        
+        if subscribers is not None:
+            subscribers.discard(connection)
+            if not subscribers:                                   # 구독자가 없는 토픽 삭제
+                del self.topic_subscribers[topic]
+    
+    
+    def _drop_subscriptions(self, connection: Connection):
+        """연결 해제된 소켓의 모든 토픽 구독 정리"""
+        for topic in list(connection.topics or ()):
+            self._unsubscribe(connection, topic)
+        connection.topics = None
+    
+    
+    async def broadcast(self, message: dict, topic: Optional[str] = None) -> int:
+        """전체(또는 토픽 구독자)에게 메시지 전송 (다른 워커에는 제어 채널로 전달)"""
+        frame = self._encode(message)                                         # 한 번만 직렬화
+        msg_type = message.get("type")
+        sent_count = self._broadcast_local(frame, topic, msg_type)            # 이 워커의 연결 송신 큐에 적재
+        await self._publish({"op": "broadcast", "topic": topic, "text": frame.text, "msg_type": msg_type})
+        
+        return sent_count    # 이 워커에서 적재된 메시지 수 반환
+    
+    
+    def _broadcast_local(self, frame: Frame, topic: Optional[str] = None, msg_type: Optional[str] = None) -> int:
+        """이 워커의 전체(또는 토픽 구독) 소켓 송신 큐에 적재 - 실제 전송은 연결별 writer가 담당"""
+        if topic is None:
+            targets = self.connections.values()
+        else:
+            targets = self.topic_subscribers.get(topic, ())
+        
+        sent_count = sum(1 for connection in targets if connection.put(frame, msg_type))    # 같은 메시지 객체를 모든 큐가 공유
+        
+        events.info("ws.broadcast", "브로드캐스트 전송 완료 (토픽: %s, %d개 연결)", topic or "전체", sent_count)
+        
+        return sent_count
+    
+    
+    async def _publish(self, payload: dict):
+        """제어 메시지 발행 - 모든 워커가 한 번의 PUBLISH로 수신"""
+        if not redis_client:                                  # Redis 연결이 없으면 단일 워커로 동작
+            return
+        
+        try:
+            payload["origin"] = self.worker_id                # 발행 워커 표시
+            await redis_breaker.call(redis_client.publish, self.control_channel, json_codec.dumps(payload))
+        
+        except Exception as e:
+            logger.error(f"제어 메시지 발행 실패: {e}")
+    
+    
+    async def _handle_control_message(self, raw: str):
+        """다른 워커가 발행한 제어 메시지를 이 워커의 연결에 적용"""
+        payload = json_codec.loads(raw)
+        
+        if payload.get("origin") == self.worker_id:          # 자신이 발행한 메시지는 이미 로컬에 적용됨
+            return
+        
+        if payload["op"] == "send":
+            self._send_local(Frame(payload["text"]), payload["user_id"], payload.get("msg_type"))
+        elif payload["op"] == "disconnect":
+            self._disconnect_local(payload["user_id"])
+        elif payload["op"] == "broadcast":
+            self._broadcast_local(Frame(payload["text"]), payload.get("topic"), payload.get("msg_type"))
+    
+    
+    async def listen_control_channel(self):
+        """제어 채널 구독 - 연결이 끊기면 재구독"""
+        while redis_client:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.control_channel)
+                
+                async for message in pubsub_messages(pubsub):  # 발행 순서대로 처리 (강제 로그아웃 알림 -> 연결 종료)
+                    try:
+                        await self._handle_control_message(message["data"])
+                    
+                    except Exception as e:
+                        logger.error(f"제어 메시지 처리 실패: {e}")
+            
+            except asyncio.CancelledError:
+                raise
+            
+            except Exception as e:
+                logger.error(f"제어 채널 구독 실패: {e}")
+                await asyncio.sleep(1)                        # 잠시 후 재구독
+            
+            finally:
+                await pubsub.aclose()
+    
+    
+    @staticmethod
+    def _encode(message: dict) -> Frame:
+        """메시지를 한 번만 직렬화 (모든 소켓이 같은 JSON 텍스트를 공유, send_json과 같은 형식)"""
+        return Frame(json_codec.dumps(message), message)
+    
+    
+    async def _send_with_deadline(self, websocket: WebSocket, data: Union[str, bytes]) -> bool:
+        """소켓 하나에 기한 내 전송 -> 성공 여부
+        
+        asyncio.wait_for는 호출마다 새 Task를 만들기 때문에 대량 전송 시 비용이 큼.
+        대신 현재 Task에 취소 타이머 하나만 걸어 기한을 적용.
+        """
+        task = asyncio.current_task()
+        timed_out = False
+        
+        def on_deadline():
+            nonlocal timed_out
+            timed_out = True
+            task.cancel()                                      # 전송 대기 중인 현재 Task 취소
+        
+        deadline = asyncio.get_running_loop().call_later(self.send_timeout, on_deadline)
+        try:
+            if isinstance(data, bytes):
+                await websocket.send_bytes(data)                   # 바이너리 코덱 (msgpack 등)
+            else:
+                await websocket.send_text(data)
+            websocket_messages_sent.inc()
+            return True
+        
+        except asyncio.CancelledError:
+            if not timed_out:                                  # 기한 초과가 아닌 외부 취소는 그대로 전파
+                raise
+            if hasattr(task, "uncancel"):                      # Python 3.11+ 취소 카운트 복원
+                task.uncancel()
+            events.error("ws.send_failed", "메시지 전송 실패: 전송 기한 초과")
+            websocket_send_failures.labels("timeout").inc()
+            return False
+        
+        except Exception as e:                                 # 전송 실패
+            events.error("ws.send_failed", "메시지 전송 실패: %r", e)
+            websocket_send_failures.labels("error").inc()
+            return False
+        
+        finally:
+            deadline.cancel()
+    
+    
+    async def _close_with_deadline(self, websocket: WebSocket, code: int, reason: str) -> bool:
+        """소켓 하나를 기한 내 종료 -> 성공 여부 (응답 없는 클라이언트가 종료 대기를 붙잡지 않도록)"""
+        try:
+            await asyncio.wait_for(websocket.close(code=code, reason=reason), timeout=self.send_timeout)
+            return True
+        
+        except Exception as e:
+            logger.error(f"강제 연결 해제 실패: {e!r}")
+            return False
+    
+    
+    def _send_local(self, frame: Frame, user_id: str, msg_type: Optional[str] = None) -> int:
+        """이 워커에 연결된 특정 사용자의 송신 큐에 직렬화된 메시지 적재 (전송을 기다리지 않음)"""
+        connections = self.user_connections.get(user_id)    # 사용자별 연결 색인 조회
+        if not connections:
+            return 0                                          # 연결이 없으면 0 반환
+        
+        sent_count = sum(1 for connection in connections if connection.put(frame, msg_type))    # 적재된 메시지 수
+        
+        events.info("ws.send", "사용자 %s에게 메시지 전송 완료 (%d개 연결)", user_id, sent_count, user_id=user_id)
+        
+        return sent_count    # 적재된 메시지 수 반환
+    
+    
+    def _disconnect_local(self, user_id: str) -> int:
+        """이 워커에 연결된 사용자의 모든 WebSocket 연결 종료 요청 (대기 중인 메시지 전송 후 종료)"""
+        # 사용자 색인을 먼저 정리하여 종료 대기 중에 새 메시지가 적재되지 않도록 함
+        connections = self.user_connections.pop(user_id, None)
+        if not connections:
+            return 0                                          # 연결이 없으면 0 반환
         
-        except Exception as e:
-            logger.error(f"활성 세션 목록 조회 실패: {e}")
-            return []
+        for connection in connections:
+            self._drop_subscriptions(connection)                           # 토픽 구독 정리
+            connection.request_close(1000, "Force disconnect")             # 강제 로그아웃 알림 등 먼저 적재된 메시지 전송 후 종료
+        
+        disconnected_count = len(connections)                              # 종료 요청된 연결 수
+        logger.info("사용자 %s 강제 연결 해제 완료 (%d개)", user_id, disconnected_count)
+        
+        return disconnected_count       # 종료 요청된 연결 수 반환
     
-    async def cleanup_expired_sessions(self) -> int:
-        """만료된 세션 정리"""
-        if not self.redis:                          # Redis 연결 확인
-            return 0                                # 연결이 없으면 0 반환
-            
-        try:
-            cleaned_count = 0                        # 정리된 세션 수 초기화
-            current_time = time.time()               # 현재 시간 저장
+    
+    async def _cleanup_old_connections(self):
+        """오래된 연결 정리"""
+        current_time = time.time()                                      # 현재 시간 저장
+        if current_time - self.last_cleanup > self.cleanup_interval:    # 마지막 정리 시간이 정리 간격을 초과한 경우
+            cutoff_time = time.monotonic() - 600                        # 10분 이상 수신이 없는 연결 정리
+            removed = 0                                                 # 종료 요청된 연결 수
             
-            # 모든 활성 세션 확인
-            active_users = list(self.redis.smembers("active_sessions"))         # 활성 세션 목록 조회 (set 구조)
+            for connection in list(self.connections.values()):          # 연결 레코드의 마지막 수신 시간 확인
+                if connection.last_seen < cutoff_time and connection.close_request is None:
+                    self._drop_subscriptions(connection)
+                    connection.request_close(1000, "Inactive connection")    # 이 워커의 오래된 연결만 종료
+                    removed += 1
             
-            for username in active_users:
-                session_id = self.redis.get(f"user_session:{username}")         # 사용자의 세션 ID 조회
-                
-                if session_id:
-                    session_data = self.redis.get(f"session:{session_id}")      # 세션 데이터 조회
-                    
-                    if session_data:
-                        data = json.loads(session_data)                         # JSON 형식으로 변환 후 반환
-                        
-                        if current_time - data["last_activity"] > self.session_ttl:    # 마지막 활동 시간이 세션 유효 시간을 초과한 경우
-                            await self.remove_session(username)                        # 세션 제거
-                            cleaned_count += 1                                         # 정리된 세션 수 증가
-            
-            logger.info(f"만료된 세션 {cleaned_count}개 정리 완료")
-            return cleaned_count
+            self.last_cleanup = current_time                                 # 마지막 정리 시간 업데이트
             
-        except Exception as e:
-            logger.error(f"세션 정리 실패: {e}")
-            return 0
+            if removed:                                                      # 정리된 연결이 있는 경우
+                logger.info("정리된 비활성 연결: %d개", removed)
 
-# Redis 세션 매니저 인스턴스
-session_manager = RedisSessionManager()
+# WebSocket 매니저 인스턴스
+websocket_manager = OptimizedWebSocketManager()
 
-# 최적화된 WebSocket 관리자
-class OptimizedWebSocketManager:
-    def __init__(self):
-        self.active_connections: Dict[str, Set[WebSocket]] = {}                 # 사용자별 Websocket 연결 관리 
-        self.connection_timestamps: Dict[str, float] = {}                       # 연결 시간 기록 
-        self.last_cleanup = time.time()                                         # 마지막 정리 시간
-        self.cleanup_interval = 300                                             # 5분 마다 정리
-        self.max_connections_per_user = 3                                       # 사용자당 최대 연결 수
+# WebSocket keepalive 설정 (환경 변수로 조정 가능)
+WS_KEEPALIVE_MODE = os.getenv("WS_KEEPALIVE_MODE", "protocol")                 # protocol: 프로토콜 ping + 타이머 휠 / legacy: 프레임별 wait_for + 텍스트 ping
+WS_PING_INTERVAL = float(os.getenv("WS_PING_INTERVAL", "20"))                   # 서버 ping 프레임 전송 주기 (초, uvicorn)
+WS_PING_TIMEOUT = float(os.getenv("WS_PING_TIMEOUT", "20"))                     # pong 응답 대기 시간 (초, uvicorn)
+WS_IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", "300"))                    # 메시지가 없는 연결을 닫기까지의 시간 (초)
+
+
+# 유휴 연결 정리기 - 워커당 하나의 타이머 휠로 연결별 마지막 수신 시간을 추적
+# 프레임마다 타이머를 만들고 취소하는 대신 수신 시 시간만 기록하고, 슬롯이 돌아올 때 만료 여부를 확인
+class IdleConnectionReaper:
+    def __init__(self, manager: OptimizedWebSocketManager, idle_timeout: float = 300.0, tick: float = 1.0, batch_size: int = 500):
+        self.manager = manager                                              # 종료 요청을 보낼 WebSocket 관리자
+        self.idle_timeout = idle_timeout                                    # 유휴 판정 시간 (초)
+        self.tick = tick                                                    # 휠 한 칸의 시간 (초)
+        self.batch_size = batch_size                                        # 한 번에 종료 요청할 최대 연결 수
+        self.wheel: List[Set[Connection]] = [set() for _ in range(int(idle_timeout / tick) + 2)]    # 만료 예정 슬롯 (연결 레코드가 자기 슬롯 번호와 마지막 수신 시간을 보관)
+        self.cursor = 0                                                     # 현재 처리 중인 슬롯
+        self.reaped_total = 0                                               # 유휴로 종료된 연결 수 누계
+    
+    
+    def track(self, connection: Connection):
+        """연결 추적 시작"""
+        connection.last_seen = time.monotonic()
+        self._schedule(connection, self.idle_timeout)
+    
     
+    def untrack(self, connection: Connection):
+        """연결 추적 종료"""
+        if connection.idle_slot is not None:
+            self.wheel[connection.idle_slot].discard(connection)
+            connection.idle_slot = None
     
-    async def connect(self, websocket: WebSocket, user_id: str) -> bool:
-        """WebSocket 연결 관리"""
-        if user_id not in self.active_connections:               # 사용자별 연결 관리 딕셔너리에 사용자 ID가 없으면 빈 set 생성
-            self.active_connections[user_id] = set()             # 사용자 ID를 키로 사용하여 빈 set 생성
+    
+    def _schedule(self, connection: Connection, delay: float):
+        """delay초 뒤에 확인할 슬롯에 등록"""
+        ticks = min(len(self.wheel) - 1, max(1, math.ceil(delay / self.tick)))
+        slot = (self.cursor + ticks) % len(self.wheel)
+        self.wheel[slot].add(connection)
+        connection.idle_slot = slot
+    
+    
+    async def _advance(self) -> int:
+        """다음 슬롯 처리 - 만료된 연결은 일괄 종료 요청, 최근 수신이 있으면 남은 시간만큼 뒤 슬롯으로 이동"""
+        self.cursor = (self.cursor + 1) % len(self.wheel)
+        due, self.wheel[self.cursor] = self.wheel[self.cursor], set()
         
-        # 연결 수 제한 확인
-        if len(self.active_connections[user_id]) >= self.max_connections_per_user:  # 사용자별 연결 수가 최대 연결 수를 초과한 경우
-            logger.warning(f"사용자 {user_id}의 연결 수 제한 도달")
+        now = time.monotonic()
+        reaped = 0
+        for connection in due:
+            remaining = connection.last_seen + self.idle_timeout - now
+            if remaining > 0:
+                self._schedule(connection, remaining)
+                continue
             
-            return False    # False 반환
-        
-        self.active_connections[user_id].add(websocket)         # 사용자별 연결 관리 딕셔너리에 연결 추가
-        self.connection_timestamps[user_id] = time.time()       # 연결 시간 기록 딕셔너리에 연결 시간 추가
-        
-        # Redis에 WebSocket 연결 정보 저장
-        if redis_client:                                        # Redis 연결 확인
-            try:
-                # WebSocket 연결 정보 생성
-                connection_data = {
-                    "user_id": user_id,                         # 사용자 ID
-                    "connected_at": time.time(),                # 연결 시간
-                    "websocket_count": len(self.active_connections[user_id])    # 사용자별 연결 수
-                }
-                
-                # Redis에 WebSocket 연결 정보 저장 -> Redis에 연결 정보 저장 (TTL 2시간)
-                redis_client.setex(
-                    f"websocket:{user_id}:{id(websocket)}",     # 연결 정보 키 생성
-                    session_manager.websocket_ttl,              # WebSocket 연결 유효 시간 (2시간 = 7200초)
-                    json.dumps(connection_data)                 # 연결 정보를 JSON 형식으로 변환 후 저장
-                )
-                
-            except Exception as e:
-                logger.error(f"WebSocket 연결 정보 Redis 저장 실패: {e}")
-        
-        # 정기적인 정리 작업
-        await self._cleanup_old_connections()
-        
-        logger.info(f"사용자 {user_id} WebSocket 연결 추가 (총 {len(self.active_connections[user_id])}개)")
+            connection.idle_slot = None
+            connection.request_close(1000, "Idle timeout")                  # 대기 중인 메시지 전송 후 종료
+            reaped += 1
+            
+            if reaped % self.batch_size == 0:
+                await asyncio.sleep(0)                                      # 대량 종료 시 이벤트 루프 양보
         
-        return True
+        self.reaped_total += reaped
+        return reaped
     
     
-    async def disconnect(self, websocket: WebSocket, user_id: str):
-        """WebSocket 연결 해제"""
-        if user_id in self.active_connections:                      # 사용자별 연결 관리 딕셔너리에 사용자 ID가 존재하는지 확인
-            self.active_connections[user_id].discard(websocket)     # 사용자별 연결 관리 딕셔너리에서 연결 제거
+    async def run(self):
+        """tick마다 휠을 한 칸씩 진행 (루프 지연 시 밀린 칸을 모두 처리)"""
+        next_tick = time.monotonic() + self.tick
+        while True:
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
             
-            # Redis에서 연결 정보 제거
-            if redis_client:
+            while next_tick <= time.monotonic():
+                next_tick += self.tick
                 try:
-                    redis_client.delete(f"websocket:{user_id}:{id(websocket)}")    # Redis에서 연결 정보 삭제
+                    reaped = await self._advance()
+                    if reaped:
+                        logger.info("유휴 WebSocket 연결 종료: %d개", reaped)
                 
                 except Exception as e:
-                    logger.error(f"WebSocket 연결 정보 Redis 제거 실패: {e}")
-            
-            # 사용자별 연결 관리 딕셔너리에 사용자 ID가 존재하지 않으면 딕셔너리에서 삭제
-            if not self.active_connections[user_id]:
-                del self.active_connections[user_id]        # 사용자별 연결 관리 딕셔너리에서 사용자 ID 삭제
-                del self.connection_timestamps[user_id]     # 연결 시간 기록 딕셔너리에서 사용자 ID 삭제
-                
-                logger.info(f"사용자 {user_id}의 모든 WebSocket 연결 해제")
-                
-            else:
-                logger.info(f"사용자 {user_id} WebSocket 연결 해제 (남은 연결: {len(self.active_connections[user_id])}개)")
+                    logger.error(f"유휴 연결 정리 실패: {e}")
+
+
+# 유휴 연결 정리기 인스턴스
+idle_reaper = IdleConnectionReaper(websocket_manager, idle_timeout=WS_IDLE_TIMEOUT)
+
+# 연결 정리(drain) 설정 (환경 변수로 조정 가능)
+WS_DRAIN_BATCH_SIZE = int(os.getenv("WS_DRAIN_BATCH_SIZE", "100"))             # 한 번에 종료할 연결 수
+WS_DRAIN_BATCH_INTERVAL = float(os.getenv("WS_DRAIN_BATCH_INTERVAL", "0.1"))    # 종료 배치 간격 (초)
+WS_RECONNECT_WINDOW = float(os.getenv("WS_RECONNECT_WINDOW", "30"))             # 클라이언트 재접속을 분산할 시간 (초)
+WS_DRAIN_ON_EXIT = os.getenv("WS_DRAIN_ON_EXIT", "on") != "off"                 # 종료 신호 수신 시 연결 정리 후 종료 (python main.py 실행 시)
+
+
+# 연결 정리기 - 배포/종료 전에 새 연결을 받지 않고, 기존 연결에 재접속 대기 시간을 알린 뒤 나눠서 종료
+# 대기 시간은 연결마다 무작위로 정해 모든 클라이언트가 새 워커에 한꺼번에 재접속(토큰 검증/연결 등록 폭주)하지 않도록 함
+class ConnectionDrainer:
+    def __init__(self, manager: OptimizedWebSocketManager, batch_size: int = 100, batch_interval: float = 0.1,
+                 reconnect_window: float = 30.0):
+        self.manager = manager                                              # 종료 요청을 보낼 WebSocket 관리자
+        self.batch_size = batch_size                                        # 한 번에 종료할 연결 수
+        self.batch_interval = batch_interval                                # 종료 배치 간격 (초)
+        self.reconnect_window = reconnect_window                             # 재접속 대기 시간 상한 (초)
+        self.draining = False                                               # 정리 중 여부 (새 연결 거절)
+        self.task: Optional[asyncio.Task] = None                            # 정리 작업
+        self.started_at: Optional[float] = None                             # 정리 시작 시간
+        self.released = 0                                                   # 재접속 안내 후 종료한 연결 수
+        self.turned_away = 0                                                # 정리 중 거절한 새 연결 수
     
     
-    async def send_personal_message(self, message: dict, user_id: str) -> int:
-        """특정 사용자에게 메시지 전송"""
-        if user_id not in self.active_connections:            # 사용자별 연결 관리 딕셔너리에 사용자 ID가 존재하는지 확인
-            return 0                                          # 연결이 없으면 0 반환
+    def start(self) -> bool:
+        """정리 시작 -> 시작 여부 (이미 정리 중이면 False)"""
+        if self.draining:
+            return False
         
-        sent_count = 0                                        # 전송된 메시지 수 초기화
-        disconnected = set()                                  # 끊어진 연결 정보 저장 (set 구조)
+        self.draining = True
+        self.started_at = time.time()
+        self.task = asyncio.create_task(self._drain())
+        logger.warning(f"WebSocket 연결 정리 시작 ({len(self.manager.connections)}개, 재접속 분산 {self.reconnect_window:.0f}초)")
+        return True
+    
+    
+    def reconnect_hint(self) -> dict:
+        """재접속 안내 메시지 - 연결마다 다른 대기 시간"""
+        return {
+            "type": "reconnect",
+            "reason": "server_draining",
+            "retry_after_ms": int(random.uniform(0, self.reconnect_window) * 1000),    # 이 시간만큼 기다린 뒤 재접속
+            "timestamp": time.time()
+        }
+    
+    
+    async def turn_away(self, websocket: WebSocket, codec: Codec):
+        """정리 중 들어온 새 연결 - 재접속 안내만 보내고 종료 (토큰 검증/연결 등록 없음)"""
+        data = codec.dumps(self.reconnect_hint())
+        try:
+            if isinstance(data, bytes):
+                await asyncio.wait_for(websocket.send_bytes(data), timeout=self.manager.send_timeout)
+            else:
+                await asyncio.wait_for(websocket.send_text(data), timeout=self.manager.send_timeout)
+            await asyncio.wait_for(websocket.close(code=1012, reason="Server draining"), timeout=self.manager.send_timeout)
         
-        for websocket in self.active_connections[user_id]:    # 사용자별 연결 관리 딕셔너리에서 연결 정보 조회
-            try:
-                await websocket.send_json(message)            # 메시지 전송
-                sent_count += 1                               # 전송된 메시지 수 증가
-                
-            except Exception as e:
-                logger.error(f"메시지 전송 실패: {e}")
-                
-                disconnected.add(websocket)                   # 끊어진 연결 정보 추가 (set 구조)    
+        except Exception as e:
+            logger.debug(f"정리 중 새 연결 종료 실패: {e!r}")
         
-        # 끊어진 연결 정리
-        for websocket in disconnected:
-            await self.disconnect(websocket, user_id)         # 끊어진 연결 정보 제거 (disconnect 메서드 호출)
+        self.turned_away += 1
+    
+    
+    async def _drain(self):
+        """batch_interval마다 batch_size개 연결에 재접속 안내 후 종료 요청 (대기 중인 메시지는 먼저 전송)"""
+        while True:
+            pending = [connection for connection in self.manager.connections.values() if connection.close_request is None]
+            if not pending:
+                break
+            
+            for connection in pending[:self.batch_size]:
+                self.manager.enqueue(connection.websocket, self.reconnect_hint())
+                connection.request_close(1012, "Server draining")           # 1012: 서비스 재시작
+            self.released += min(len(pending), self.batch_size)
+            await asyncio.sleep(self.batch_interval)
         
-        logger.info(f"사용자 {user_id}에게 메시지 전송 완료 ({sent_count}개 연결)")
+        # writer가 종료 프레임을 보내고 연결이 정리될 때까지 대기 (응답 없는 소켓은 전송 기한 후 정리됨)
+        deadline = time.monotonic() + self.manager.send_timeout * 2
+        while self.manager.connections and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
         
-        return sent_count    # 전송된 메시지 수 반환
+        logger.warning(f"WebSocket 연결 정리 완료 ({self.released}개, {time.time() - self.started_at:.1f}초)")
     
     
-    async def force_disconnect_user(self, user_id: str) -> int:
-        """사용자의 모든 WebSocket 연결 강제 종료"""
-        if user_id not in self.active_connections:            # 사용자별 연결 관리 딕셔너리에 사용자 ID가 존재하는지 확인
-            return 0                                          # 연결이 없으면 0 반환
-        
-        disconnected_count = 0                                # 끊어진 연결 수 초기화
-        websockets_to_disconnect = list(self.active_connections[user_id])    # 사용자별 연결 관리 딕셔너리에서 연결 정보 조회
+    def stats(self) -> dict:
+        """정리 상태 (헬스 체크용)"""
+        return {
+            "draining": self.draining,                                      # 정리 중 여부
+            "released": self.released,                                      # 재접속 안내 후 종료한 연결 수
+            "turned_away": self.turned_away,                                # 정리 중 거절한 새 연결 수
+            "done": self.task is not None and self.task.done()              # 정리 완료 여부
+        }
+
+
+# 연결 정리기 인스턴스
+connection_drainer = ConnectionDrainer(
+    websocket_manager,
+    batch_size=WS_DRAIN_BATCH_SIZE,
+    batch_interval=WS_DRAIN_BATCH_INTERVAL,
+    reconnect_window=WS_RECONNECT_WINDOW
+)
+
+SESSION_STREAM_INTERVAL = float(os.getenv("SESSION_STREAM_INTERVAL_MS", "500")) / 1000    # 세션 변경 전송 주기 (초)
+
+
+# 세션 변경 스트림 - 활성 세션 뷰의 변경분을 모아 "sessions" 토픽 구독자(관리자)에게 주기마다 한 프레임으로 전송
+# 워커마다 주기당 버전 조회 1회만 수행하므로 대시보드 수와 관계없이 Redis 부하가 일정함
+class SessionChangeStream:
+    def __init__(self, sessions: RedisSessionManager, manager: OptimizedWebSocketManager, interval: float = 0.5, batch_size: int = 1000):
+        self.sessions = sessions                        # 활성 세션 뷰를 제공하는 세션 관리자
+        self.manager = manager                          # 구독자에게 전송할 WebSocket 관리자
+        self.interval = interval                        # 전송 주기 (초) -> 주기 내 변경은 한 프레임으로 병합
+        self.batch_size = batch_size                    # 프레임당 최대 변경 수
+        self.topic = "sessions"                         # 구독 토픽 (관리자 전용)
+        self.version: Optional[int] = None              # 마지막으로 전송한 뷰 버전
+    
+    
+    async def poll(self) -> int:
+        """뷰 변경분을 구독자에게 전송 -> 전송한 프레임 수"""
+        if not self.manager.topic_subscribers.get(self.topic):
+            self.version = None                         # 구독자가 없으면 추적 중단 (다음 구독 시 현재 버전부터)
+            return 0
         
-        for websocket in websockets_to_disconnect:            # 사용자별 연결 관리 딕셔너리에서 연결 정보 조회
-            try:
-                await websocket.close(code=1000, reason="Force disconnect")   # 연결 해제
-                disconnected_count += 1                                       # 끊어진 연결 수 증가
-                
-            except Exception as e:
-                logger.error(f"강제 연결 해제 실패: {e}")
+        current = await self.sessions.get_active_view_version()
+        if self.version is None or current < self.version:     # 첫 구독 또는 뷰 초기화
+            if self.version is not None:
+                self._send({"type": "session_update", "reset": True, "version": current})
+            self.version = current
+            return 0
         
-        # 연결 정보 정리
-        if user_id in self.active_connections:
-            del self.active_connections[user_id]        # 사용자별 연결 관리 딕셔너리에서 사용자 ID 삭제
+        frames = 0
+        while self.version < current:
+            changes = await self.sessions.get_active_view_changes(self.version, self.batch_size)
+            if changes is None:                         # 변경 기록이 정리되어 따라잡을 수 없음 -> 클라이언트가 전체 재조회
+                self._send({"type": "session_update", "reset": True, "version": current})
+                self.version = current
+                return frames + 1
             
-        if user_id in self.connection_timestamps:
-            del self.connection_timestamps[user_id]     # 연결 시간 기록 딕셔너리에서 사용자 ID 삭제
-        
-        logger.info(f"사용자 {user_id} 강제 연결 해제 완료 ({disconnected_count}개)")
+            self._send({
+                "type": "session_update",
+                "from_version": self.version,           # 클라이언트 버전과 다르면 누락된 프레임이 있으므로 전체 재조회
+                "version": changes["version"],
+                "changes": changes["changes"],
+                "removed": changes["removed"]
+            })
+            self.version = changes["version"]
+            frames += 1
+            
+            if not changes["has_more"]:
+                break
         
-        return disconnected_count       # 끊어진 연결 수 반환
+        return frames
     
     
-    async def _cleanup_old_connections(self):
-        """오래된 연결 정리"""
-        current_time = time.time()                                      # 현재 시간 저장
-        if current_time - self.last_cleanup > self.cleanup_interval:    # 마지막 정리 시간이 정리 간격을 초과한 경우
-            cutoff_time = current_time - 600                            # 10분 이상 비활성인 연결 정리
-            users_to_remove = []                                        # 제거할 사용자 ID 저장 (list 구조)
-            
-            for user_id, timestamp in self.connection_timestamps.items():    # 연결 시간 기록 딕셔너리에서 연결 시간 조회
-                if timestamp < cutoff_time:                                  # 연결 시간이 10분 이상 비활성인 경우
-                    users_to_remove.append(user_id)                          # 제거할 사용자 ID 추가 (list 구조)
-            
-            for user_id in users_to_remove:                                  # 제거할 사용자 ID 조회
-                await self.force_disconnect_user(user_id)                    # 사용자의 모든 WebSocket 연결 강제 종료
-            
-            self.last_cleanup = current_time                                 # 마지막 정리 시간 업데이트
+    def invalidate(self):
+        """세션 저장소 전환 시 구독자에게 전체 재조회 요청 (버전 체계가 달라짐)"""
+        if self.version is not None:
+            self._send({"type": "session_update", "reset": True, "version": None})
+        self.version = None
+    
+    
+    def _send(self, message: dict):
+        """이 워커의 구독자에게만 전송 (다른 워커는 각자 같은 뷰를 조회)"""
+        self.manager._broadcast_local(self.manager._encode(message), self.topic, message["type"])
+    
+    
+    async def run(self):
+        """주기적으로 변경분 전송"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll()
             
-            if users_to_remove:                                              # 제거할 사용자 ID가 있는 경우
-                logger.info(f"정리된 비활성 연결: {len(users_to_remove)}개")
+            except Exception as e:
+                logger.error(f"세션 변경 전송 실패: {e}")
 
-# WebSocket 매니저 인스턴스
-websocket_manager = OptimizedWebSocketManager()
+
+# 세션 변경 스트림 인스턴스
+session_stream = SessionChangeStream(session_manager, websocket_manager, interval=SESSION_STREAM_INTERVAL)
 
 # JWT 토큰 관리 (간소화)
 SECRET_KEY = "your-secret-key-here"                                   # JWT 서명용 비밀키 (실제로는 환경 변수 사용)
 ALGORITHM = "HS256"                                                   # JWT 서명 알고리즘 
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))        # 검증된 토큰 캐시 최대 크기 (0이면 사용 안 함)
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))          # 캐시 항목 최대 유지 시간 (초, 토큰 만료 시간을 넘지 않음)
+
+
+# 검증된 토큰 캐시 - 재연결이 몰릴 때 같은 토큰의 서명 검증 반복을 줄임
+# 토큰 원문 대신 SHA-256 다이제스트를 키로 사용하고, LRU + TTL로 크기와 유효 기간을 제한
+class VerifiedTokenCache:
+    def __init__(self, max_size: int = 10000, ttl: float = 300.0):
+        self.max_size = max_size                                                # 최대 항목 수
+        self.ttl = ttl                                                          # 항목 최대 유지 시간 (초)
+        self._entries: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()  # 다이제스트 -> (만료 시간, 클레임), 오래 안 쓴 순서
+        self._by_session: Dict[str, Set[bytes]] = {}                            # 세션 ID -> 다이제스트 목록 (세션 제거 시 무효화용)
+        self.hits = 0                                                           # 캐시 적중 수
+        self.misses = 0                                                         # 캐시 미스 수
+    
+    
+    @staticmethod
+    def digest(token: str) -> bytes:
+        """토큰 다이제스트 계산"""
+        return hashlib.sha256(token.encode()).digest()
+    
+    
+    def get(self, digest: bytes) -> Optional[dict]:
+        """유효한 캐시 항목 조회 (만료된 항목은 제거)"""
+        entry = self._entries.get(digest)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                self._discard(digest)
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(digest)                                       # 최근 사용으로 갱신
+        self.hits += 1
+        return entry[1]
+    
+    
+    def put(self, digest: bytes, payload: dict):
+        """검증된 클레임 저장 - 만료 시간은 min(현재 + TTL, 토큰 exp)"""
+        if self.max_size <= 0:
+            return
+        
+        now = time.time()
+        expires_at = now + self.ttl
+        if payload.get("exp") is not None:
+            expires_at = min(expires_at, float(payload["exp"]))
+        if expires_at <= now:
+            return
+        
+        self._discard(digest)
+        self._entries[digest] = (expires_at, payload)
+        
+        session_id = payload.get("session_id")
+        if session_id:
+            self._by_session.setdefault(session_id, set()).add(digest)
+        
+        while len(self._entries) > self.max_size:                               # 가장 오래 사용하지 않은 항목부터 제거
+            self._discard(next(iter(self._entries)))
+    
+    
+    def invalidate_session(self, session_id: str) -> int:
+        """세션의 캐시 항목 무효화 -> 제거된 항목 수"""
+        digests = self._by_session.pop(session_id, set())
+        for digest in digests:
+            self._entries.pop(digest, None)
+        return len(digests)
+    
+    
+    def _discard(self, digest: bytes):
+        """항목 제거 (세션 인덱스 포함)"""
+        entry = self._entries.pop(digest, None)
+        if entry is None:
+            return
+        
+        session_id = entry[1].get("session_id")
+        digests = self._by_session.get(session_id)
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._by_session[session_id]
+    
+    
+    def stats(self) -> dict:
+        """캐시 지표"""
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# 검증된 토큰 캐시 인스턴스
+token_cache = VerifiedTokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
 
 
 def create_access_token(username: str, session_id: str) -> str:
@@ -433,11 +3110,26 @@ def create_access_token(username: str, session_id: str) -> str:
 
 
 def verify_token(token: str) -> dict:
-    """JWT 토큰 검증"""
+    """JWT 토큰 검증 (이미 검증된 토큰은 캐시에서 반환)"""
+    digest = token_cache.digest(token)
+    cached = token_cache.get(digest)
+    if cached is not None:
+        payload = dict(cached)                                             # 호출자가 수정해도 캐시에 영향 없도록 복사본 사용
+    
+    else:
+        payload = _decode_token(token)
+        token_cache.put(digest, dict(payload))                             # 검증 성공한 토큰만 캐시
+    
+    if revocations.is_revoked(payload.get("session_id")):                  # 로그아웃/중복 로그인으로 폐기된 세션 (메모리 조회)
+        raise HTTPException(status_code=401, detail="Session revoked")
+    
+    return payload
+
+
+def _decode_token(token: str) -> dict:
+    """JWT 서명/만료 검증"""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])    # JWT 토큰 검증 - 토큰 디코딩
-        
-        return payload
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])       # JWT 토큰 검증 - 토큰 디코딩
     
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")      # 토큰 만료 시 예외 발생
@@ -446,6 +3138,17 @@ def verify_token(token: str) -> dict:
         raise HTTPException(status_code=401, detail="Invalid token")      # 토큰 검증 실패 시 예외 발생
 
 
+async def require_admin(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """관리자 토큰 검증 (Authorization: Bearer <token>)"""
+    payload = verify_token(credentials.credentials)                        # JWT 토큰 검증
+    user = await user_store.get(payload.get("sub"))
+    
+    if not user or not user["is_admin"]:                                   # 관리자 여부 확인
+        raise HTTPException(status_code=403, detail="관리자 권한이 필요합니다.")
+    
+    return payload
+
+
 # API 엔드포인트
 # 루트 엔드포인트 - 서버 상태 확인
 @app.get("/")
@@ -461,33 +3164,117 @@ async def root():
 
 # 상태 확인 엔드포인트 - 서버 상태 확인
 @app.get("/api/health")
-async def health_check():
-    """서버 상태 확인"""
-    redis_status = "connected" if redis_client and redis_client.ping() else "disconnected"    # Redis 연결 상태 확인
+async def health_check(response: Response):
+    """서버 상태 확인 (Redis 상태는 ping 대신 회로 차단기 상태로 판단, 연결 정리 중이면 503)"""
+    if redis_client is None:
+        redis_status = "disabled" if SESSION_BACKEND == "memory" else "disconnected"
+    else:
+        redis_status = {"closed": "connected", "half_open": "recovering", "open": "unavailable"}[redis_breaker.state]
+    
+    if connection_drainer.draining:
+        status = "draining"
+        response.status_code = 503                                           # 로드 밸런서가 새 요청을 보내지 않도록
+    else:
+        status = "healthy" if redis_status in ("connected", "disabled") else "degraded"    # Redis 장애 시 일부 기능 제한
     
     return {
-        "status": "healthy",
+        "status": status,
         "timestamp": datetime.now().isoformat(),                             # 현재 시간 포맷팅   
         "redis": redis_status,                                               # Redis 연결 상태 확인
-        "active_connections": sum(len(conns) for conns in websocket_manager.active_connections.values()),    # 활성 연결 수 조회
-        "active_sessions": len(await session_manager.get_active_sessions())    # 활성 세션 수 조회
+        "session_backend": "redis" if session_manager.redis else "memory",  # 현재 세션 저장소
+        "redis_breaker": redis_breaker.stats(),                              # Redis 회로 차단기 지표
+        "active_connections": len(websocket_manager.connections),    # 활성 연결 수 조회
+        "drain": connection_drainer.stats(),                                                                  # 연결 정리 상태
+        "outbound_queues": websocket_manager.get_queue_stats(),                                               # 송신 큐 지표
+        "token_cache": token_cache.stats(),                                                                   # 검증된 토큰 캐시 지표
+        "revocations": revocations.stats(),                                                                   # 세션 폐기 목록 지표
+        "session_cache": session_cache.stats(),                                                               # 세션 캐시 지표
+        "password_hasher": password_hasher.stats(),                                                           # 비밀번호 해시 풀 지표
+        "login_limiter": login_limiter.stats(),                                                               # 로그인 속도 제한 지표
+        "active_sessions": await session_manager.count_active_sessions()    # 활성 세션 수 조회 (회로 차단 시 None)
     }
 
 
+# 게이지 - /metrics 요청 시 현재 상태로 계산 (기록 경로에는 비용 없음)
+metrics.gauge("websocket_active_connections", "이 워커의 활성 WebSocket 연결 수", lambda: len(websocket_manager.connections))
+metrics.gauge("websocket_active_users", "이 워커에 연결된 사용자 수", lambda: len(websocket_manager.user_connections))
+metrics.gauge("websocket_outbox_queued", "송신 큐에서 대기 중인 메시지 수", lambda: websocket_manager.get_queue_stats()["queued"])
+metrics.gauge("websocket_draining", "연결 정리 중 여부 (1: 새 연결 거절)", lambda: connection_drainer.draining)
+metrics.gauge("session_cache_lookups", "세션 캐시 조회 수 (hit / miss, 누계)",
+              lambda: {("hit",): session_cache.hits, ("miss",): session_cache.misses}, ("result",))
+metrics.gauge("session_cache_entries", "세션 캐시 항목 수", lambda: session_cache.stats()["size"])
+metrics.gauge("session_cache_invalidations", "무효화된 세션 캐시 항목 수 (누계)", lambda: session_cache.invalidations)
+metrics.gauge("password_hash_pending", "대기/계산 중인 비밀번호 검증 수", lambda: password_hasher.pending)
+metrics.gauge("log_records_dropped", "출력 큐 초과로 버린 로그 수 (누계)", lambda: getattr(log_handler, "dropped", 0))
+metrics.gauge("log_records_sampled_out", "샘플링으로 기록하지 않은 로그 수 (누계)", lambda: events.sampled_out)
+metrics.gauge("redis_breaker_state", "Redis 회로 차단기 상태 (현재 상태만 1)",
+              lambda: {(state,): redis_breaker.state == state for state in ("closed", "half_open", "open")}, ("state",))
+
+
+# 지표 엔드포인트 - 프로메테우스 텍스트 형식 (이 요청을 받은 워커의 지표)
+@app.get("/metrics")
+async def get_metrics():
+    """프로메테우스 지표 조회"""
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def client_ip(request: Request) -> str:
+    """요청한 클라이언트 IP (프록시 뒤에서는 uvicorn --proxy-headers로 X-Forwarded-For 반영)"""
+    return request.client.host if request.client else "unknown"
+
+
 # 로그인 엔드포인트 - 사용자 로그인
 @app.post("/api/auth/login")
-async def login(username: str = Form(...), password: str = Form(...)):
-    """사용자 로그인"""
-    # 1. 사용자 검증
-    if username not in USERS:                                                   # 사용자 id 존재 여부 
-        raise HTTPException(status_code=401, detail="사용자명이 존재하지 않습니다.")
+async def login(username: str = Form(...), password: str = Form(...), ip: str = Depends(client_ip)):
+    """사용자 로그인 (응답 코드별 처리 시간 기록)"""
+    started = time.perf_counter()
+    status = "500"
+    try:
+        response = await _login(username, password, ip)
+        status = "200"
+        return response
+    
+    except HTTPException as e:
+        status = str(e.status_code)
+        raise
+    
+    finally:
+        login_duration.labels(status).observe(time.perf_counter() - started)
+
+
+async def _login(username: str, password: str, ip: str) -> dict:
+    """사용자 로그인 처리 - 속도 제한, 비밀번호 검증, 세션 교체, 토큰 발급"""
+    # 1. 속도 제한 확인 - 비밀번호 검증/세션 저장 전에 폭주 차단 (초과 시 429 + Retry-After)
+    await login_limiter.check(username, ip)
+    
+    # 2. 사용자 검증
+    user = await user_store.get(username)
+    password_hash = user["password_hash"] if user else password_hasher.dummy_hash    # 없는 사용자도 같은 해시 계산 (응답 시간 동일)
+    verified = await password_hasher.verify(password, password_hash)           # 비밀번호 해시 비교 (스레드 풀, 용량 초과 시 429)
+    
+    if user is None or not verified:                                            # 없는 사용자/틀린 비밀번호는 같은 응답 -> 계정 존재 여부를 알 수 없음
+        await login_limiter.record_failure(username)                            # 연속 실패 시 계정 잠금 (없는 사용자명 대입도 포함)
+        raise HTTPException(status_code=401, detail="사용자명 또는 비밀번호가 올바르지 않습니다.")
+    
+    await login_limiter.record_success(username)
+    
+    # 3. 새 세션 생성 - 기존 세션이 있으면 원자적으로 교체 (동시 로그인 시에도 세션은 하나만 유지)
+    session_id = str(uuid.uuid4())                                                  # 세션 ID 생성
+    session_created, previous_session_id = await session_manager.replace_session(username, session_id)    # 세션 교체
+    
+    if not session_created and redis_breaker.state != "closed":                     # Redis 장애로 차단 중이면 재시도 시간 안내
+        raise HTTPException(
+            status_code=503,
+            detail="세션 저장소를 일시적으로 사용할 수 없습니다. 잠시 후 다시 시도하세요.",
+            headers={"Retry-After": str(redis_breaker.retry_after())}
+        )
     
-    if USERS[username]["password"] != password:                                 # 사용자 비밀번호 일치 여부 확인
-        raise HTTPException(status_code=401, detail="비밀번호가 올바르지 않습니다.")
+    if not session_created:                                                         # 세션 생성 실패 시 예외 발생
+        raise HTTPException(status_code=500, detail="Session creation failed")      # 세션 생성 실패 시 예외 발생
     
-    # 2. 중복 로그인 감지 및 처리
-    if await session_manager.is_user_active(username):                          # 사용자 활성 상태 확인
-        logger.info(f"사용자 {username} 중복 로그인 감지 - 기존 세션 종료")
+    # 4. 중복 로그인 처리 - 교체된 이전 세션이 있으면 기존 연결 종료
+    if previous_session_id:
+        events.info("auth.duplicate_login", "사용자 %s 중복 로그인 감지 - 기존 세션 종료", username, user_id=username)
         
         # 기존 세션에 강제 로그아웃 메시지 전송
         await websocket_manager.send_personal_message(
@@ -501,29 +3288,19 @@ async def login(username: str = Form(...), password: str = Form(...)):
         
         # 기존 WebSocket 연결 강제 종료
         await websocket_manager.force_disconnect_user(username)
-        
-        # 기존 세션 제거
-        await session_manager.remove_session(username)
-    
-    # 3. 새 세션 생성
-    session_id = str(uuid.uuid4())                                                  # 세션 ID 생성
-    session_created = await session_manager.create_session(username, session_id)    # 세션 생성
-    
-    if not session_created:                                                         # 세션 생성 실패 시 예외 발생
-        raise HTTPException(status_code=500, detail="Session creation failed")      # 세션 생성 실패 시 예외 발생
     
-    # 4. JWT 토큰 생성 및 반환
+    # 5. JWT 토큰 생성 및 반환
     access_token = create_access_token(username, session_id)                         # JWT 토큰 생성
     
-    logger.info(f"사용자 {username} 로그인 성공 - 세션 {session_id}")
+    events.info("auth.login", "사용자 %s 로그인 성공 - 세션 %s", username, session_id, user_id=username)
     
-    # 4. 로그인 성공 시 응답 반환
+    # 5. 로그인 성공 시 응답 반환
     return {
         "access_token": access_token,                   # 액세스 토큰 - JWT 토큰 
         "user": {                                       # 사용자 정보 
             "username": username,                             # 사용자 ID
-            "name": USERS[username]["name"],                  # 사용자 이름 
-            "is_admin": USERS[username]["is_admin"]           # 관리자 여부
+            "name": user["name"],                             # 사용자 이름 
+            "is_admin": user["is_admin"]                      # 관리자 여부
         },
         "session_id": session_id                        # 세션 ID
     }
@@ -540,7 +3317,7 @@ async def logout(username: str = Form(...)):
         # 세션 제거
         await session_manager.remove_session(username)
         
-        logger.info(f"사용자 {username} 로그아웃 완료")
+        events.info("auth.logout", "사용자 %s 로그아웃 완료", username, user_id=username)
         return {"message": "Logout successful"}
         
     except Exception as e:
@@ -548,75 +3325,172 @@ async def logout(username: str = Form(...)):
         raise HTTPException(status_code=500, detail="Logout failed")
 
 
-# 활성 세션 목록 조회 엔드포인트 - 활성 세션 목록 조회 (Redis 캐싱 최적화)
+# 활성 세션 목록 조회 엔드포인트 - 세션 변경 시 갱신되는 뷰를 조회 (페이지, 변경분, ETag 지원)
 @app.get("/api/auth/active-sessions")
-async def get_active_sessions():
-    """활성 세션 목록 조회 (Redis 캐싱 최적화)"""
+async def get_active_sessions(
+    response: Response,
+    cursor: int = 0,                                        # 페이지 커서 (이전 응답의 next_cursor)
+    limit: int = Query(1000, ge=1, le=5000),                # 페이지/변경분 최대 크기
+    since: Optional[int] = None,                            # 이 버전 이후 변경분만 조회
+    if_none_match: Optional[str] = Header(None)             # 이전 응답의 ETag
+):
+    """활성 세션 목록 조회 (뷰 버전이 같으면 304)"""
     try:
-        # Redis에서 캐시된 결과 확인
-        cache_key = "cached_active_sessions"
-        cached_result = redis_client.get(cache_key) if redis_client else None
-        
-        if cached_result:
-            # 캐시된 결과 반환 (5초간 유효)
-            return json.loads(cached_result)
-        
-        # 캐시가 없으면 새로 조회
-        active_sessions = await session_manager.get_active_sessions()
-        
-        # 세션 상세 정보 조회
-        session_details = []
-        for username in active_sessions:
-            session_id = redis_client.get(f"user_session:{username}") if redis_client else None
-            if session_id:
-                session_data = await session_manager.get_session(session_id)
-                if session_data:
-                    session_details.append({
-                        "username": username,
-                        "session_id": session_id,
-                        "connected_at": session_data.get("created_at"),
-                        "last_activity": session_data.get("last_activity"),
-                        "websocket_count": len(websocket_manager.active_connections.get(username, set()))
-                    })
-        
-        # 결과 반환
-        result = {
-            "sessions": session_details,
-            "count": len(session_details),
-            "timestamp": time.time()
-        }
+        # 1. 버전만 확인하여 변경이 없으면 본문 없이 응답
+        if if_none_match and if_none_match == _sessions_etag(await session_manager.get_active_view_version()):
+            return Response(status_code=304, headers={"ETag": if_none_match})
         
-        # 결과를 Redis에 캐싱 (5초간)
-        if redis_client:
-            redis_client.setex(cache_key, 5, json.dumps(result))
+        response.headers["Cache-Control"] = "no-cache"      # 브라우저가 매번 ETag로 재검증
         
-        return result
+        # 2. 변경분 조회 (따라잡을 수 없는 since면 전체 목록 첫 페이지로 재동기화)
+        if since is not None:
+            changes = await session_manager.get_active_view_changes(since, limit)
+            if changes is not None:
+                response.headers["ETag"] = _sessions_etag(changes["version"])
+                changes["timestamp"] = time.time()
+                return changes
+            cursor = 0
+        
+        # 3. 전체 목록 페이지 조회
+        page = await session_manager.get_active_view_page(cursor, limit)
+        response.headers["ETag"] = _sessions_etag(page["version"])
+        page["reset"] = since is not None                  # 변경분 대신 전체 목록을 반환했음을 표시
+        page["timestamp"] = time.time()
+        return page
         
     except Exception as e:
         logger.error(f"활성 세션 조회 실패: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch active sessions")
 
 
+def _sessions_etag(version: int) -> str:
+    """활성 세션 뷰 버전 ETag"""
+    return f'W/"sessions-{version}"'
+
+
 # 사용자 목록 조회 엔드포인트 - 사용자 목록 조회
 @app.get("/api/users")
-async def get_users():
-    """사용자 목록 조회"""
+async def get_users(
+    cursor: Optional[str] = None,                           # 이전 응답의 next_cursor (마지막으로 확인한 사용자명)
+    limit: int = Query(100, ge=1, le=1000),                 # 페이지 크기
+    active: Optional[bool] = None                           # 활성 상태 필터 (생략 시 전체)
+):
+    """사용자 목록 조회 (사용자명 순 커서 페이지, 활성 상태는 페이지 단위로 일괄 조회)"""
+    # 필터가 있으면 페이지 크기의 몇 배까지만 확인 -> 요청당 작업량이 디렉터리 크기와 무관
+    window_size = limit if active is None else limit * USERS_SCAN_FACTOR
+    window = await user_store.page(cursor, window_size + 1)                 # 1명 더 조회해 다음 페이지 유무 확인
+    has_next_window = len(window) > window_size
+    window = window[:window_size]
+    presence = await session_manager.get_presence([user_data["username"] for user_data in window])    # 한 번의 왕복
+    
+    users = []
+    last_checked = None
+    for user_data in window:
+        username = last_checked = user_data["username"]
+        if active is not None and presence[username] != active:
+            continue
+        
+        users.append({
+            "username": username,
+            "name": user_data["name"],
+            "is_admin": user_data["is_admin"],
+            "is_active": presence[username]
+        })
+        if len(users) >= limit:
+            break
+    
+    has_more = has_next_window or (last_checked is not None and window[-1]["username"] != last_checked)
     return {
-        "users": [
-            {
-                "username": username,
-                "name": user_data["name"],
-                "is_admin": user_data["is_admin"],
-                "is_active": await session_manager.is_user_active(username)
-            }
-            for username, user_data in USERS.items()
-        ]
+        "users": users,
+        "next_cursor": last_checked if has_more else None   # 필터 결과가 적으면 빈 페이지라도 다음 커서 반환
     }
 
+# 관리자 브로드캐스트 엔드포인트 - 전체 또는 토픽 구독자에게 공지 전송
+@app.post("/api/admin/broadcast")
+async def admin_broadcast(
+    message: str = Form(...),
+    topic: Optional[str] = Form(None),
+    admin: dict = Depends(require_admin)
+):
+    """관리자 공지 전송 (topic 미지정 시 전체 연결)"""
+    sent_count = await websocket_manager.broadcast(
+        {
+            "type": "broadcast",                        # 브로드캐스트 메시지 타입
+            "topic": topic,                             # 대상 토픽 (None이면 전체)
+            "message": message,                         # 공지 내용
+            "sender": admin["sub"],                     # 보낸 관리자
+            "timestamp": time.time()
+        },
+        topic
+    )
+    
+    logger.info("관리자 %s 브로드캐스트 (토픽: %s)", admin["sub"], topic or "전체")
+    
+    return {"message": "Broadcast sent", "topic": topic, "sent": sent_count}
+
+
+@app.post("/api/admin/drain")
+async def admin_drain(admin: dict = Depends(require_admin)):
+    """이 워커의 WebSocket 연결 정리 (배포 전 - 새 연결 거절, 재접속 안내 후 나눠서 종료)"""
+    started = connection_drainer.start()
+    logger.warning(f"관리자 {admin['sub']} 연결 정리 요청")
+    
+    return {"message": "Draining" if started else "Already draining", "connections": len(websocket_manager.connections)}
+
+
+async def handle_client_message(websocket: WebSocket, user_id: str, data: Union[str, dict]):
+    """클라이언트 메시지 처리 (토픽 구독/해제) - JSON 텍스트 또는 바이너리 프레임에서 해석한 dict"""
+    try:
+        message = json_codec.loads(data) if isinstance(data, str) else data
+    
+    except ValueError:
+        message = None
+    
+    if not isinstance(message, dict):
+        events.info("ws.message", "사용자 %s로부터 메시지 수신 (%d자)", user_id, len(data), user_id=user_id)
+        return
+    
+    message_type = message.get("type")
+    topic = message.get("topic")
+    
+    if message_type == "subscribe" and isinstance(topic, str):
+        if topic == session_stream.topic and not (await user_store.get(user_id) or {}).get("is_admin"):
+            subscribed = False                              # 세션 변경 스트림은 관리자 전용
+        else:
+            subscribed = websocket_manager.subscribe(websocket, topic)
+        websocket_manager.enqueue(websocket, {"type": "subscribed", "topic": topic, "success": subscribed})
+    elif message_type == "unsubscribe" and isinstance(topic, str):
+        websocket_manager.unsubscribe(websocket, topic)
+        websocket_manager.enqueue(websocket, {"type": "unsubscribed", "topic": topic})
+    else:
+        events.info("ws.message", "사용자 %s로부터 메시지 수신 (%d자)", user_id, len(data), user_id=user_id)
+
+
+async def receive_message(websocket: WebSocket, codec: Codec) -> Union[str, dict]:
+    """프레임 하나 수신 - 텍스트 프레임은 문자열 그대로, 바이너리 프레임은 협상한 코덱으로 해석"""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    
+    if message.get("text") is not None:
+        return message["text"]
+    
+    data = codec.loads(message["bytes"])
+    return data if isinstance(data, (str, dict)) else str(data)
+
+
 # WebSocket 엔드포인트
 @app.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
     """WebSocket 연결 처리"""
+    subprotocol, codec = select_codec(websocket.scope.get("subprotocols", []))
+    
+    # 0. 연결 정리 중이면 토큰 검증 없이 재접속 안내 후 종료
+    if connection_drainer.draining:
+        await websocket.accept(subprotocol=subprotocol)
+        await connection_drainer.turn_away(websocket, codec)
+        return
+    
     # 1. 토큰 추출 및 검증
     token = websocket.query_params.get("token")
     if not token:
@@ -636,56 +3510,70 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
         await websocket.close(code=4002, reason="User ID mismatch")
         return
     
-    # 3. 연결 수락 및 관리
-    await websocket.accept()
-    connection_success = await websocket_manager.connect(websocket, user_id)
+    # 3. 연결 수락 및 관리 (서브프로토콜로 요청한 코덱이 있으면 해당 형식으로 전송)
+    await websocket.accept(subprotocol=subprotocol)
+    connection = await websocket_manager.connect(websocket, user_id, payload.get("session_id"), codec)
     
     # 연결 수락 실패 시 예외 발생
-    if not connection_success:
+    if connection is None:
         await websocket.close(code=4004, reason="Connection limit exceeded")
         return
     
-    # 4. 연결 성공 메시지 전송
-    await websocket.send_json({
+    if WS_KEEPALIVE_MODE != "legacy":
+        idle_reaper.track(connection)                                   # 유휴 연결 추적 시작
+    
+    # 4. 연결 성공 메시지 전송 (송신 큐를 거쳐 다른 메시지와 순서 보장)
+    websocket_manager.enqueue(websocket, {
         "type": "connection_established",
         "message": "WebSocket 연결이 성공적으로 설정되었습니다.",
         "timestamp": time.time()
     })
     
     try:
-        # 5. 메시지 수신 대기 (타임아웃 설정)
+        # 5. 메시지 수신 대기
         while True:
-            data = await asyncio.wait_for(
-                websocket.receive_text(), 
-                timeout=300.0  # 5분 타임아웃
-            )
+            if WS_KEEPALIVE_MODE == "legacy":
+                data = await asyncio.wait_for(
+                    receive_message(websocket, codec), 
+                    timeout=WS_IDLE_TIMEOUT  # 프레임마다 타임아웃 타이머 생성
+                )
+            else:
+                data = await receive_message(websocket, codec)    # 연결 생존 확인은 프로토콜 ping, 유휴 판정은 타이머 휠이 담당
             
-            # ping/pong 처리 (로그 최소화) -> 클라이언트와의 연결 상태 확인
+            connection.last_seen = time.monotonic()           # 마지막 수신 시간 기록 (타이머 생성/취소 없음)
+            connection.messages_in += 1
+            
+            # ping/pong 처리 (로그 최소화) -> 이전 클라이언트 호환용
             if data == "ping":                                # ping 메시지 수신시
-                await websocket.send_text("pong")             # pong 응답 전송
-            elif data == "heartbeat":                         # heartbeat 메시지 수신시
-                await websocket.send_text("heartbeat_ack")    # heartbeat_ack 응답 전송
+                websocket_manager.enqueue(websocket, "pong")             # pong 응답 전송
+            elif data == "heartbeat":                         # heartbeat 메시지 수신시 (protocol 모드에서는 응답 없음)
+                websocket_heartbeats.inc()
+                if WS_KEEPALIVE_MODE == "legacy":
+                    websocket_manager.enqueue(websocket, "heartbeat_ack")    # heartbeat_ack 응답 전송
                 
                 session_id = payload.get("session_id")        # 세션 ID 조회
                 
                 if session_id:
-                    await session_manager.update_session_activity(session_id)    # 세션 활동 시간 업데이트
+                    activity_buffer.record(session_id)        # 세션 활동 시간 기록 (주기적으로 Redis에 일괄 반영)
+            elif isinstance(data, dict) or data.startswith("{"):    # JSON/바이너리 메시지 (토픽 구독/해제)
+                await handle_client_message(websocket, user_id, data)
             else:
                 # 기타 메시지 처리
-                logger.info(f"사용자 {user_id}로부터 메시지 수신: {data}")
+                events.info("ws.message", "사용자 %s로부터 메시지 수신 (%d자)", user_id, len(data), user_id=user_id)
                 
     except asyncio.TimeoutError:    # 타임아웃 예외 발생 시
-        logger.info(f"사용자 {user_id} WebSocket 타임아웃")
+        events.info("ws.disconnect", "사용자 %s WebSocket 타임아웃", user_id, user_id=user_id)
         await websocket.close(code=1000, reason="Timeout")    # 연결 해제
     
     except WebSocketDisconnect:    # WebSocket 연결 해제 예외 발생 시
-        logger.info(f"사용자 {user_id} WebSocket 연결 해제")
+        events.info("ws.disconnect", "사용자 %s WebSocket 연결 해제", user_id, user_id=user_id)
     
     except Exception as e:          # 예외 발생 시
         logger.error(f"WebSocket 오류: {e}")
         await websocket.close(code=1011, reason="Internal error")    # 연결 해제
     
     finally:
+        idle_reaper.untrack(connection)                           # 유휴 연결 추적 종료
         await websocket_manager.disconnect(websocket, user_id)    # WebSocket 연결 해제
 
 
@@ -693,13 +3581,37 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
 @app.on_event("startup")
 async def startup_event():
     """애플리케이션 시작 시 실행"""
+    global redis_client
     logger.info("Redis 기반 중복 로그인 방지 시스템 시작")
+    await seed_users(USERS)                         # 데모 계정을 사용자 저장소에 등록 (비밀번호 해시)
+    
+    if redis_client is None:                        # SESSION_BACKEND=memory
+        logger.info("메모리 세션 저장소로 동작 (Redis 미사용)")
+        return
     
     # Redis 연결 상태 확인
-    if redis_client and redis_client.ping():
+    try:
+        await redis_client.ping()                   # Redis 서버에 ping 요청 (비동기)
+        await session_manager.load_scripts()        # 세션 Lua 스크립트 적재
+        await revocations.sync()                    # 폐기된 세션 목록 적재
+        await prepare_session_data()                # 활성 세션 뷰 재구성 / 만료 인덱스 보충
         logger.info("Redis 연결 성공")
-    else:
-        logger.warning("Redis 연결 실패 - 메모리 기반으로 동작")
+    
+    except (redis.ConnectionError, redis.TimeoutError):
+        logger.warning("Redis 연결 실패 - 메모리 기반으로 동작 (재연결 시도)")
+        await redis_client.aclose()                 # 커넥션 풀 정리
+        redis_client = None                         # Redis 연결 실패 시 None 설정
+        session_manager.redis = None
+
+
+# 애플리케이션 종료 시 Redis 커넥션 풀 정리
+@app.on_event("shutdown")
+async def shutdown_event():
+    """애플리케이션 종료 시 실행"""
+    if redis_client:
+        await activity_buffer.flush()               # 남은 heartbeat 활동 시간 반영
+        await redis_client.aclose()
+    user_store.close()                              # 사용자 저장소 연결 정리
 
 # 백그라운드 작업: 만료된 세션 정리
 async def cleanup_expired_sessions_task():
@@ -707,10 +3619,15 @@ async def cleanup_expired_sessions_task():
     while True:
         try:
             await asyncio.sleep(300)  # 5분마다 실행
+            started = time.perf_counter()
             cleaned_count = await session_manager.cleanup_expired_sessions()    # 만료된 세션 정리
+            session_cleanup_duration.observe(time.perf_counter() - started)
+            session_cleanup_removed.inc(cleaned_count)
+            revocations.prune()                                                 # 보관 시간이 지난 폐기 기록 정리
+            await session_manager.trim_view_changes()                           # 오래된 활성 세션 뷰 변경 기록 정리
             
             if cleaned_count > 0:    # 만료된 세션이 있는 경우
-                logger.info(f"백그라운드에서 {cleaned_count}개 만료 세션 정리 완료")    # 만료된 세션 정리 완료 로그 출력
+                logger.info("백그라운드에서 %d개 만료 세션 정리 완료", cleaned_count)    # 만료된 세션 정리 완료 로그 출력
         
         except Exception as e:
             logger.error(f"백그라운드 세션 정리 실패: {e}")
@@ -720,14 +3637,88 @@ async def cleanup_expired_sessions_task():
 async def start_background_tasks():
     """백그라운드 작업 시작"""
     asyncio.create_task(cleanup_expired_sessions_task())
+    asyncio.create_task(activity_buffer.run())
+    
+    if WS_KEEPALIVE_MODE != "legacy":
+        asyncio.create_task(idle_reaper.run())                             # 유휴 연결 정리 (타이머 휠)
+    
+    asyncio.create_task(session_stream.run())                              # 관리자 대시보드에 세션 변경 전송
+    
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, connection_drainer.start)    # kill -USR1 <pid> -> 연결 정리
+    except (NotImplementedError, RuntimeError, AttributeError):             # Windows 또는 메인 스레드가 아닌 경우
+        logger.info("SIGUSR1 연결 정리 사용 불가 - /api/admin/drain 사용")
+    
+    if redis_client:
+        start_redis_tasks()
+    elif SESSION_BACKEND == "redis":
+        asyncio.create_task(reconnect_redis_task())                        # Redis 복구 시 메모리 세션 이전 후 전환
+
+
+def start_redis_tasks():
+    """Redis 구독 작업 시작"""
+    asyncio.create_task(websocket_manager.listen_control_channel())        # 워커 간 제어 메시지 구독
+    asyncio.create_task(revocations.listen())                              # 워커 간 세션 폐기 알림 구독
+    asyncio.create_task(session_cache.listen())                            # 세션 캐시 무효화 알림 구독
+
+
+async def prepare_session_data():
+    """활성 세션 뷰가 없으면 재구성 + 만료 인덱스에 없는 기존 활성 세션 등록 (이전 버전 데이터 오류는 기록 후 계속 진행)"""
+    try:
+        await session_manager.rebuild_active_view()
+        await session_manager.backfill_expiry_index()
+    
+    except redis.ResponseError as e:
+        logger.error(f"기존 세션 데이터 정리 실패 - 계속 진행: {e}")
+
+
+async def reconnect_redis_task():
+    """Redis 재연결 - 성공하면 메모리 세션을 Redis로 옮기고 Redis 기반으로 전환"""
+    global redis_client
+    while redis_client is None:
+        await asyncio.sleep(REDIS_RECONNECT_INTERVAL)
+        client = create_redis_client()
+        try:
+            await client.ping()
+            moved = await session_manager.attach(client)
+        
+        except redis.RedisError as e:
+            logger.debug(f"Redis 재연결 실패: {e}")
+            await client.aclose()
+            continue
+        
+        redis_client = client
+        await revocations.sync()                                           # 다른 워커에서 폐기된 세션 반영
+        await prepare_session_data()                                       # 활성 세션 뷰 재구성 / 만료 인덱스 보충
+        session_stream.invalidate()                                        # 대시보드는 Redis 뷰로 전체 재조회
+        start_redis_tasks()
+        logger.info(f"Redis 재연결 성공 - 메모리 세션 {moved}개를 Redis로 이전")
 
 
 # 메인 함수 - 서버 실행
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(
+    
+    # 종료 신호(SIGTERM/SIGINT)를 받으면 연결 정리를 마친 뒤 종료 (uvicorn 기본 동작은 모든 소켓을 1012로 즉시 종료)
+    # 신호를 한 번 더 받으면 정리를 기다리지 않고 바로 종료
+    class DrainingServer(uvicorn.Server):
+        drain_requested = False
+        
+        def handle_exit(self, sig, frame):
+            if WS_DRAIN_ON_EXIT and not self.drain_requested:
+                self.drain_requested = True
+                connection_drainer.start()                                  # SIGUSR1 등으로 이미 정리 중이면 그 작업이 끝나길 기다림
+                connection_drainer.task.add_done_callback(lambda _: uvicorn.Server.handle_exit(self, sig, frame))
+                return
+            super().handle_exit(sig, frame)
+    
+    DrainingServer(uvicorn.Config(
         app, 
         host="0.0.0.0", 
         port=8000,
-        log_level="info"
-    )
+        log_level="info",
+        ws="websockets",                        # 프로토콜 ping 프레임을 지원하는 구현 사용
+        ws_ping_interval=WS_PING_INTERVAL,      # 서버에서 ping 프레임 전송 -> 응답 없는 연결은 uvicorn이 종료
+        ws_ping_timeout=WS_PING_TIMEOUT,
+        ws_per_message_deflate=WS_PER_MESSAGE_DEFLATE     # 큰 메시지 압축 (작은 메시지가 대부분이면 끄는 편이 CPU 절약)
+    )).run()
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useRef } from 'react';
 import LoginForm from './components/LoginForm/LoginForm';
 import UserDashboard from './components/UserDashboard/UserDashboard';
 import WebSocketStatus from './components/WebSocketStatus/WebSocketStatus';
@@ -11,6 +11,12 @@ function App() {
     const [forceLogoutData, setForceLogoutData] = useState(null);
     const [activeSessions, setActiveSessions] = useState([]);
 
+    // WebSocket 핸들러에서도 최신 값을 보도록 ref로 관리
+    const currentUserRef = useRef(null);
+    const sessionsRef = useRef(new Map());          // 사용자명 -> 세션 정보
+    const sessionVersionRef = useRef(null);         // 반영된 활성 세션 뷰 버전 (null이면 전체 조회 중)
+    const pendingUpdatesRef = useRef([]);           // 전체 조회 중 도착한 변경분
+
     // 강제 로그아웃 모달 표시
     const showForceLogoutModal = (data) => {
         console.log('App.js에서 강제 로그아웃 모달 표시:', data);
@@ -28,31 +34,74 @@ function App() {
             websocket.close();
             setWebsocket(null);
         }
+        currentUserRef.current = null;
         setCurrentUser(null);
         hideForceLogoutModal();
     };
 
-    // 활성 세션 조회
+    // 활성 세션 전체 조회 (페이지 단위)
     const fetchActiveSessions = async () => {
+        sessionVersionRef.current = null;
         try {
-            const response = await fetch('http://192.168.2.55:8000/api/auth/active-sessions');
-            const data = await response.json();
-            setActiveSessions(data.sessions || []);
+            const sessions = new Map();
+            let cursor = 0;
+            let version = null;
+            do {
+                const response = await fetch(`http://192.168.2.55:8000/api/auth/active-sessions?cursor=${cursor}`);
+                const data = await response.json();
+                (data.sessions || []).forEach((session) => sessions.set(session.username, session));
+                if (version === null) {
+                    version = data.version;     // 첫 페이지 버전 이후 변경분은 다시 적용해도 결과가 같음
+                }
+                cursor = data.next_cursor;
+            } while (cursor);
+
+            sessionsRef.current = sessions;
+            sessionVersionRef.current = version;
+            setActiveSessions(Array.from(sessions.values()));
+
+            // 조회 중 도착한 변경분 반영
+            const pending = pendingUpdatesRef.current;
+            pendingUpdatesRef.current = [];
+            pending.forEach(applySessionUpdate);
         } catch (error) {
             console.error('활성 세션 조회 실패:', error);
         }
     };
 
-    // 로그인 시에만 활성 세션 조회 (성능 최적화)
+    // 서버가 보낸 세션 변경분 반영 (관리자 전용 sessions 토픽)
+    const applySessionUpdate = (data) => {
+        if (sessionVersionRef.current === null) {
+            pendingUpdatesRef.current.push(data);   // 전체 조회가 끝난 뒤 반영
+            return;
+        }
+        if (data.reset || data.from_version > sessionVersionRef.current) {
+            fetchActiveSessions();                  // 누락된 변경분이 있으면 전체 재조회
+            return;
+        }
+        if (data.version <= sessionVersionRef.current) {
+            return;                                 // 이미 반영된 변경분
+        }
+
+        data.changes.forEach((session) => sessionsRef.current.set(session.username, session));
+        data.removed.forEach((username) => sessionsRef.current.delete(username));
+        sessionVersionRef.current = data.version;
+        setActiveSessions(Array.from(sessionsRef.current.values()));
+    };
+
+    // 로그인 시 한 번 조회 후, 관리자는 WebSocket으로 변경분만 수신 (폴링 없음)
     const handleLogin = (userData) => {
+        currentUserRef.current = userData;
         setCurrentUser(userData);
-        fetchActiveSessions(); // 로그인 시에만 호출
+        fetchActiveSessions();
     };
 
-    // WebSocket 메시지로 세션 변경사항만 업데이트
-    const handleWebSocketMessage = (data) => {
-        if (data.type === 'session_update') {
-            fetchActiveSessions(); // 세션 변경 시에만 호출
+    // WebSocket 메시지 처리
+    const handleWebSocketMessage = (data, ws) => {
+        if (data.type === 'connection_established' && currentUserRef.current?.is_admin) {
+            ws.send(JSON.stringify({ type: 'subscribe', topic: 'sessions' }));    // 세션 변경 스트림 구독
+        } else if (data.type === 'session_update') {
+            applySessionUpdate(data);
         }
     };
 
@@ -66,6 +115,7 @@ function App() {
                 {!currentUser ? (
                     <LoginForm 
                         onLogin={handleLogin} 
+                        onWebSocketMessage={handleWebSocketMessage}
                         setWebsocket={setWebsocket}
                         showForceLogoutModal={showForceLogoutModal}
                     />
@@ -73,7 +123,7 @@ function App() {
                     <div className="dashboard-container">
                         <UserDashboard 
                             user={currentUser} 
-                            onLogout={() => setCurrentUser(null)}
+                            onLogout={() => { currentUserRef.current = null; setCurrentUser(null); }}
                             setWebsocket={setWebsocket}
                         />
                         <WebSocketStatus 
@@ -1,7 +1,10 @@
 import React, { useState } from 'react';
 import './LoginForm.css';
 
-const LoginForm = ({ onLogin, setWebsocket, showForceLogoutModal }) => {
+// 서버가 재접속 대기 시간을 알려주지 않고 재시작(1012)으로 연결을 닫은 경우 사용할 분산 시간 (밀리초)
+const DEFAULT_RECONNECT_WINDOW_MS = 10000;
+
+const LoginForm = ({ onLogin, onWebSocketMessage, setWebsocket, showForceLogoutModal }) => {
     const [username, setUsername] = useState('');
     const [password, setPassword] = useState('');
     const [isLoading, setIsLoading] = useState(false);
@@ -136,16 +139,16 @@ const LoginForm = ({ onLogin, setWebsocket, showForceLogoutModal }) => {
             console.log('✅ WebSocket 연결 성공!');
             setWebsocket(ws);
             
-            // 핑 전송 시작 (30초마다)
-            const pingInterval = setInterval(() => {
+            // 연결 생존 확인은 서버의 ping 프레임이 담당 (브라우저가 자동 응답)
+            // heartbeat는 세션 활동 갱신용으로 응답 없이 전송 (60초마다, 서버 유휴 제한 5분보다 짧게)
+            const heartbeatInterval = setInterval(() => {
                 if (ws.readyState === WebSocket.OPEN) {
-                    console.log('핑 전송:', new Date().toLocaleTimeString());
-                    ws.send('ping');
+                    ws.send('heartbeat');
                 }
-            }, 30000);
+            }, 60000);
             
             // WebSocket 객체에 interval 저장
-            ws.pingInterval = pingInterval;
+            ws.heartbeatInterval = heartbeatInterval;
         };
 
         ws.onmessage = (event) => {
@@ -159,6 +162,12 @@ const LoginForm = ({ onLogin, setWebsocket, showForceLogoutModal }) => {
                     console.log('강제 로그아웃 메시지 감지! 모달 표시 시도...');
                     // 강제 로그아웃 알림 표시
                     showForceLogoutModal(data);
+                } else if (data.type === 'reconnect') {
+                    // 서버 배포/종료 전 연결 정리 - 안내받은 시간만큼 기다린 뒤 재접속 (클라이언트마다 달라 새 서버에 재접속이 몰리지 않음)
+                    console.log('재접속 안내 수신:', data.retry_after_ms, 'ms 후 재접속');
+                    ws.reconnectDelay = data.retry_after_ms;
+                } else if (onWebSocketMessage) {
+                    onWebSocketMessage(data, ws);
                 }
             } catch (e) {
                 if (event.data === 'pong') {
@@ -173,9 +182,17 @@ const LoginForm = ({ onLogin, setWebsocket, showForceLogoutModal }) => {
             console.log('❌ WebSocket 연결 종료:', event.code, event.reason);
             setWebsocket(null);
             
-            // ping interval 정리
-            if (ws.pingInterval) {
-                clearInterval(ws.pingInterval);
+            // heartbeat interval 정리
+            if (ws.heartbeatInterval) {
+                clearInterval(ws.heartbeatInterval);
+            }
+            
+            // 서버 재시작(1012)으로 닫힌 경우에만 재접속 (안내가 없으면 무작위 대기 시간 사용)
+            if (event.code === 1012) {
+                const delay = ws.reconnectDelay !== undefined
+                    ? ws.reconnectDelay
+                    : Math.random() * DEFAULT_RECONNECT_WINDOW_MS;
+                setTimeout(() => connectWebSocket(userId, token), delay);
             }
         };
 